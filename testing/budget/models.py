@@ -4,35 +4,18 @@ from django.conf import settings
 from decimal import Decimal
 from django.db.models import Sum
 from finance.models import Income, RecurringIncome, Expense
-from dateutil.relativedelta import relativedelta
-
-FREQ_RELATIVE = {
-    "daily": lambda d: d + relativedelta(days=1),
-    "weekly": lambda d: d + relativedelta(weeks=1),
-    "monthly": lambda d: d + relativedelta(months=1),
-    "quarterly": lambda d: d + relativedelta(months=3),
-    "biannually": lambda d: d + relativedelta(months=6),
-    "annually": lambda d: d + relativedelta(years=1),
-}
+from finance.utils import occurrence_dates
 
 
 def _calculate_recurring_total(start_date, end_date, user):
+    """Projected recurring income in [start_date, end_date] not yet materialized as Income rows."""
     total = Decimal("0.00")
     recurring_qs = RecurringIncome.objects.filter(user=user)
     for r in recurring_qs:
-        freq = (r.frequency or "").lower()
-        next_date = r.next_due_date
-        r_end = r.end_date or end_date
-        if not next_date:
+        if not r.next_due_date:
             continue
-
-        # advance until in range
-        while next_date < start_date:
-            next_date = FREQ_RELATIVE.get(freq, lambda d: d)(next_date)
-
-        while next_date <= end_date and next_date <= r_end:
-            total += r.amount
-            next_date = FREQ_RELATIVE.get(freq, lambda d: d)(next_date)
+        dates = occurrence_dates(r.start_date, r.frequency, r.end_date, max(start_date, r.next_due_date), end_date)
+        total += r.amount * len(dates)
     return total
 
 
@@ -59,11 +42,11 @@ class Budget(models.Model):
     def _get_available_income(self):
         """Return Decimal total of one-time income + recurring incomes for this budget period."""
         income_total = Income.objects.filter(
-            user=self.user,
+            user_id=self.user_id,
             date__range=[self.start_date, self.end_date]
         ).aggregate(total=Sum('amount'))['total'] or Decimal("0.00")
 
-        recurring_total = _calculate_recurring_total(self.start_date, self.end_date, self.user)
+        recurring_total = _calculate_recurring_total(self.start_date, self.end_date, self.user_id)
 
         return (income_total or Decimal("0.00")) + (recurring_total or Decimal("0.00"))
 
@@ -75,8 +58,9 @@ class Budget(models.Model):
 
     def total_spent(self):
         """Total spent across all categories in this budget period (sums expenses by category membership)."""
-        expenses = Expense.objects.filter(user=self.user, date__range=[self.start_date, self.end_date])
-        return sum(exp.amount for exp in expenses) or Decimal("0.00")
+        return Expense.objects.filter(
+            user=self.user, date__range=[self.start_date, self.end_date]
+        ).aggregate(total=Sum('amount'))['total'] or Decimal("0.00")
 
     def remaining(self):
         return self.total_amount - self.total_spent()
@@ -97,12 +81,12 @@ class BudgetCategory(models.Model):
         return (Decimal(self.percent or 0) / Decimal('100')) * Decimal(self.budget.total_amount)
 
     def spent(self):
-        expenses = Expense.objects.filter(
+        """Single-category SUM; use budget.utils.budget_spending() when evaluating many categories."""
+        return Expense.objects.filter(
             user=self.budget.user,
             category=self.category,
             date__range=[self.budget.start_date, self.budget.end_date]
-        )
-        return sum(exp.amount for exp in expenses) or Decimal("0.00")
+        ).aggregate(total=Sum('amount'))['total'] or Decimal("0.00")
 
     def remaining(self):
         return Decimal(self.limit_amount()) - self.spent()
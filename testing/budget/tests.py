@@ -1,3 +1,66 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from finance.models import Expense, Income
+from .models import Budget, BudgetCategory
+from .utils import budget_spending, evaluate_budget
 
-# Create your tests here.
+User = get_user_model()
+
+
+class BudgetSpendingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="budgeter", password="password123")
+        Income.objects.create(user=self.user, source="Salary", amount=Decimal("10000"), date=date(2024, 1, 1), category="Salary")
+        # Overlapping periods and category sets
+        self.january = Budget.objects.create(user=self.user, name="January", start_date=date(2024, 1, 1), end_date=date(2024, 1, 31))
+        self.quarter = Budget.objects.create(user=self.user, name="Q1", start_date=date(2024, 1, 15), end_date=date(2024, 3, 31))
+        for budget, categories in ((self.january, ["Food & Dining", "Transportation"]),
+                                   (self.quarter, ["Food & Dining", "Education"])):
+            for category in categories:
+                BudgetCategory.objects.create(budget=budget, category=category, percent=Decimal("20"))
+
+        for day, category, amount in [
+            (date(2024, 1, 5), "Food & Dining", "100"),    # January only
+            (date(2024, 1, 20), "Food & Dining", "40"),    # both
+            (date(2024, 1, 25), "Transportation", "15"),   # January only (not a Q1 category)
+            (date(2024, 2, 10), "Education", "300"),       # Q1 only
+            (date(2024, 2, 11), "Food & Dining", "7.50"),  # Q1 only
+            (date(2024, 1, 20), "Miscellaneous", "999"),   # in no budget's categories
+            (date(2023, 12, 31), "Food & Dining", "50"),   # before both
+        ]:
+            Expense.objects.create(user=self.user, name=category, amount=Decimal(amount), date=day, category=category)
+
+    def test_spending_matches_single_category_sums(self):
+        budgets = Budget.objects.filter(user=self.user).prefetch_related("categories")
+        spent = budget_spending(budgets)
+
+        for budget in budgets:
+            for category in budget.categories.all():
+                self.assertEqual(spent[(budget.id, category.category)], category.spent(), category)
+        self.assertEqual(spent[(self.january.id, "Food & Dining")], Decimal("140"))
+        self.assertEqual(spent[(self.quarter.id, "Food & Dining")], Decimal("47.50"))
+        self.assertEqual(spent[(self.quarter.id, "Transportation")], Decimal("0.00"))
+
+        total, rows = evaluate_budget(self.quarter, spent)
+        self.assertEqual(total, Decimal("0.00"))  # no income inside Q1's range from Jan 15
+        self.assertEqual([(cat.category, cat_spent) for cat, _, cat_spent in rows],
+                         [("Food & Dining", Decimal("47.50")), ("Education", Decimal("300"))])
+
+    def test_budget_list_query_count_does_not_grow_with_categories(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("budget_list"))  # first visit builds the ledger and recurring watermark
+
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse("budget_list"))
+        self.assertEqual(response.context["total_spent"], Decimal("502.50"))
+
+        for category in ("Personal & Shopping", "Health & Fitness", "Housing & Utilities"):
+            BudgetCategory.objects.create(budget=self.january, category=category, percent=Decimal("5"))
+            Expense.objects.create(user=self.user, name=category, amount=Decimal("1"), date=date(2024, 1, 9), category=category)
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse("budget_list"))
+        self.assertEqual(response.context["total_spent"], Decimal("505.50"))
@@ -1,48 +1,121 @@
 # budget/utils.py
+from collections import defaultdict
 from decimal import Decimal
 from django.contrib import messages
+from django.db.models import Q, Sum
 from django.utils import timezone
+from finance.models import Expense
 from .models import Budget, BudgetCategory
 
-def check_budget_warnings(request, expense):
+
+def budget_spending(budgets):
     """
-    Check budget warnings for the given expense's category.
-    Uses percentage-based BudgetCategory limits.
+    Spent amount per (budget_id, category) for budgets of one user, computed
+    with a single grouped SUM query: one row per expense category, with one
+    conditional sum per budget over that budget's date range.
+
+    Budgets should come with their categories prefetched.
+    Only categories a budget contains get an entry; it is a defaultdict, so
+    missing pairs read as Decimal("0.00").
+    """
+    spent = defaultdict(lambda: Decimal("0.00"))
+    budgets = list(budgets)
+    categories = {cat.category for b in budgets for cat in b.categories.all()}
+    if not categories:
+        return spent
+
+    sums = {
+        f"b{b.id}": Sum("amount", filter=Q(date__range=(b.start_date, b.end_date)))
+        for b in budgets
+    }
+    rows = (
+        Expense.objects.filter(
+            user=budgets[0].user_id,
+            category__in=categories,
+            date__range=(min(b.start_date for b in budgets), max(b.end_date for b in budgets)),
+        )
+        .values("category")
+        .annotate(**sums)
+        .order_by()
+    )
+    members = {(b.id, cat.category) for b in budgets for cat in b.categories.all()}
+    for row in rows:
+        for b in budgets:
+            total = row[f"b{b.id}"]
+            if total and (b.id, row["category"]) in members:
+                spent[(b.id, row["category"])] = total
+    return spent
+
+
+def evaluate_budget(budget, spent):
+    """
+    Per-category figures of one budget from a budget_spending() map:
+    returns (total_amount, [(category, limit, spent), ...]).
+    The budget's total_amount is computed once instead of once per category.
+    """
+    total_amount = Decimal(budget.total_amount)
+    rows = []
+    for cat in budget.categories.all():
+        limit = (Decimal(cat.percent or 0) / Decimal('100')) * total_amount
+        rows.append((cat, limit, Decimal(spent[(budget.id, cat.category)])))
+    return total_amount, rows
+
+
+def budget_warnings(user, category_name):
+    """
+    Budget warnings for one expense category, as (level, text) pairs where
+    level is a django.contrib.messages function name ("warning", "error").
+    Uses percentage-based BudgetCategory limits. Needs no request, so
+    background imports can collect the same warnings.
     """
-    user = request.user
-    category_name = expense.category
     today = timezone.now().date()
 
     # Find active budgets that include this category
-    active_budgets = Budget.objects.filter(
-        user=user,
-        start_date__lte=today,
-        end_date__gte=today,
-        categories__category=category_name
-    ).distinct()
+    active_budgets = list(
+        Budget.objects.filter(
+            user=user,
+            start_date__lte=today,
+            end_date__gte=today,
+            categories__category=category_name
+        ).distinct().prefetch_related("categories")
+    )
+    if not active_budgets:
+        return []
+
+    spent_map = budget_spending(active_budgets)
+    warnings = []
 
     for budget in active_budgets:
-        # Get the category object in this budget
-        cat_obj = budget.categories.filter(category=category_name).first()
-        if not cat_obj:
-            continue  # Category not part of this budget
+        total_limit, rows = evaluate_budget(budget, spent_map)
 
-        spent = cat_obj.spent()
-        limit = cat_obj.limit_amount()  # compute based on percentage of budget
+        # Get the category row in this budget
+        cat_row = next((row for row in rows if row[0].category == category_name), None)
+        if not cat_row:
+            continue  # Category not part of this budget
+        _, limit, spent = cat_row
 
         # Category-level warning
         if spent > limit:
-            messages.warning(
-                request,
+            warnings.append((
+                "warning",
                 f"⚠️ You have exceeded the limit for category '{category_name}' "
                 f"in budget '{budget.name}'. Spent: {spent}, Limit: {limit}"
-            )
+            ))
 
         # Total budget warning
-        total_spent = sum(c.spent() for c in budget.categories.all())
-        total_limit = budget.total_amount
+        total_spent = sum(cat_spent for _, _, cat_spent in rows)
         if total_spent > total_limit:
-            messages.error(
-                request,
+            warnings.append((
+                "error",
                 f"🚨 Your total spending ({total_spent}) exceeded the budget '{budget.name}' limit ({total_limit})!"
-            )
+            ))
+    return warnings
+
+
+def check_budget_warnings(request, expense):
+    """
+    Check budget warnings for the given expense's category.
+    Uses percentage-based BudgetCategory limits.
+    """
+    for level, text in budget_warnings(request.user, expense.category):
+        getattr(messages, level)(request, text)
@@ -6,6 +6,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from .models import Budget, BudgetCategory
 from .forms import BudgetForm, BudgetCategoryForm
+from .utils import budget_spending, evaluate_budget
 from django.core.paginator import Paginator
 
 
@@ -17,7 +18,8 @@ def get_available_income(start_date, end_date, user):
 
 @login_required
 def budget_list(request):
-    budgets = Budget.objects.filter(user=request.user)
+    budgets = Budget.objects.filter(user=request.user).prefetch_related('categories')
+    spent_map = budget_spending(budgets)
 
     total_spent = Decimal('0.00')
     total_amount = Decimal('0.00')
@@ -25,13 +27,14 @@ def budget_list(request):
 
     budget_data = []
     for b in budgets:
-        spent = sum(Decimal(cat.spent()) for cat in b.categories.all())
-        total = Decimal(b.total_amount)
+        total, rows = evaluate_budget(b, spent_map)
+        spent = sum((cat_spent for _, _, cat_spent in rows), Decimal('0.00'))
         remaining = total - spent
         percent = Decimal('0') if total == 0 else (spent / total) * 100
 
         budget_data.append({
             'obj': b,
+            'total': total,
             'spent': spent,
             'remaining': remaining,
             'percent': percent
@@ -134,19 +137,17 @@ def edit_budget(request, budget_id):
 
 @login_required
 def budget_detail(request, budget_id):
-    budget = get_object_or_404(Budget, id=budget_id, user=request.user)
+    budget = get_object_or_404(Budget.objects.prefetch_related('categories'), id=budget_id, user=request.user)
     available_income = get_available_income(budget.start_date, budget.end_date, request.user)
+    total_budget_amount, rows = evaluate_budget(budget, budget_spending([budget]))
 
     category_data = []
     total_spent = Decimal('0')
     total_limit = Decimal('0')
     over_limit_categories = []
 
-    for cat in budget.categories.all():
-        limit = Decimal(cat.limit_amount())
-        spent = Decimal(cat.spent())
+    for cat, limit, spent in rows:
         percent = Decimal('0') if limit == 0 else (spent / limit) * 100
-        percent_of_budget = Decimal('0') if budget.total_amount == 0 else ( (Decimal(cat.percent) / Decimal('100')) * Decimal('100'))
 
         total_spent += spent
         total_limit += limit
@@ -163,13 +164,13 @@ def budget_detail(request, budget_id):
             over_limit_categories.append(cat.category)
 
     overall_percent = Decimal('0') if total_limit == 0 else (total_spent / total_limit) * 100
-    total_percent_of_budget = Decimal('0') if budget.total_amount == 0 else (total_limit / Decimal(budget.total_amount)) * 100
+    total_percent_of_budget = Decimal('0') if total_budget_amount == 0 else (total_limit / total_budget_amount) * 100
 
     if over_limit_categories:
         messages.warning(request, f"⚠️ The following categories exceeded their limits: {', '.join(over_limit_categories)}.")
 
-    if total_spent > budget.total_amount:
-        messages.error(request, f"🚨 Total spending ({total_spent}) has exceeded the budget limit ({budget.total_amount})!")
+    if total_spent > total_budget_amount:
+        messages.error(request, f"🚨 Total spending ({total_spent}) has exceeded the budget limit ({total_budget_amount})!")
 
     form = BudgetCategoryForm(budget=budget)
 
@@ -182,8 +183,8 @@ def budget_detail(request, budget_id):
         'overall_percent': overall_percent,
         'total_percent_of_budget': total_percent_of_budget,
         'available_income': available_income,
-        'total_budget_amount': budget.total_amount,
-        'percent_of_available_income': (budget.total_amount / available_income * 100) if available_income > 0 else Decimal('0.00'),
+        'total_budget_amount': total_budget_amount,
+        'percent_of_available_income': (total_budget_amount / available_income * 100) if available_income > 0 else Decimal('0.00'),
     }
 
     return render(request, 'budget/budget_detail.html', context)
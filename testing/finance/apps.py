@@ -1,4 +1,6 @@
+import os
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class FinanceConfig(AppConfig):
@@ -6,5 +8,9 @@ class FinanceConfig(AppConfig):
     name = 'finance'
     
     def ready(self):
-        from ml.classifier import load_classifier
-        load_classifier()
+        import finance.signals  # noqa
+        # 🔥 Opt-in: load and exercise the classifiers before serving traffic.
+        # Off by default so migrate, shell and workers start without torch.
+        if getattr(settings, "ML_WARMUP_ON_STARTUP", os.environ.get("ML_WARMUP_ON_STARTUP") == "1"):
+            from ml.registry import warm_up
+            warm_up()
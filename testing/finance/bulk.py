@@ -0,0 +1,99 @@
+# finance/bulk.py
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+
+# Rows written per INSERT statement by the CSV importers.
+# Override with FINANCE_IMPORT_BATCH_SIZE in settings.
+DEFAULT_IMPORT_BATCH_SIZE = 500
+
+
+def get_import_batch_size():
+    return getattr(settings, "FINANCE_IMPORT_BATCH_SIZE", DEFAULT_IMPORT_BATCH_SIZE)
+
+
+def after_bulk_write(user):
+    """
+    Schedule the per-user recalculations that post_save signals would normally
+    trigger. bulk_create() bypasses signals, so bulk paths call this once per
+    import; the savings reallocation itself runs once on commit.
+    """
+    from savings.reallocation import schedule_reallocation
+    schedule_reallocation(user)
+
+
+def assign_predicted_categories(objs, text_field, classify, sources=None):
+    """
+    Fill in the category of every unsaved object that has none, using a single
+    batched call to an ML classify function ((category, source) pairs).
+    Counts per source are added to the `sources` Counter when given.
+    """
+    pending = [obj for obj in objs if not obj.category]
+    if pending:
+        results = classify([getattr(obj, text_field) for obj in pending])
+        for obj, (category, source) in zip(pending, results):
+            obj.category = category
+            if sources is not None:
+                sources[source] += 1
+
+
+def bulk_create_transactions(user, model, objs, batch_size=None, recalculate=True):
+    """
+    Insert already-validated Income/Expense objects for one user in chunks
+    and run the savings recalculation once, all inside a single transaction.
+    The balance ledger and monthly rollups get one aggregated delta for the
+    whole batch.
+    Callers writing several batches pass recalculate=False and call
+    after_bulk_write() themselves. Returns the number of rows written.
+    """
+    from .ledger import apply_delta
+    from .models import Income
+    from .recurring import reset_recurring_watermark
+    from .rollups import apply_rollup_deltas, collect_deltas
+
+    if not objs:
+        return 0
+
+    batch_size = batch_size or get_import_batch_size()
+    total = sum((Decimal(str(obj.amount)) for obj in objs), Decimal("0"))
+    with transaction.atomic():
+        for i in range(0, len(objs), batch_size):
+            model.objects.bulk_create(objs[i:i + batch_size])
+        if model is Income:
+            apply_delta(user.pk, income=total, income_count=len(objs))
+            reset_recurring_watermark(user.pk, pending_only=True)
+        else:
+            apply_delta(user.pk, expense=total, expense_count=len(objs))
+        apply_rollup_deltas(collect_deltas(model, objs))
+        if recalculate:
+            after_bulk_write(user)
+    return len(objs)
+
+
+def bulk_delete_transactions(queryset):
+    """
+    Delete Income/Expense rows and adjust each affected user's ledger and
+    monthly rollups once, instead of per deleted row. Returns the number of
+    rows deleted.
+    """
+    from savings.reallocation import batched_reallocation
+    from .ledger import apply_delta, ledger_suspended
+    from .models import Income
+    from .rollups import apply_rollup_deltas, queryset_deltas
+
+    field = "income" if queryset.model is Income else "expense"
+    with transaction.atomic():
+        totals = defaultdict(lambda: [Decimal("0"), 0])
+        for row in queryset.values("user_id").annotate(total=Sum("amount"), n=Count("id")).order_by():
+            totals[row["user_id"]][0] += row["total"] or Decimal("0")
+            totals[row["user_id"]][1] += row["n"]
+        # Rollups first, so per-row delete handlers already see the new months
+        apply_rollup_deltas(queryset_deltas(queryset))
+        # Per-row delete signals only mark users dirty; one reallocation each on commit
+        with ledger_suspended(), batched_reallocation():
+            deleted, _ = queryset.delete()
+        for user_id, (total, count) in totals.items():
+            apply_delta(user_id, **{field: -total, f"{field}_count": -count})
+    return deleted
@@ -0,0 +1,56 @@
+# finance/csv_stream.py
+import codecs
+import csv
+from itertools import islice
+from django.conf import settings
+
+# Largest accepted CSV upload in bytes. Files are parsed as a stream, so memory
+# use does not grow with this limit. Override with FINANCE_MAX_UPLOAD_SIZE.
+DEFAULT_MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100 MB
+
+
+def get_max_upload_size():
+    return getattr(settings, "FINANCE_MAX_UPLOAD_SIZE", DEFAULT_MAX_UPLOAD_SIZE)
+
+
+def upload_too_large(uploaded_file):
+    return uploaded_file.size > get_max_upload_size()
+
+
+def size_label(num_bytes):
+    return f"{num_bytes // (1024 * 1024)} MB"
+
+
+def iter_text_lines(uploaded_file, encoding="utf-8", errors="strict"):
+    """
+    Yield the lines of an UploadedFile (line endings kept) while reading it
+    chunk by chunk. An incremental decoder handles multi-byte characters split
+    across chunk boundaries, so only one chunk is held in memory at a time.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    pending = ""
+    for chunk in uploaded_file.chunks():
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        # The last piece may be an unfinished line (or a "\r" whose "\n" is in the next chunk)
+        pending = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+        yield from lines
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def stream_csv(uploaded_file, encoding="utf-8", errors="strict"):
+    """csv.DictReader over an uploaded file that never loads the whole file."""
+    return csv.DictReader(iter_text_lines(uploaded_file, encoding, errors))
+
+
+def batched(iterable, size):
+    """Yield lists of up to `size` items from any iterable."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ImportAborted(Exception):
+    """Raised inside an import's transaction to roll back every row written so far."""
@@ -0,0 +1,134 @@
+# finance/dashboard.py
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+from django.db.models import CharField, DecimalField, Min, Sum, Value
+from .ledger import get_balance
+from .models import Expense, Income
+from .rollups import category_totals
+
+ZERO = Value(Decimal("0"), output_field=DecimalField(max_digits=21, decimal_places=2))
+
+
+def first_income_date(user):
+    """Start date of the "all" view: the user's earliest income, in one query."""
+    return Income.objects.filter(user=user).aggregate(first=Min("date"))["first"]
+
+
+def daily_totals(user, start_date, end_date):
+    """
+    Income and expense per day in [start_date, end_date] from a single query:
+    a UNION of the two per-day aggregates, each filling the other side with 0.
+    The row count is bounded by the number of days, not transactions.
+    """
+    incomes = (
+        Income.objects.filter(user=user, date__range=(start_date, end_date))
+        .values("date")
+        .annotate(income=Sum("amount"), expense=ZERO)
+        .values_list("date", "income", "expense")
+        .order_by()
+    )
+    expenses = (
+        Expense.objects.filter(user=user, date__range=(start_date, end_date))
+        .values("date")
+        .annotate(income=ZERO, expense=Sum("amount"))
+        .values_list("date", "income", "expense")
+        .order_by()
+    )
+    totals = defaultdict(lambda: [Decimal("0"), Decimal("0")])
+    for day, income, expense in incomes.union(expenses, all=True):
+        totals[day][0] += income or 0
+        totals[day][1] += expense or 0
+    return totals
+
+
+def last_transaction(user):
+    """Most recent income or expense (an expense wins a same-day tie), in one query."""
+    incomes = Income.objects.filter(user=user).values("date", "amount", "category").annotate(
+        kind=Value("income", output_field=CharField())
+    ).order_by()
+    expenses = Expense.objects.filter(user=user).values("date", "amount", "category").annotate(
+        kind=Value("expense", output_field=CharField())
+    ).order_by()
+    return incomes.union(expenses, all=True).order_by("-date", "kind").first()
+
+
+def month_labels(start_date, end_date):
+    labels = []
+    current = start_date.replace(day=1)
+    while current <= end_date:
+        labels.append(current.strftime("%Y-%m"))
+        current += relativedelta(months=1)
+    return labels
+
+
+def week_windows(start_date, end_date):
+    """Seven-day windows from start_date; returns (display labels, year-week keys)."""
+    labels = []
+    weeks = []
+
+    current = start_date
+    while current <= end_date:
+        w_year, w_week = current.isocalendar()[0], current.isocalendar()[1]
+
+        week_end = current + timedelta(days=6)
+        if week_end > end_date:
+            week_end = end_date
+
+        labels.append(f"{current.strftime('%d')}–{week_end.strftime('%d %b %Y')}")
+        weeks.append(f"{w_year}-W{w_week}")
+
+        current = week_end + timedelta(days=1)
+
+    return labels, weeks
+
+
+def get_dashboard_data(user, start_date, end_date):
+    """
+    Everything the dashboard charts need for one date range.
+
+    Totals come from the balance ledger and category totals from the monthly
+    rollups (plus the raw rows of a partially covered first or last month, see
+    rollups.split_range). The monthly and weekly series are folded from one
+    per-day query over the exact range, so the number of queries does not grow
+    with the number of transactions.
+    """
+    balance = get_balance(user)
+    income_total = Decimal(balance.total_income)
+    expense_total = Decimal(balance.total_expense)
+
+    monthly = defaultdict(lambda: [0.0, 0.0])
+    weekly = defaultdict(lambda: [0.0, 0.0])
+    for day, (income, expense) in daily_totals(user, start_date, end_date).items():
+        month = monthly[f"{day.year}-{day.month:02d}"]
+        month[0] += float(income)
+        month[1] += float(expense)
+        # Same bucket keys as ExtractYear/ExtractWeek
+        bucket = weekly[f"{day.year}-W{day.isocalendar()[1]}"]
+        bucket[0] += float(income)
+        bucket[1] += float(expense)
+
+    months = month_labels(start_date, end_date)
+    weeks, week_keys = week_windows(start_date, end_date)
+
+    category_expenses = category_totals(user, "expense", start_date, end_date)
+
+    return {
+        "total_income": income_total.quantize(Decimal("0.01")),
+        "total_expense": expense_total.quantize(Decimal("0.01")),
+        "balance": (income_total - expense_total).quantize(Decimal("0.01")),
+
+        "months": months,
+        "income_data": [monthly.get(m, (0, 0))[0] for m in months],
+        "expense_data": [monthly.get(m, (0, 0))[1] for m in months],
+
+        "weeks": weeks,
+        "weekly_income_data": [weekly.get(k, (0, 0))[0] for k in week_keys],
+        "weekly_expense_data": [weekly.get(k, (0, 0))[1] for k in week_keys],
+
+        "category_labels": [category for category, _ in category_expenses],
+        "category_values": [float(total) for _, total in category_expenses],
+
+        "last_transaction": last_transaction(user),
+    }
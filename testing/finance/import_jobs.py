@@ -0,0 +1,154 @@
+# finance/import_jobs.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .csv_stream import ImportAborted
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# 🔧 FINANCE_IMPORT_MODE: "thread" runs jobs on a small pool inside the web
+# process; "worker" leaves them queued for `manage.py run_import_jobs`.
+# Only "worker" mode is durable: a thread-mode job dies with its web process.
+# Thread mode recovers as well as it can: when the pool starts it picks up
+# jobs still queued, and jobs stuck "running" past FINANCE_IMPORT_STALE_AFTER
+# seconds are marked failed.
+DEFAULT_IMPORT_MODE = "thread"
+DEFAULT_IMPORT_THREADS = 2
+DEFAULT_STALE_AFTER = 3600  # longer than any real import
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_import_mode():
+    return getattr(settings, "FINANCE_IMPORT_MODE", DEFAULT_IMPORT_MODE)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, "FINANCE_IMPORT_THREADS", DEFAULT_IMPORT_THREADS)
+                executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import-job")
+                # Jobs left queued by a previous process (claim_job keeps them from running twice)
+                fail_stale_jobs()
+                for job_id in queued_job_ids():
+                    executor.submit(_run_in_thread, job_id)
+                _executor = executor
+    return _executor
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        connection.close()  # pool threads never see request_finished
+
+
+def enqueue_import(job):
+    """
+    Hand a saved ImportJob to the background. In "thread" mode it starts once
+    the surrounding transaction commits; in "worker" mode the queued row is
+    picked up by run_import_jobs.
+    """
+    if get_import_mode() == "thread":
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+
+
+def claim_job(job_id):
+    """Atomically move a job from queued to running; False if someone else got it."""
+    return ImportJob.objects.filter(pk=job_id, status="queued").update(
+        status="running", started_at=timezone.now()
+    ) == 1
+
+
+def run_job(job_id):
+    """Claim and run one import job. Returns False if it was not queued."""
+    from .statement_import import import_statement
+
+    if not claim_job(job_id):
+        return False
+    job = ImportJob.objects.select_related("user").get(pk=job_id)
+    try:
+        import_statement(job)
+        job.status = "done"
+    except ImportAborted as e:
+        job.add_message("error", str(e))
+        job.status = "failed"
+    except Exception as e:
+        logger.exception(f"❌ Import job {job_id} failed")
+        job.add_message("error", f"Error processing statement: {e}")
+        job.status = "failed"
+    job.finished_at = timezone.now()
+    job.save()
+    if job.file:
+        job.file.delete(save=False)  # the statement is not kept once imported
+    return True
+
+
+def queued_job_ids():
+    return list(ImportJob.objects.filter(status="queued").order_by("created_at", "id").values_list("id", flat=True))
+
+
+def fail_stale_jobs(user=None):
+    """
+    Mark jobs "running" for longer than FINANCE_IMPORT_STALE_AFTER as failed:
+    their process died mid-import, so their transaction was rolled back and
+    nothing was imported. They are not requeued, so a file that kills the
+    process cannot do it again. Returns how many were failed.
+    """
+    stale_after = getattr(settings, "FINANCE_IMPORT_STALE_AFTER", DEFAULT_STALE_AFTER)
+    stale = ImportJob.objects.filter(status="running", started_at__lt=timezone.now() - timedelta(seconds=stale_after))
+    if user is not None:
+        stale = stale.filter(user=user)
+    failed = 0
+    for job in stale:
+        job.add_message("error", "❌ The import was interrupted before it finished and nothing was imported. Please upload the statement again.")
+        job.finished_at = timezone.now()
+        # Only if still running: it may have finished since the query
+        if ImportJob.objects.filter(pk=job.pk, status="running").update(
+            status="failed", messages=job.messages, finished_at=job.finished_at
+        ):
+            failed += 1
+            if job.file:
+                job.file.delete(save=False)
+    return failed
+
+
+def run_queued_jobs(limit=None):
+    """Run queued jobs oldest first; returns how many this call ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        job_id = (
+            ImportJob.objects.filter(status="queued")
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if job_id is None:
+            break
+        ran += run_job(job_id)
+    return ran
+
+
+def collect_finished_jobs(user):
+    """
+    (finished, active) import jobs of a user: finished jobs whose messages
+    have not been shown yet (now marked as shown), and the latest job still
+    queued or running, if any.
+    """
+    if get_import_mode() == "thread":
+        _get_executor()  # resumes jobs queued before a restart of this process
+    fail_stale_jobs(user)
+    jobs = list(ImportJob.objects.filter(user=user, notified=False).order_by("created_at", "id"))
+    finished = [job for job in jobs if job.finished]
+    if finished:
+        ImportJob.objects.filter(pk__in=[job.pk for job in finished]).update(notified=True)
+    active = next((job for job in reversed(jobs) if not job.finished), None)
+    return finished, active
@@ -0,0 +1,75 @@
+# finance/ledger.py
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from .models import Expense, Income, UserBalance
+
+_state = threading.local()
+
+
+def rebuild_balance(user_id):
+    """Recompute a user's ledger row from the raw Income/Expense tables."""
+    incomes = Income.objects.filter(user_id=user_id).aggregate(total=Sum("amount"), count=Count("id"))
+    expenses = Expense.objects.filter(user_id=user_id).aggregate(total=Sum("amount"), count=Count("id"))
+    try:
+        with transaction.atomic():
+            balance, _ = UserBalance.objects.update_or_create(
+                user_id=user_id,
+                defaults={
+                    "total_income": incomes["total"] or Decimal("0"),
+                    "total_expense": expenses["total"] or Decimal("0"),
+                    "income_count": incomes["count"],
+                    "expense_count": expenses["count"],
+                },
+            )
+    except IntegrityError:  # created concurrently, the other writer's row wins
+        balance = UserBalance.objects.get(pk=user_id)
+    return balance
+
+
+def get_balance(user):
+    """One primary-key lookup; the row is built on first use."""
+    return UserBalance.objects.filter(pk=user.pk).first() or rebuild_balance(user.pk)
+
+
+def get_totals(user):
+    """Return (total_income, total_expense) for a user from the ledger."""
+    balance = get_balance(user)
+    return balance.total_income, balance.total_expense
+
+
+def apply_delta(user_id, income=Decimal("0"), expense=Decimal("0"), income_count=0, expense_count=0):
+    """
+    Add signed amounts and row counts to a user's ledger in one UPDATE. Must run
+    after the rows are written, so a missing ledger row can be rebuilt from the tables.
+    """
+    if not (income or expense or income_count or expense_count):
+        return
+    updated = UserBalance.objects.filter(pk=user_id).update(
+        total_income=F("total_income") + income,
+        total_expense=F("total_expense") + expense,
+        income_count=F("income_count") + income_count,
+        expense_count=F("expense_count") + expense_count,
+        version=F("version") + 1,
+    )
+    if not updated:
+        rebuild_balance(user_id)
+
+
+def ledger_is_suspended():
+    return getattr(_state, "suspended", 0) > 0
+
+
+@contextmanager
+def ledger_suspended():
+    """
+    Stop the per-row signal handlers from touching the ledger. Used by bulk code
+    that applies one aggregated delta itself.
+    """
+    _state.suspended = getattr(_state, "suspended", 0) + 1
+    try:
+        yield
+    finally:
+        _state.suspended -= 1
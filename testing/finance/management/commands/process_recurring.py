@@ -0,0 +1,58 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from finance.models import RecurringExpense, RecurringIncome, RecurringWatermark
+from finance.recurring import process_recurring_transactions
+
+
+class Command(BaseCommand):
+    help = "Materialize due recurring incomes and expenses for all users."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running, processing every --interval seconds.")
+        parser.add_argument("--interval", type=int, default=3600, help="Seconds between runs with --loop (default 3600).")
+
+    def run_once(self):
+        today = timezone.now().date()
+        user_ids = set(
+            RecurringIncome.objects.filter(next_due_date__lte=today, status="active")
+            .values_list("user_id", flat=True)
+        ) | set(
+            RecurringExpense.objects.filter(next_due_date__lte=today).exclude(status="inactive")
+            .values_list("user_id", flat=True)
+        )
+
+        created = 0
+        for user in get_user_model().objects.filter(id__in=user_ids):
+            created += process_recurring_transactions(user, today)
+        stamped = self.stamp_watermarks(user_ids, today)
+        self.stdout.write(
+            f"Processed {len(user_ids)} user(s), created {created} transaction(s), "
+            f"marked {stamped} other user(s) up to date."
+        )
+
+    def stamp_watermarks(self, processed_ids, today):
+        """
+        Mark every user with nothing due as processed today, so their views only
+        read the watermark. Watermarks reset to None since the due query are left
+        alone for the next request (or run) to catch up.
+        """
+        stamped = (
+            RecurringWatermark.objects.exclude(user_id__in=processed_ids)
+            .filter(last_processed__lt=today)
+            .update(last_processed=today)
+        )
+        missing = get_user_model().objects.exclude(id__in=processed_ids).filter(recurring_watermark__isnull=True)
+        created = RecurringWatermark.objects.bulk_create(
+            [RecurringWatermark(user_id=user_id, last_processed=today) for user_id in missing.values_list("id", flat=True)],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+        return stamped + len(created)
+
+    def handle(self, *args, **options):
+        self.run_once()
+        while options["loop"]:
+            time.sleep(options["interval"])
+            self.run_once()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from finance.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the monthly income/expense rollup table from raw transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Only rebuild this user id (default: all users).")
+
+    def handle(self, *args, **options):
+        rows = rebuild_rollups(options["user"])
+        self.stdout.write(f"Rebuilt {rows} rollup row(s).")
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from finance.import_jobs import fail_stale_jobs, run_queued_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued bank statement import jobs. With FINANCE_IMPORT_MODE = \"worker\" this is the "
+        "durable way to import: queued jobs survive web process restarts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running, polling the queue every --interval seconds.")
+        parser.add_argument("--interval", type=int, default=2, help="Seconds between polls with --loop (default 2).")
+
+    def run_once(self):
+        stale = fail_stale_jobs()
+        if stale:
+            self.stdout.write(f"Marked {stale} interrupted import job(s) as failed.")
+        ran = run_queued_jobs()
+        if ran:
+            self.stdout.write(f"Ran {ran} import job(s).")
+
+    def handle(self, *args, **options):
+        self.run_once()
+        while options["loop"]:
+            time.sleep(options["interval"])
+            self.run_once()
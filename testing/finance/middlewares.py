@@ -2,6 +2,7 @@ from decimal import Decimal
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.db.models import Sum
+from .ledger import get_totals as ledger_totals
 from .models import Income, Expense
 
 
@@ -9,10 +10,8 @@ from .models import Income, Expense
 # Utility functions
 # ---------------------------------------------------------
 def get_totals(user):
-    """Return total income and total expense for a user."""
-    total_income = Income.objects.filter(user=user).aggregate(total=Sum("amount"))["total"] or Decimal("0")
-    total_expense = Expense.objects.filter(user=user).aggregate(total=Sum("amount"))["total"] or Decimal("0")
-    return total_income, total_expense
+    """Return total income and total expense for a user (one ledger lookup)."""
+    return ledger_totals(user)
 
 
 def can_afford_expense(user, amount):
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+        ('investment', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='investment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='expenses', to='investment.investment'),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='investment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='incomes', to='investment.investment'),
+        ),
+        migrations.CreateModel(
+            name='RecurringWatermark',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recurring_watermark', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_processed', models.DateField(blank=True, null=True)),
+                ('has_pending', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def build_rollups(apps, schema_editor):
+    MonthlyRollup = apps.get_model('finance', 'MonthlyRollup')
+    rows = []
+    for kind, model_name in (('income', 'Income'), ('expense', 'Expense')):
+        model = apps.get_model('finance', model_name)
+        grouped = (
+            model.objects.annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+            .values('user_id', 'year', 'month', 'category')
+            .annotate(total=Sum('amount'), n=Count('id'))
+            .order_by()
+        )
+        for row in grouped:
+            rows.append(MonthlyRollup(
+                user_id=row['user_id'], kind=kind, year=row['year'], month=row['month'],
+                category=row['category'] or '', total=row['total'] or 0, count=row['n'],
+            ))
+    MonthlyRollup.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_userbalance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('kind', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('category', models.CharField(max_length=50)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=21)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'kind', 'year', 'month'], name='rollup_user_kind_month')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'year', 'month', 'kind', 'category'), name='unique_monthly_rollup')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
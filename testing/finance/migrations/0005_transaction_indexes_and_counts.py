@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def reset_balances(apps, schema_editor):
+    # Existing ledger rows have no counts yet; they are rebuilt on first use
+    apps.get_model('finance', 'UserBalance').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_monthlyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userbalance',
+            name='expense_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userbalance',
+            name='income_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', '-date', 'id'], name='expense_user_date_id'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['user', '-date', 'id'], name='income_user_date_id'),
+        ),
+        migrations.RunPython(reset_balances, migrations.RunPython.noop),
+    ]
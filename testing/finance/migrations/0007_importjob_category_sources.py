@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='category_sources',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,4 +1,6 @@
+import os
 from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.utils import timezone
 from django.db import models
 from investment.models import Investment
@@ -25,6 +27,11 @@ class Expense(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     recurring = models.ForeignKey('RecurringExpense', null=True, blank=True, on_delete=models.SET_NULL)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-date", "id"], name="expense_user_date_id"),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.amount} ({self.category})"
 
@@ -50,6 +57,11 @@ class Income(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     recurring = models.ForeignKey('RecurringIncome', null=True, blank=True, on_delete=models.SET_NULL)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-date", "id"], name="income_user_date_id"),
+        ]
+
     def __str__(self):
         return f"{self.source} - {self.amount} ({self.category})"
 
@@ -112,4 +124,139 @@ class RecurringExpense(models.Model):
     end_date = models.DateField(null=True, blank=True)
     next_due_date = models.DateField()
     status = models.CharField(max_length=20, choices=[("pending", "Pending"), ("active", "Active"), ("inactive", "Inactive")], default="active")
-    
\ No newline at end of file
+    
+
+class RecurringWatermark(models.Model):
+    """
+    Per-user marker of the last day recurring transactions were materialized.
+    Views only read this row; the heavy catch-up runs in process_recurring.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="recurring_watermark")
+    last_processed = models.DateField(null=True, blank=True)
+    has_pending = models.BooleanField(default=False)  # pending expenses are retried once income changes
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} recurring processed up to {self.last_processed}"
+
+
+class UserBalance(models.Model):
+    """
+    Running per-user totals and row counts of Income and Expense, kept in step
+    with every write by finance.ledger so balance checks and pagination counts
+    are a single primary-key lookup.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="balance")
+    total_income = models.DecimalField(max_digits=21, decimal_places=2, default=0)
+    total_expense = models.DecimalField(max_digits=21, decimal_places=2, default=0)
+    income_count = models.PositiveIntegerField(default=0)
+    expense_count = models.PositiveIntegerField(default=0)
+    version = models.PositiveBigIntegerField(default=0)  # bumped on every change
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def available(self):
+        return self.total_income - self.total_expense
+
+    def __str__(self):
+        return f"{self.user} balance (v{self.version})"
+
+
+class MonthlyRollup(models.Model):
+    """
+    Per-user income/expense totals by month and category, maintained
+    incrementally by finance.rollups. Charts and surplus calculations read this
+    instead of grouping the raw transaction tables.
+    """
+    KIND_CHOICES = [
+        ("income", "Income"),
+        ("expense", "Expense"),
+    ]
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="monthly_rollups")
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    category = models.CharField(max_length=50)
+    total = models.DecimalField(max_digits=21, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "year", "month", "kind", "category"], name="unique_monthly_rollup"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "kind", "year", "month"], name="rollup_user_kind_month"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.kind} {self.year}-{self.month:02d} {self.category}: {self.total}"
+
+
+class ImportStorage(FileSystemStorage):
+    """FileSystemStorage that reads FINANCE_IMPORT_DIR on use rather than at import time."""
+
+    @property
+    def base_location(self):
+        return getattr(settings, "FINANCE_IMPORT_DIR", os.path.join(settings.BASE_DIR, "import_jobs"))
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def import_storage():
+    """Where uploaded statements wait for their import job (FINANCE_IMPORT_DIR)."""
+    return ImportStorage()
+
+
+class ImportJob(models.Model):
+    """
+    A bank statement import running outside the request (see finance.import_jobs).
+    The counters are updated as the file is processed so the upload page can
+    poll them; `messages` holds the final user-facing messages.
+    """
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="import_jobs")
+    file = models.FileField(upload_to="%Y/%m/", storage=import_storage, blank=True)
+    original_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    rows_parsed = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    income_imported = models.PositiveIntegerField(default=0)
+    expense_imported = models.PositiveIntegerField(default=0)
+    messages = models.JSONField(default=list, blank=True)
+    category_sources = models.JSONField(default=dict, blank=True)  # ml.phrase_index.SOURCES -> count
+    notified = models.BooleanField(default=False)  # final messages shown on the dashboard
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="importjob_status_created"),
+        ]
+
+    @property
+    def rows_imported(self):
+        return self.income_imported + self.expense_imported
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def add_message(self, level, text):
+        """Queue a message for the user; level is a django.contrib.messages function name."""
+        self.messages.append({"level": level, "message": text})
+
+    def save_progress(self):
+        self.save(update_fields=[
+            "rows_parsed", "rows_skipped", "income_imported", "expense_imported", "category_sources",
+        ])
+
+    def __str__(self):
+        return f"{self.user} import #{self.pk} ({self.status})"
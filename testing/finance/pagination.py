@@ -0,0 +1,77 @@
+# finance/pagination.py
+import base64
+from datetime import date
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Newest first; matches the (user, -date, id) indexes on Income and Expense
+ORDERING = ("-date", "id")
+
+
+class CountedPaginator(Paginator):
+    """Paginator that takes the total from a maintained counter instead of COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        return self._known_count
+
+
+def encode_cursor(direction, number, obj):
+    raw = f"{direction}:{number}:{obj.date.isoformat()}:{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return (direction, page number, date, id), or None for a missing/invalid cursor."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        direction, number, day, pk = raw.split(":")
+        if direction not in ("after", "before"):
+            return None
+        return direction, int(number), date.fromisoformat(day), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _keyset_rows(queryset, direction, day, pk, limit):
+    if direction == "after":
+        rows = queryset.filter(Q(date__lt=day) | Q(date=day, id__gt=pk)).order_by(*ORDERING)[:limit]
+        return list(rows)
+    rows = queryset.filter(Q(date__gt=day) | Q(date=day, id__lt=pk)).order_by("date", "-id")[:limit]
+    return list(reversed(rows))
+
+
+def paginate_transactions(queryset, request, count, per_page=20):
+    """
+    Paginate an Income/Expense queryset newest first.
+
+    ?page=N works as before (OFFSET), while ?cursor=... seeks from the last or
+    first row of the neighbouring page, so following Next/Previous costs the
+    same on page 500 as on page 1. The total comes from `count`, not COUNT(*).
+    Every page carries next_cursor/previous_cursor for its navigation links.
+    """
+    queryset = queryset.order_by(*ORDERING)
+    paginator = CountedPaginator(queryset, per_page, count)
+
+    page = None
+    cursor = decode_cursor(request.GET.get("cursor"))
+    if cursor:
+        direction, number, day, pk = cursor
+        rows = _keyset_rows(queryset, direction, day, pk, per_page)
+        if rows:
+            number = min(max(number, 1), paginator.num_pages)
+            page = Page(rows, number, paginator)
+    if page is None:
+        page = paginator.get_page(request.GET.get("page", 1))
+
+    objects = list(page.object_list)
+    page.next_cursor = encode_cursor("after", page.number + 1, objects[-1]) if objects and page.has_next() else None
+    page.previous_cursor = encode_cursor("before", page.number - 1, objects[0]) if objects and page.has_previous() else None
+    return paginator, page
@@ -0,0 +1,146 @@
+# finance/recurring.py
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from .models import Expense, Income, RecurringExpense, RecurringIncome, RecurringWatermark
+from .bulk import after_bulk_write, bulk_create_transactions
+from .ledger import get_totals
+from .utils import next_occurrence, occurrence_list
+
+
+def _due_dates(rec, today):
+    """All occurrence dates of rec from next_due_date up to today (and its end_date)."""
+    return occurrence_list(rec.start_date, rec.frequency, rec.end_date, rec.next_due_date, today)
+
+
+def _advance(rec, last_date):
+    """Move rec.next_due_date past last_date. Returns False if the schedule has ended."""
+    following = next_occurrence(rec.start_date, rec.frequency, last_date)
+    if following is None:
+        return False
+    rec.next_due_date = following
+    return not (rec.end_date and following > rec.end_date)
+
+
+def _existing_dates(model, recs):
+    """Set of (recurring_id, date) pairs already generated, fetched in one query."""
+    if not recs:
+        return set()
+    return set(
+        model.objects.filter(recurring__in=recs, date__gte=min(r.next_due_date for r in recs))
+        .values_list("recurring_id", "date")
+    )
+
+
+def process_recurring_transactions(user, today=None):
+    """
+    Materialize every due occurrence of the user's recurring incomes and expenses.
+
+    Incomes are caught up first; expense occurrences are then applied in date order
+    while the balance allows, and a recurring expense that cannot be afforded is
+    left "pending" at its first unpaid date. Rows are bulk inserted and the savings
+    recalculation runs once. Returns the number of transactions created.
+    """
+    today = today or timezone.now().date()
+
+    total_income, total_expense = get_totals(user)
+
+    # ---- Recurring Incomes ----
+    income_recs = list(RecurringIncome.objects.filter(user=user, next_due_date__lte=today, status="active"))
+    existing = _existing_dates(Income, income_recs)
+    new_incomes = []
+    for rec in income_recs:
+        dates = _due_dates(rec, today)
+        for due in dates:
+            # ✅ Prevent duplicates
+            if (rec.id, due) not in existing:
+                new_incomes.append(Income(
+                    source=rec.source,
+                    amount=rec.amount,
+                    date=due,
+                    category=rec.category,
+                    user=user,
+                    recurring=rec,  # Link transaction to recurring record
+                ))
+                total_income += Decimal(rec.amount)
+        scheduled = _advance(rec, dates[-1]) if dates else True
+        if not scheduled or (rec.end_date and rec.next_due_date > rec.end_date):
+            rec.status = "inactive"
+
+    # ---- Recurring Expenses (including pending retries) ----
+    expense_recs = list(
+        RecurringExpense.objects.filter(user=user, next_due_date__lte=today).exclude(status="inactive")
+    )
+    existing = _existing_dates(Expense, expense_recs)
+    occurrences = sorted(
+        ((due, rec.id, rec) for rec in expense_recs for due in _due_dates(rec, today)),
+        key=lambda o: o[:2],
+    )
+    new_expenses = []
+    blocked = set()
+    last_paid = {}
+    for due, rec_id, rec in occurrences:
+        if rec_id in blocked:
+            continue
+        if (rec_id, due) in existing:
+            last_paid[rec_id] = due
+        elif (total_expense + Decimal(rec.amount)) <= total_income:
+            new_expenses.append(Expense(
+                name=rec.name,
+                amount=rec.amount,
+                date=due,
+                category=rec.category,
+                user=user,
+                recurring=rec,  # Link transaction to recurring record
+            ))
+            total_expense += Decimal(rec.amount)
+            last_paid[rec_id] = due
+        else:
+            blocked.add(rec_id)
+
+    for rec in expense_recs:
+        scheduled = _advance(rec, last_paid[rec.id]) if rec.id in last_paid else True
+        if not scheduled or (rec.end_date and rec.next_due_date > rec.end_date):
+            rec.status = "inactive"
+        elif rec.id in blocked:
+            rec.status = "pending"
+        else:
+            rec.status = "active"
+
+    with transaction.atomic():
+        created = bulk_create_transactions(user, Income, new_incomes, recalculate=False)
+        created += bulk_create_transactions(user, Expense, new_expenses, recalculate=False)
+        RecurringIncome.objects.bulk_update(income_recs, ["next_due_date", "status"])
+        RecurringExpense.objects.bulk_update(expense_recs, ["next_due_date", "status"])
+        RecurringWatermark.objects.update_or_create(
+            user=user,
+            defaults={"last_processed": today, "has_pending": bool(blocked)},
+        )
+        if created:
+            after_bulk_write(user)
+    return created
+
+
+def ensure_recurring_processed(user):
+    """
+    Cheap per-request check used by the views: one primary-key lookup of the
+    watermark. The daily catch-up belongs to the process_recurring scheduler,
+    which stamps every user's watermark; the catch-up only runs here for a user
+    who has never been processed or whose watermark was reset to None because
+    a recurring record or (with expenses pending) income changed.
+    """
+    watermark = RecurringWatermark.objects.filter(pk=user.pk).first()
+    if watermark and watermark.last_processed:
+        return 0
+    return process_recurring_transactions(user)
+
+
+def reset_recurring_watermark(user_id, pending_only=False):
+    """
+    Force the next request (or scheduler run) to re-process this user's schedules.
+    With pending_only, only when recurring expenses are waiting for income.
+    """
+    watermarks = RecurringWatermark.objects.filter(pk=user_id)
+    if pending_only:
+        watermarks = watermarks.filter(has_pending=True)
+    watermarks.update(last_processed=None)
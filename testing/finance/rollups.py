@@ -0,0 +1,233 @@
+# finance/rollups.py
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from .models import Expense, Income, MonthlyRollup
+
+
+def kind_of(model):
+    return "income" if model is Income else "expense"
+
+
+def rollup_key(user_id, kind, day, category):
+    if isinstance(day, str):  # importers assign normalized "YYYY-MM-DD" strings
+        day = date.fromisoformat(day[:10])
+    return (user_id, kind, day.year, day.month, category or "")
+
+
+def _apply(key, total, count):
+    user_id, kind, year, month, category = key
+    lookup = dict(user_id=user_id, kind=kind, year=year, month=month, category=category)
+    updated = MonthlyRollup.objects.filter(**lookup).update(total=F("total") + total, count=F("count") + count)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            MonthlyRollup.objects.create(total=total, count=count, **lookup)
+    except IntegrityError:  # created concurrently, add to the other writer's row
+        MonthlyRollup.objects.filter(**lookup).update(total=F("total") + total, count=F("count") + count)
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Apply {rollup_key: [amount, count]} in one UPDATE per touched bucket.
+    Buckets that end up with no transactions are removed.
+    """
+    touched = []
+    for key, (total, count) in deltas.items():
+        if total or count:
+            _apply(key, Decimal(total), count)
+            touched.append(key)
+    for user_id, kind, year, month, category in touched:
+        MonthlyRollup.objects.filter(
+            user_id=user_id, kind=kind, year=year, month=month, category=category, count__lte=0
+        ).delete()
+
+
+def collect_deltas(model, objs, sign=1):
+    """Fold Income/Expense objects into rollup deltas."""
+    kind = kind_of(model)
+    deltas = defaultdict(lambda: [Decimal("0"), 0])
+    for obj in objs:
+        delta = deltas[rollup_key(obj.user_id, kind, obj.date, obj.category)]
+        delta[0] += sign * Decimal(str(obj.amount or 0))
+        delta[1] += sign
+    return deltas
+
+
+def queryset_deltas(queryset, sign=-1):
+    """Rollup deltas of every row in an Income/Expense queryset, from one grouped query."""
+    kind = kind_of(queryset.model)
+    rows = (
+        queryset.annotate(year=ExtractYear("date"), month=ExtractMonth("date"))
+        .values("user_id", "year", "month", "category")
+        .annotate(total=Sum("amount"), n=Count("id"))
+        .order_by()
+    )
+    return {
+        (row["user_id"], kind, row["year"], row["month"], row["category"] or ""): [
+            sign * (row["total"] or Decimal("0")), sign * row["n"]
+        ]
+        for row in rows
+    }
+
+
+def rebuild_rollups(user_id=None):
+    """Recompute rollup rows from the raw transaction tables (all users by default)."""
+    with transaction.atomic():
+        stale = MonthlyRollup.objects.all()
+        if user_id is not None:
+            stale = stale.filter(user_id=user_id)
+        stale.delete()
+
+        rows = []
+        for model in (Income, Expense):
+            qs = model.objects.all() if user_id is None else model.objects.filter(user_id=user_id)
+            for (uid, kind, year, month, category), (total, count) in queryset_deltas(qs, sign=1).items():
+                rows.append(MonthlyRollup(
+                    user_id=uid, kind=kind, year=year, month=month,
+                    category=category, total=total, count=count,
+                ))
+        MonthlyRollup.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+# -------------------------
+# Readers
+# -------------------------
+def _month_range(start_date=None, end_date=None):
+    q = Q()
+    if start_date:
+        q &= Q(year__gt=start_date.year) | Q(year=start_date.year, month__gte=start_date.month)
+    if end_date:
+        q &= Q(year__lt=end_date.year) | Q(year=end_date.year, month__lte=end_date.month)
+    return q
+
+
+def _month_end(day):
+    return day.replace(day=monthrange(day.year, day.month)[1])
+
+
+def split_range(start_date=None, end_date=None):
+    """
+    Split [start_date, end_date] into the months it covers completely, read
+    from the rollups, and the days of a partially covered first or last month,
+    which have to be summed from the raw rows.
+    Returns (Q over rollup year/month or None if no whole month is covered,
+    [(first_day, last_day), ...]).
+    """
+    partial = []
+    full_start, full_end = start_date, end_date
+    if start_date and start_date.day != 1:
+        first_month_end = _month_end(start_date)
+        partial.append((start_date, min(first_month_end, end_date) if end_date else first_month_end))
+        full_start = first_month_end + timedelta(days=1)
+    if end_date and end_date != _month_end(end_date):
+        last_month_start = end_date.replace(day=1)
+        if not partial or last_month_start > partial[0][1]:  # not the same month as the first one
+            partial.append((max(last_month_start, start_date) if start_date else last_month_start, end_date))
+        full_end = last_month_start - timedelta(days=1)
+    if full_start and full_end and full_start > full_end:
+        return None, partial
+    return _month_range(full_start, full_end), partial
+
+
+def _partial_rows(model, user, ranges, *fields):
+    """Raw Income/Expense sums over the given day ranges, grouped by `fields` (year, month, category)."""
+    days = Q()
+    for first, last in ranges:
+        days |= Q(date__range=(first, last))
+    return (
+        model.objects.filter(days, user=user)
+        .annotate(year=ExtractYear("date"), month=ExtractMonth("date"))
+        .values(*fields)
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+
+
+MODELS = {"income": Income, "expense": Expense}
+
+
+def monthly_totals(user, kind, start_date=None, end_date=None):
+    """[(year, month, total)] for months that have transactions in range, oldest first."""
+    months, partial = split_range(start_date, end_date)
+    totals = defaultdict(Decimal)
+    if months is not None:
+        rows = (
+            MonthlyRollup.objects.filter(months, user=user, kind=kind, count__gt=0)
+            .values("year", "month")
+            .annotate(total=Sum("total"))
+            .order_by()
+        )
+        for row in rows:
+            totals[(row["year"], row["month"])] += row["total"]
+    if partial:
+        for row in _partial_rows(MODELS[kind], user, partial, "year", "month"):
+            totals[(row["year"], row["month"])] += row["total"]
+    return [(year, month, total) for (year, month), total in sorted(totals.items())]
+
+
+def yearly_totals(user, kind):
+    """[(year, total)] for years that have transactions, oldest first."""
+    rows = (
+        MonthlyRollup.objects.filter(user=user, kind=kind, count__gt=0)
+        .values("year")
+        .annotate(total=Sum("total"))
+        .order_by("year")
+    )
+    return [(row["year"], row["total"]) for row in rows]
+
+
+def category_totals(user, kind, start_date=None, end_date=None):
+    """[(category, total)] over the dates in range, largest first."""
+    months, partial = split_range(start_date, end_date)
+    totals = defaultdict(Decimal)
+    if months is not None:
+        rows = (
+            MonthlyRollup.objects.filter(months, user=user, kind=kind, count__gt=0)
+            .values("category")
+            .annotate(total=Sum("total"))
+            .order_by()
+        )
+        for row in rows:
+            totals[row["category"]] += row["total"]
+    if partial:
+        for row in _partial_rows(MODELS[kind], user, partial, "category"):
+            totals[row["category"] or ""] += row["total"]
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def income_expense_by_month(user, start_date=None, end_date=None):
+    """
+    {(year, month): (income, expense)} over every month the range touches,
+    whole months included (callers pass month starts), from one query.
+    """
+    rows = (
+        MonthlyRollup.objects.filter(_month_range(start_date, end_date), user=user)
+        .values("year", "month")
+        .annotate(
+            income=Sum("total", filter=Q(kind="income")),
+            expense=Sum("total", filter=Q(kind="expense")),
+        )
+        .order_by()
+    )
+    return {
+        (row["year"], row["month"]): (row["income"] or Decimal("0"), row["expense"] or Decimal("0"))
+        for row in rows
+    }
+
+
+def totals_before_month(user, year, month):
+    """(income, expense) of every month strictly before year-month."""
+    totals = MonthlyRollup.objects.filter(
+        Q(year__lt=year) | Q(year=year, month__lt=month), user=user
+    ).aggregate(
+        income=Sum("total", filter=Q(kind="income")),
+        expense=Sum("total", filter=Q(kind="expense")),
+    )
+    return totals["income"] or Decimal("0"), totals["expense"] or Decimal("0")
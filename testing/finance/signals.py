@@ -0,0 +1,89 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .ledger import apply_delta, ledger_is_suspended
+from .models import Expense, Income, RecurringExpense, RecurringIncome
+from .recurring import reset_recurring_watermark
+from .rollups import apply_rollup_deltas, collect_deltas, kind_of, rollup_key
+
+
+# -------------------------
+# Recurring schedule changes
+# -------------------------
+@receiver(post_save, sender=RecurringIncome)
+@receiver(post_save, sender=RecurringExpense)
+def recurring_saved(sender, instance, **kwargs):
+    # New or edited schedules may have occurrences due before the next scheduler run
+    reset_recurring_watermark(instance.user_id)
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_delete, sender=Income)
+def income_changed(sender, instance, **kwargs):
+    # Expenses left pending for lack of income are retried on the next run, not on every view
+    reset_recurring_watermark(instance.user_id, pending_only=True)
+
+
+# -------------------------
+# Balance ledger and monthly rollups
+# -------------------------
+def _ledger_delta(sender, amount, count=0):
+    amount = Decimal(str(amount or 0))
+    if sender is Income:
+        return {"income": amount, "income_count": count}
+    return {"expense": amount, "expense_count": count}
+
+
+@receiver(pre_save, sender=Income)
+@receiver(pre_save, sender=Expense)
+def track_old_amount(sender, instance, **kwargs):
+    instance._ledger_old = None
+    if instance.pk and not ledger_is_suspended():
+        instance._ledger_old = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("user_id", "amount", "date", "category")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+def transaction_saved(sender, instance, created, **kwargs):
+    if ledger_is_suspended():
+        return
+    kind = kind_of(sender)
+    amount = Decimal(str(instance.amount or 0))
+    rollups = defaultdict(lambda: [Decimal("0"), 0])
+    count = 1
+    old = getattr(instance, "_ledger_old", None)
+    if old:
+        old_user_id, old_amount, old_date, old_category = old
+        if old_user_id != instance.user_id:
+            apply_delta(old_user_id, **_ledger_delta(sender, -old_amount, -1))
+        else:
+            amount -= old_amount
+            count = 0
+        old_bucket = rollups[rollup_key(old_user_id, kind, old_date, old_category)]
+        old_bucket[0] -= old_amount
+        old_bucket[1] -= 1
+    apply_delta(instance.user_id, **_ledger_delta(sender, amount, count))
+
+    bucket = rollups[rollup_key(instance.user_id, kind, instance.date, instance.category)]
+    bucket[0] += Decimal(str(instance.amount or 0))
+    bucket[1] += 1
+    apply_rollup_deltas(rollups)
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+def transaction_deleted(sender, instance, origin=None, **kwargs):
+    # When the user account itself is deleted, its ledger and rollups go with it
+    origin_model = getattr(origin, "model", type(origin))
+    if origin is not None and origin_model._meta.label == settings.AUTH_USER_MODEL:
+        return
+    if not ledger_is_suspended():
+        apply_delta(instance.user_id, **_ledger_delta(sender, -instance.amount, -1))
+        apply_rollup_deltas(collect_deltas(sender, [instance], sign=-1))
@@ -0,0 +1,242 @@
+# finance/statement_import.py
+import logging
+import re
+from collections import Counter
+from decimal import Decimal
+from django.db import transaction
+from budget.utils import budget_warnings
+from .bulk import after_bulk_write, bulk_create_transactions, get_import_batch_size
+from .csv_stream import ImportAborted, batched, stream_csv
+from .ledger import get_totals
+from .models import Expense, Income
+from .utils import normalize_date, normalize_headers, sniff_date_column
+from ml.phrase_index import hit_rate_summary
+from ml.registry import (
+    classify_expense as ml_classify_expense,
+    classify_income as ml_classify_income,
+)
+
+logger = logging.getLogger(__name__)
+
+INCOME_WORDS = ["salary", "interest", "refund", "bonus", "deposit", "credit"]
+EXPENSE_WORDS = ["upi", "payment", "transfer", "withdrawal", "atm", "rent", "emi", "bill", "debit"]
+
+
+def clean_amt(val):
+    val = re.sub(r"[^\d.\-]", "", str(val))
+    return Decimal(val) if val else Decimal("0")
+
+
+def detect_columns(fieldnames):
+    """
+    🔍 Detect the columns of any bank CSV format (Indian or international).
+    Raises ImportAborted when the file cannot be a bank statement.
+    """
+    if not fieldnames:
+        raise ImportAborted("CSV has no headers.")
+
+    field_map = normalize_headers(fieldnames)
+
+    def find(*keys):
+        return next((f for f in fieldnames if any(k in f.lower() for k in keys)), None)
+
+    columns = {
+        "date": field_map.get("date") or find("date"),
+        "debit": find("debit", "(dr"),
+        "credit": find("credit", "(cr"),
+        "withdrawal": find("withdrawal"),
+        "deposit": find("deposit"),
+        "amount": find("amount"),
+        "type": find("type"),
+        "description": find("description", "details", "narration", "memo", "remarks"),
+    }
+
+    if not columns["date"]:
+        raise ImportAborted("Date column not found — invalid bank statement.")
+    if not any(columns[k] for k in ("debit", "credit", "withdrawal", "deposit", "amount")):
+        raise ImportAborted("No recognizable amount columns found.")
+    return columns
+
+
+def parse_row(row, columns, parse_date=normalize_date):
+    """
+    (txn_type, date_str, description, amount) for one statement row, with
+    txn_type "income" or "expense", or None if the row has to be skipped.
+    parse_date is normally the column's DateColumnParser.
+    """
+    date_str = parse_date(row.get(columns["date"]))
+    if not date_str:
+        return None
+
+    description = str(row.get(columns["description"]) or "").strip()
+    if not description:
+        description = next((str(v).strip() for v in row.values() if v), "")
+
+    amount = Decimal("0")
+    txn_type = "unknown"
+    debit, credit = columns["debit"], columns["credit"]
+    withdrawal, deposit = columns["withdrawal"], columns["deposit"]
+
+    # Debit / Credit
+    if debit and row.get(debit):
+        amount = clean_amt(row[debit])
+        if amount < 0:
+            amount = abs(amount)
+            txn_type = "income"
+        else:
+            txn_type = "expense"
+    elif credit and row.get(credit):
+        amount = clean_amt(row[credit])
+        if amount < 0:
+            amount = abs(amount)
+            txn_type = "expense"
+        else:
+            txn_type = "income"
+    elif withdrawal and row.get(withdrawal):
+        amount = clean_amt(row[withdrawal])
+        txn_type = "expense"
+    elif deposit and row.get(deposit):
+        amount = clean_amt(row[deposit])
+        txn_type = "income"
+    elif columns["type"] and columns["amount"]:
+        raw_type = str(row.get(columns["type"], "")).strip().upper()
+        amount = clean_amt(row.get(columns["amount"]))
+        if raw_type in ("CREDIT", "CR", "INCOME"):
+            txn_type = "income"
+        elif raw_type in ("DEBIT", "DR", "EXPENSE"):
+            txn_type = "expense"
+
+    # Fallback — detect from description
+    desc_lower = description.lower()
+    if txn_type == "unknown" and amount > 0:
+        if any(w in desc_lower for w in INCOME_WORDS):
+            txn_type = "income"
+        elif any(w in desc_lower for w in EXPENSE_WORDS):
+            txn_type = "expense"
+
+    if amount == 0 or txn_type == "unknown":
+        return None
+    if txn_type == "expense" and amount <= 0:
+        logger.warning(f"⚠️ Skipped non-positive expense: {description} ({amount})")
+        return None
+    return txn_type, date_str, description, amount
+
+
+def classify_batch(classify, rows, sources):
+    """Categories for parsed rows' descriptions, counting their sources (keyword, exact, near, model)."""
+    results = classify([description for _, _, description, _ in rows])
+    sources.update(source for _, source in results)
+    return [category for category, _ in results]
+
+
+def iter_statement(job, count=False):
+    """
+    Stream the parsed rows of a job's file. With count=True the job's
+    rows_parsed/rows_skipped counters are updated (and saved every batch).
+    """
+    batch_size = get_import_batch_size()
+    with job.file.open("rb") as f:
+        reader = stream_csv(f, errors="ignore")
+        columns = detect_columns(reader.fieldnames)
+        rows, parse_date = sniff_date_column(reader, columns["date"])
+        for row in rows:
+            try:
+                parsed = parse_row(row, columns, parse_date)
+            except Exception as e:
+                logger.warning(f"⚠️ Skipped row: {e}")
+                parsed = None
+            if count:
+                job.rows_parsed += 1
+                job.rows_skipped += parsed is None
+                if job.rows_parsed % batch_size == 0:
+                    job.save_progress()
+            if parsed is not None:
+                yield parsed
+    if count:
+        job.save_progress()
+
+
+def import_statement(job):
+    """
+    🌍 Universal AI-Powered Bank Statement Import, run by an ImportJob.
+
+    ✅ Accepts any bank CSV format (Indian or international)
+    ✅ Detects income vs expense automatically
+    ✅ Normalizes any date format (sniffed once per file, see DateColumnParser)
+    ✅ Predicts income & expense categories using AI
+    ✅ Rejects the whole file if its expenses exceed available income
+
+    The file is read twice as a stream: a cheap validation pass counts rows
+    (the progress the upload page shows) and checks the totals before anything
+    is written, then the import pass categorizes and bulk-writes one batch at a
+    time inside a single transaction, so a failure part way through (a missing
+    model, the ML sidecar, the database) leaves nothing imported and the file
+    can simply be uploaded again. Messages go to job.messages.
+    """
+    user = job.user
+
+    # 1️⃣ Validation pass: counts and the precheck, no writes
+    total_income, total_expense = get_totals(user)
+    new_income = new_expense = Decimal("0")
+    for txn_type, _, _, amount in iter_statement(job, count=True):
+        if txn_type == "income":
+            new_income += amount
+        else:
+            new_expense += amount
+
+    if (total_expense + new_expense) > (total_income + new_income):
+        raise ImportAborted(
+            "❌ Bank statement upload cancelled — total expenses in file exceed total available income. "
+            "Please record sufficient income before uploading this file."
+        )
+
+    # 2️⃣ Import pass: one batched prediction and bulk write per batch, all or nothing
+    affected_categories = set()
+    sources = Counter(job.category_sources)
+    income_imported = expense_imported = 0
+    with transaction.atomic():
+        for batch in batched(iter_statement(job), get_import_batch_size()):
+            income_rows = [r for r in batch if r[0] == "income"]
+            expense_rows = [r for r in batch if r[0] == "expense"]
+            if income_rows:
+                categories = classify_batch(ml_classify_income, income_rows, sources)
+                incomes = [
+                    Income(user=user, date=date_str, source=description[:100], amount=amount, category=category)
+                    for (_, date_str, description, amount), category in zip(income_rows, categories)
+                ]
+                income_imported += bulk_create_transactions(user, Income, incomes, recalculate=False)
+            if expense_rows:
+                categories = classify_batch(ml_classify_expense, expense_rows, sources)
+                expenses = [
+                    Expense(user=user, date=date_str, name=description[:100], amount=amount, category=category)
+                    for (_, date_str, description, amount), category in zip(expense_rows, categories)
+                ]
+                expense_imported += bulk_create_transactions(user, Expense, expenses, recalculate=False)
+                affected_categories.update(categories)
+        if income_imported or expense_imported:
+            after_bulk_write(user)  # savings reallocated once for the whole statement, on commit
+
+    job.income_imported, job.expense_imported = income_imported, expense_imported
+    job.category_sources = dict(sources)
+    job.save_progress()
+
+    # 📊 Budget warnings once per affected category, each distinct message once
+    shown_warnings = set()
+    for category in sorted(affected_categories):
+        for level, text in budget_warnings(user, category):
+            if text not in shown_warnings:
+                shown_warnings.add(text)
+                job.add_message(level, text)
+
+    # ✅ If everything was skipped
+    if job.rows_imported == 0:
+        job.messages = []
+        job.add_message("warning", "⚠️ No transactions were imported. All rows were skipped due to validation or parsing rules.")
+
+    if sources:
+        job.add_message("info", hit_rate_summary(sources))
+
+    job.add_message(
+        "success",
+        f"✅ Upload complete! Income: {job.income_imported}, Expense: {job.expense_imported}, Skipped: {job.rows_skipped}"
+    )
@@ -1,3 +1,425 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from finance.bulk import bulk_create_transactions, bulk_delete_transactions
+from finance.csv_stream import iter_text_lines, stream_csv
+from finance import import_jobs
+from finance.import_jobs import collect_finished_jobs, run_job
+from finance.ledger import get_balance, get_totals, rebuild_balance
+from finance.models import Expense, ImportJob, Income, MonthlyRollup, RecurringExpense, RecurringWatermark
+from finance.pagination import paginate_transactions
+from finance.recurring import ensure_recurring_processed
+from finance.dashboard import get_dashboard_data
+from finance.rollups import category_totals, monthly_totals, rebuild_rollups
+from finance.utils import DateColumnParser, next_occurrence, normalize_date, occurrence_list, sniff_date_column
 
-# Create your tests here.
+User = get_user_model()
+
+
+class DashboardQueryCountTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.client.force_login(self.user)
+
+    def add_transactions(self, count):
+        today = date.today()
+        categories = [c for c, _ in Expense.CATEGORY_CHOICES]
+        incomes = [
+            Income(user=self.user, source=f"Job {i}", amount=Decimal("100"), date=today - timedelta(days=i % 300), category="Salary")
+            for i in range(count)
+        ]
+        expenses = [
+            Expense(user=self.user, name=f"Item {i}", amount=Decimal("10"), date=today - timedelta(days=i % 300), category=categories[i % len(categories)])
+            for i in range(count)
+        ]
+        bulk_create_transactions(self.user, Income, incomes, recalculate=False)
+        bulk_create_transactions(self.user, Expense, expenses, recalculate=False)
+
+    def count_dashboard_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_does_not_grow_with_data(self):
+        self.add_transactions(3)
+        self.client.get(reverse("dashboard"))  # first visit builds the ledger and recurring watermark
+        small, _ = self.count_dashboard_queries()
+
+        self.add_transactions(500)
+        large, response = self.count_dashboard_queries()
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 12)
+        self.assertEqual(response.context["total_income"], Decimal("50300.00"))
+        self.assertEqual(response.context["total_expense"], Decimal("5030.00"))
+        self.assertEqual(sum(response.context["income_data"]), 50300.0)
+
+
+class RecurringPendingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        today = date.today()
+        RecurringExpense.objects.create(
+            user=self.user, name="Rent", amount=Decimal("500"), category="Housing & Utilities",
+            frequency="monthly", start_date=today, next_due_date=today,
+        )
+        ensure_recurring_processed(self.user)
+
+    def test_pending_expense_waits_for_income(self):
+        self.assertTrue(RecurringWatermark.objects.get(pk=self.user.pk).has_pending)
+        with patch("finance.recurring.process_recurring_transactions") as process:
+            ensure_recurring_processed(self.user)
+        process.assert_not_called()
+
+        Income.objects.create(user=self.user, source="Job", amount=Decimal("1000"), date=date.today(), category="Salary")
+        ensure_recurring_processed(self.user)
+        self.assertEqual(Expense.objects.filter(user=self.user, name="Rent").count(), 1)
+        self.assertFalse(RecurringWatermark.objects.get(pk=self.user.pk).has_pending)
+
+    def test_scheduler_stamps_users_with_nothing_due(self):
+        idle = User.objects.create_user(username="idle", password="password123")
+        stale = User.objects.create_user(username="stale", password="password123")
+        RecurringWatermark.objects.create(user=stale, last_processed=date.today() - timedelta(days=3))
+
+        call_command("process_recurring", stdout=StringIO())
+
+        for user in (idle, stale):
+            self.assertEqual(RecurringWatermark.objects.get(pk=user.pk).last_processed, date.today())
+            with patch("finance.recurring.process_recurring_transactions") as process:
+                ensure_recurring_processed(user)
+            process.assert_not_called()
+
+
+class LedgerConsistencyTests(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="password123")
+        self.bob = User.objects.create_user(username="bob", password="password123")
+
+    def snapshot(self):
+        balances = {}
+        for user in (self.alice, self.bob):
+            b = get_balance(user)
+            balances[user.pk] = (b.total_income, b.total_expense, b.income_count, b.expense_count)
+        rollups = sorted(MonthlyRollup.objects.values_list("user_id", "kind", "year", "month", "category", "total", "count"))
+        return balances, rollups
+
+    def assertMatchesRebuild(self):
+        maintained = self.snapshot()
+        for user in (self.alice, self.bob):
+            rebuild_balance(user.pk)
+        rebuild_rollups()
+        self.assertEqual(maintained, self.snapshot())
+
+    def test_incremental_updates_match_a_rebuild(self):
+        # Savings reallocations scheduled by the writes run, as they would on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in (self.alice, self.bob):
+                get_balance(user)  # ledger rows exist, so every change below is a delta
+            salary = Income.objects.create(user=self.alice, source="Job", amount=Decimal("1000"), date=date(2024, 1, 31), category="Salary")
+            rent = Expense.objects.create(user=self.alice, name="Rent", amount=Decimal("400"), date=date(2024, 1, 5), category="Housing & Utilities")
+            food = Expense.objects.create(user=self.alice, name="Lunch", amount=Decimal("12.50"), date=date(2024, 1, 6), category="Food & Dining")
+            self.assertMatchesRebuild()
+
+            salary.amount = Decimal("1200")
+            salary.date = date(2024, 2, 1)
+            salary.save()
+            rent.user = self.bob
+            rent.save()
+            food.amount = Decimal("15")
+            food.category = "Miscellaneous"
+            food.save()
+            self.assertMatchesRebuild()
+
+            food.delete()
+            bulk_create_transactions(self.bob, Income, [
+                Income(user=self.bob, source=f"Gig {i}", amount=Decimal("50"), date=date(2024, 1 + i % 3, 10), category="Freelance")
+                for i in range(6)
+            ])
+            bulk_create_transactions(self.alice, Expense, [
+                Expense(user=self.alice, name=f"Bus {i}", amount=Decimal("2.25"), date=date(2024, 2, 1 + i), category="Transportation")
+                for i in range(4)
+            ])
+            self.assertMatchesRebuild()
+
+            bulk_delete_transactions(Income.objects.filter(user=self.bob, date__month=2))
+            bulk_delete_transactions(Expense.objects.filter(name__startswith="Bus", date__day__lte=2))
+            self.assertMatchesRebuild()
+            self.assertEqual(get_totals(self.alice), (Decimal("1200"), Decimal("4.50")))
+            self.assertEqual(get_totals(self.bob), (Decimal("200"), Decimal("400")))
+
+
+class RollupRangeTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="rollups", password="password123")
+        expenses = [
+            Expense(user=self.user, name=name, amount=Decimal(amount), date=day, category=category)
+            for name, amount, day, category in [
+                ("Early Jan", "1", date(2024, 1, 10), "Food & Dining"),
+                ("Late Jan", "2", date(2024, 1, 20), "Food & Dining"),
+                ("Early Feb", "4", date(2024, 2, 5), "Transportation"),
+                ("Late Feb", "8", date(2024, 2, 20), "Transportation"),
+                ("March", "16", date(2024, 3, 15), "Education"),
+            ]
+        ]
+        bulk_create_transactions(self.user, Expense, expenses, recalculate=False)
+        Income.objects.create(user=self.user, source="Salary", amount=Decimal("32"), date=date(2024, 2, 28), category="Salary")
+
+    def test_mid_month_range_counts_only_days_in_range(self):
+        start, end = date(2024, 1, 15), date(2024, 2, 10)
+        self.assertEqual(
+            monthly_totals(self.user, "expense", start, end),
+            [(2024, 1, Decimal("2")), (2024, 2, Decimal("4"))],
+        )
+        self.assertEqual(
+            category_totals(self.user, "expense", start, end),
+            [("Transportation", Decimal("4")), ("Food & Dining", Decimal("2"))],
+        )
+        dashboard = get_dashboard_data(self.user, start, end)
+        self.assertEqual(dashboard["months"], ["2024-01", "2024-02"])
+        self.assertEqual(dashboard["expense_data"], [2.0, 4.0])
+        self.assertEqual(dashboard["category_values"], [4.0, 2.0])
+        # Inside a single month
+        self.assertEqual(monthly_totals(self.user, "expense", date(2024, 2, 1), date(2024, 2, 19)), [(2024, 2, Decimal("4"))])
+
+    def test_whole_and_partial_months_combine(self):
+        self.assertEqual(
+            monthly_totals(self.user, "expense", date(2024, 1, 15), date(2024, 3, 31)),
+            [(2024, 1, Decimal("2")), (2024, 2, Decimal("12")), (2024, 3, Decimal("16"))],
+        )
+        self.assertEqual(
+            category_totals(self.user, "expense", date(2024, 2, 1), date(2024, 3, 10)),
+            [("Transportation", Decimal("12"))],
+        )
+        self.assertEqual(sum(t for _, _, t in monthly_totals(self.user, "expense")), Decimal("31"))
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        today = date.today()
+        expenses = [
+            Expense(user=self.user, name=f"Item {i}", amount=Decimal("1"), date=today - timedelta(days=i // 3), category="Financial")
+            for i in range(45)
+        ]
+        bulk_create_transactions(self.user, Expense, expenses, recalculate=False)
+        self.queryset = Expense.objects.filter(user=self.user)
+
+    def get_page(self, **params):
+        request = RequestFactory().get("/", params)
+        return paginate_transactions(self.queryset, request, self.user.balance.expense_count, per_page=10)[1]
+
+    def test_cursor_pages_match_offset_pages(self):
+        page = self.get_page()
+        seen = []
+        while True:
+            seen.extend(e.id for e in page.object_list)
+            offset_page = self.get_page(page=page.number)
+            self.assertEqual([e.id for e in page.object_list], [e.id for e in offset_page.object_list])
+            if not page.next_cursor:
+                break
+            page = self.get_page(cursor=page.next_cursor)
+
+        self.assertEqual(page.number, 5)
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+
+        previous = self.get_page(cursor=page.previous_cursor)
+        self.assertEqual(previous.number, 4)
+        self.assertEqual([e.id for e in previous.object_list], seen[30:40])
+
+
+class StreamingCSVTests(TestCase):
+
+    def upload(self, content, chunk_size=3):
+        upload = SimpleUploadedFile("statement.csv", content.encode("utf-8"), content_type="text/csv")
+        upload.DEFAULT_CHUNK_SIZE = chunk_size  # split multi-byte characters and CRLFs across chunks
+        return upload
+
+    def test_lines_survive_chunk_boundaries(self):
+        content = 'Date,Name,Amount\r\n2024-01-05,"Café ₹ bill\r\nsecond line",100\r\n2024-01-06,Tea,5'
+        self.assertEqual("".join(iter_text_lines(self.upload(content))), content)
+        rows = list(stream_csv(self.upload(content)))
+        self.assertEqual([r["Name"] for r in rows], ["Café ₹ bill\r\nsecond line", "Tea"])
+
+    @override_settings(FINANCE_IMPORT_BATCH_SIZE=2)
+    def test_overspending_rolls_back_written_batches(self):
+        user = User.objects.create_user(username="streamer", password="password123")
+        self.client.force_login(user)
+        Income.objects.create(user=user, date=date(2024, 1, 1), source="Salary", amount=Decimal("100"), category="Salary")
+        lines = ["Date,Name,Amount,Category"] + [f"2024-01-0{d},Item {d},30,Food" for d in range(2, 7)]
+        upload = self.upload("\n".join(lines), chunk_size=16)
+
+        self.client.post(reverse("upload_expense_csv"), {"csv_file": upload})
+
+        # The 4th row overspends after two batches were written: nothing is kept
+        self.assertFalse(Expense.objects.filter(user=user).exists())
+
+
+@override_settings(FINANCE_IMPORT_MODE="worker")
+class ImportJobTests(TestCase):
+
+    def setUp(self):
+        self.import_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.import_dir, ignore_errors=True)
+        storage = override_settings(FINANCE_IMPORT_DIR=self.import_dir)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.user = User.objects.create_user(username="importer", password="password123")
+        self.client.force_login(self.user)
+
+    def upload(self, content):
+        csv_file = SimpleUploadedFile("statement.csv", content.encode("utf-8"), content_type="text/csv")
+        response = self.client.post(
+            reverse("upload_bank_statement"), {"csv_file": csv_file}, HTTP_ACCEPT="application/json"
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_upload_returns_job_and_progress_is_reported(self):
+        queued = self.upload("Date,Description,Debit,Credit\n2024-01-05,ATM withdrawal,500,\nnot a date,x,1,\n")
+        self.assertEqual(self.client.get(queued["status_url"]).json()["status"], "queued")
+        self.assertTrue(ImportJob.objects.get(pk=queued["job_id"]).file.path.startswith(self.import_dir))
+
+        self.assertTrue(run_job(queued["job_id"]))
+
+        status = self.client.get(queued["status_url"]).json()
+        self.assertEqual(status["status"], "failed")  # expenses exceed the (empty) income
+        self.assertEqual((status["rows_parsed"], status["rows_skipped"], status["rows_imported"]), (2, 1, 0))
+        self.assertIn("exceed total available income", status["messages"][-1]["message"])
+        self.assertFalse(Expense.objects.filter(user=self.user).exists())
+        self.assertFalse(run_job(queued["job_id"]))  # already ran
+
+    def test_category_sources_are_reported(self):
+        queued = self.upload(
+            "Date,Description,Debit,Credit\n"
+            "2024-01-02,YouTube Shorts fund payout,,1000\n"
+            "2024-01-03,Youtube shorts fund payouts,,500\n"
+            "2024-01-05,Startup bootcamp,200,\n"
+            "2024-01-06,Pharmacy run,100,\n"
+        )
+        self.assertTrue(run_job(queued["job_id"]))
+
+        status = self.client.get(queued["status_url"]).json()
+        self.assertEqual(status["status"], "done")
+        self.assertEqual(status["category_sources"], {"exact": 2, "near": 1, "keyword": 1})
+        self.assertIn("3 of 4 (75%) matched known phrases", status["messages"][-2]["message"])
+        self.assertEqual(
+            set(Expense.objects.filter(user=self.user).values_list("category", flat=True)),
+            {"Education", "Health & Fitness"},
+        )
+
+    @override_settings(FINANCE_IMPORT_BATCH_SIZE=1)
+    def test_failed_batch_leaves_nothing_imported(self):
+        queued = self.upload("Date,Description,Debit,Credit\n2024-01-02,Salary,,1000\n2024-01-05,Groceries,200,\n")
+        with patch("finance.statement_import.ml_classify_income", return_value=[("Salary", "keyword")]), \
+                patch("finance.statement_import.ml_classify_expense", side_effect=TimeoutError("sidecar timed out")), \
+                self.assertLogs("finance.import_jobs", "ERROR"):
+            self.assertTrue(run_job(queued["job_id"]))
+
+        status = self.client.get(queued["status_url"]).json()
+        self.assertEqual(status["status"], "failed")
+        self.assertEqual((status["rows_parsed"], status["rows_imported"]), (2, 0))
+        self.assertFalse(Income.objects.filter(user=self.user).exists())
+        self.assertEqual(get_totals(self.user), (Decimal("0"), Decimal("0")))
+
+    def test_interrupted_running_job_is_failed(self):
+        job = ImportJob.objects.create(
+            user=self.user, status="running", started_at=timezone.now() - timedelta(hours=2),
+        )
+        fresh = ImportJob.objects.create(user=self.user, status="running", started_at=timezone.now())
+
+        finished, active = collect_finished_jobs(self.user)
+
+        self.assertEqual([j.pk for j in finished], [job.pk])
+        self.assertEqual(active.pk, fresh.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn("nothing was imported", job.messages[-1]["message"])
+
+    @override_settings(FINANCE_IMPORT_MODE="thread")
+    def test_thread_pool_resumes_queued_jobs_on_start(self):
+        queued = [ImportJob.objects.create(user=self.user).pk for _ in range(2)]
+        with patch.object(import_jobs, "_executor", None), \
+                patch.object(import_jobs, "_run_in_thread") as run_in_thread:
+            executor = import_jobs._get_executor()
+            executor.shutdown(wait=True)
+        self.assertEqual(sorted(c.args[0] for c in run_in_thread.call_args_list), queued)
+
+    def test_status_is_private(self):
+        job = ImportJob.objects.create(user=User.objects.create_user(username="other", password="pw"))
+        response = self.client.get(reverse("import_job_status", args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class OccurrenceTests(SimpleTestCase):
+
+    def test_monthly_from_month_end_does_not_drift(self):
+        self.assertEqual(
+            occurrence_list(date(2024, 1, 31), "monthly", window_end=date(2024, 4, 30)),
+            [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)],
+        )
+        self.assertEqual(next_occurrence(date(2023, 1, 31), "monthly", date(2023, 1, 31)), date(2023, 2, 28))
+        self.assertEqual(next_occurrence(date(2023, 1, 31), "monthly", date(2023, 2, 28)), date(2023, 3, 31))
+
+    def test_yearly_from_leap_day(self):
+        self.assertEqual(
+            occurrence_list(date(2024, 2, 29), "yearly", window_end=date(2028, 12, 31)),
+            [date(2024, 2, 29), date(2025, 2, 28), date(2026, 2, 28), date(2027, 2, 28), date(2028, 2, 29)],
+        )
+        self.assertEqual(next_occurrence(date(2024, 2, 29), "yearly", date(2024, 2, 29)), date(2025, 2, 28))
+
+    def test_windows_starting_mid_step(self):
+        self.assertEqual(
+            occurrence_list(date(2024, 1, 1), "weekly", window_start=date(2024, 1, 3), window_end=date(2024, 1, 22)),
+            [date(2024, 1, 8), date(2024, 1, 15), date(2024, 1, 22)],
+        )
+        self.assertEqual(
+            occurrence_list(date(2024, 1, 1), "daily", window_start=date(2024, 1, 5), window_end=date(2024, 1, 7)),
+            [date(2024, 1, 5), date(2024, 1, 6), date(2024, 1, 7)],
+        )
+        self.assertEqual(
+            occurrence_list(date(2024, 1, 31), "quarterly", window_start=date(2024, 5, 1), window_end=date(2024, 12, 31)),
+            [date(2024, 7, 31), date(2024, 10, 31)],
+        )
+        self.assertEqual(next_occurrence(date(2024, 1, 1), "weekly", date(2024, 1, 10)), date(2024, 1, 15))
+
+    def test_end_date_cuts_off_the_schedule(self):
+        self.assertEqual(
+            occurrence_list(date(2024, 1, 15), "monthly", end_date=date(2024, 3, 20), window_end=date(2024, 12, 31)),
+            [date(2024, 1, 15), date(2024, 2, 15), date(2024, 3, 15)],
+        )
+        self.assertEqual(occurrence_list(date(2024, 1, 1), "daily", end_date=date(2023, 12, 31), window_end=date(2024, 1, 5)), [])
+
+
+class DateSniffingTests(SimpleTestCase):
+
+    def test_column_format_is_applied_to_every_row(self):
+        rows, parse_date = sniff_date_column(iter([{"Date": "12/25/2024"}, {"Date": "01/05/2024"}]), "Date")
+        self.assertEqual([parse_date(row["Date"]) for row in rows], ["2024-12-25", "2024-01-05"])
+
+    def test_unparseable_rows_fall_back_to_normalize_date(self):
+        parse_date = DateColumnParser(["25.12.2024", "01.05.2024"])
+        self.assertEqual(parse_date.format, "%d/%m/%Y")
+        self.assertEqual(parse_date("01-05-2024"), "2024-05-01")
+        self.assertEqual(parse_date("5th Jan 2024"), normalize_date("5th Jan 2024"))
+        self.assertEqual(parse_date("45234"), "2023-11-04")  # Excel serial
+        self.assertIsNone(parse_date(""))
@@ -28,6 +28,7 @@ urlpatterns = [
     path('upload_expense_csv/', views.upload_expense_csv, name='upload_expense_csv'),
     path('upload_income_csv/', views.upload_income_csv, name='upload_income_csv'),
     path('upload_bank_statement/', views.upload_bank_statement, name='upload_bank_statement'),
+    path('import_jobs/<int:job_id>/', views.import_job_status, name='import_job_status'),
     path("income/bulk-delete/", views.bulk_delete_income, name="bulk_delete_income"),
     path("income/delete-selected/", views.delete_selected_incomes, name="delete_selected_incomes"),
     path("expense/bulk-delete/", views.bulk_delete_expense, name="bulk_delete_expense"),
@@ -1,8 +1,11 @@
 # utils.py
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import chain, islice
 from dateutil.relativedelta import relativedelta
 from dateutil import parser
 import logging,re
+import numpy as np
 from decimal import Decimal
 
 logger = logging.getLogger(__name__)
@@ -22,6 +25,73 @@ def get_next_due_date(current_date, frequency):
         return current_date + relativedelta(years=1)
     return current_date
 
+# Step of each recurring frequency: (count, unit) with unit "D" (days) or "M" (months)
+FREQUENCY_STEPS = {
+    "daily": (1, "D"),
+    "weekly": (7, "D"),
+    "monthly": (1, "M"),
+    "quarterly": (3, "M"),
+    "biannually": (6, "M"),
+    "yearly": (12, "M"),
+    "annually": (12, "M"),
+}
+
+def _month_index(d):
+    """Months since 1970-01, the integer value of numpy's datetime64[M]."""
+    return (d.year - 1970) * 12 + d.month - 1
+
+def occurrence_dates(start_date, frequency, end_date=None, window_start=None, window_end=None):
+    """
+    Return every occurrence of a schedule anchored at start_date, in one call.
+
+    Occurrences are start_date + k * step (k = 0, 1, ...), restricted to
+    [window_start, window_end] and to end_date. Monthly steps are computed from the
+    anchor, clamping to the month's last day exactly as start_date + relativedelta(months=k)
+    does, so a schedule starting on the 31st stays on month-ends. Returns a sorted
+    numpy datetime64[D] array.
+    """
+    window_start = max(window_start or start_date, start_date)
+    if end_date and (window_end is None or end_date < window_end):
+        window_end = end_date
+    if window_end is None:
+        raise ValueError("occurrence_dates() needs window_end or end_date")
+    if window_end < window_start:
+        return np.array([], dtype="datetime64[D]")
+
+    anchor = np.datetime64(start_date, "D")
+    lo = np.datetime64(window_start, "D")
+    hi = np.datetime64(window_end, "D")
+
+    step = FREQUENCY_STEPS.get((frequency or "").lower())
+    if step is None:
+        # Unknown frequency: a one-off occurrence on start_date
+        return np.array([anchor] if lo <= anchor <= hi else [], dtype="datetime64[D]")
+
+    count, unit = step
+    if unit == "D":
+        k_lo = -(-int((lo - anchor).astype(int)) // count)  # ceil division
+        k_hi = int((hi - anchor).astype(int)) // count
+        return anchor + np.arange(k_lo, k_hi + 1) * count
+
+    # Month-based: compute each target month, then clamp the anchor day to its length
+    m0 = _month_index(start_date)
+    k_lo = max((_month_index(window_start) - m0) // count - 1, 0)
+    k_hi = (_month_index(window_end) - m0) // count + 1
+    months = (m0 + np.arange(k_lo, k_hi + 1) * count).astype("datetime64[M]")
+    month_start = months.astype("datetime64[D]")
+    days_in_month = ((months + 1).astype("datetime64[D]") - month_start).astype(int)
+    dates = month_start + (np.minimum(start_date.day, days_in_month) - 1)
+    return dates[(dates >= lo) & (dates <= hi)]
+
+def occurrence_list(start_date, frequency, end_date=None, window_start=None, window_end=None):
+    """occurrence_dates() as a list of datetime.date objects."""
+    return occurrence_dates(start_date, frequency, end_date, window_start, window_end).astype(object).tolist()
+
+def next_occurrence(start_date, frequency, after):
+    """First occurrence of the schedule strictly after the given date, or None."""
+    dates = occurrence_dates(start_date, frequency, window_start=after + timedelta(days=1), window_end=after + timedelta(days=372))
+    return dates[0].astype(object) if len(dates) else None
+
 HEADER_MAPPING = {
     "date": ["date", "transaction_date", "income_date", "expense_date","day","day_of_transaction","posted date","dt","transaction date"],
     "source": ["source", "income_source", "from", "source_name","source_title","source_label","name","description","transaction details","memo","item_name","item"],
@@ -46,14 +116,44 @@ def normalize_headers(fieldnames):
                 break
     return normalized
 
-def normalize_date(date_str):
-    if not date_str:
-        return None
+# Formats tried, in order, after the string is cleaned by _clean_date_string()
+DATE_FORMATS = [
+    "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d", "%d-%m-%Y", "%Y-%m-%d",
+    "%d/%m/%y", "%m/%d/%y", "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y"
+]
+DATE_SNIFF_ROWS = 50  # rows sampled to pick a column's date format
+DATE_CACHE_SIZE = 4096  # distinct raw date strings memoized by normalize_date
+
+_EXCEL_SERIAL_RE = re.compile(r"\d{5,6}")
+_ORDINAL_RE = re.compile(r'(\d+)(st|nd|rd|th)', re.IGNORECASE)
+_SEPARATOR_RE = re.compile(r'[\.,-]')
+_SPACE_RE = re.compile(r'\s+')
+
+# All-numeric formats get a compiled parser: one regex match and a date() call
+_NUMERIC_DATE_RE = {
+    "Y": r"(\d{4})", "y": r"(\d{2})", "m": r"(\d{1,2})", "d": r"(\d{1,2})",
+}
+_NUMERIC_FORMATS = {
+    "%d/%m/%Y": "dmY", "%m/%d/%Y": "mdY", "%Y/%m/%d": "Ymd", "%d/%m/%y": "dmy", "%m/%d/%y": "mdy",
+}
 
-    date_str = str(date_str).strip()
 
+def _clean_date_string(date_str):
+    date_str = _ORDINAL_RE.sub(r'\1', date_str)
+    date_str = _SEPARATOR_RE.sub('/', date_str)
+    return _SPACE_RE.sub(' ', date_str)
+
+
+def _to_iso(parsed):
+    if parsed.year < 100:
+        parsed = parsed.replace(year=2000 + parsed.year)
+    return parsed.date().isoformat()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _normalize_date_cached(date_str):
     # Excel serial number (e.g. 45234)
-    if re.fullmatch(r"\d{5,6}", date_str):
+    if _EXCEL_SERIAL_RE.fullmatch(date_str):
         try:
             serial = int(date_str)
             parsed_date = datetime(1899, 12, 30) + timedelta(days=serial)
@@ -62,36 +162,109 @@ def normalize_date(date_str):
             pass
 
     # Clean and standardize
-    date_str = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str, flags=re.IGNORECASE)
-    date_str = re.sub(r'[\.,-]', '/', date_str)
-    date_str = re.sub(r'\s+', ' ', date_str)
-
-    known_formats = [
-        "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d", "%d-%m-%Y", "%Y-%m-%d",
-        "%d/%m/%y", "%m/%d/%y", "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y"
-    ]
+    date_str = _clean_date_string(date_str)
 
-    for fmt in known_formats:
+    for fmt in DATE_FORMATS:
         try:
-            parsed = datetime.strptime(date_str, fmt)
-            if parsed.year < 100:
-                parsed = parsed.replace(year=2000 + parsed.year)
-            return parsed.date().isoformat()
+            return _to_iso(datetime.strptime(date_str, fmt))
         except ValueError:
             continue
 
     for dayfirst in (True, False):
         try:
-            parsed = parser.parse(date_str, dayfirst=dayfirst)
-            if parsed.year < 100:
-                parsed = parsed.replace(year=2000 + parsed.year)
-            return parsed.date().isoformat()
+            return _to_iso(parser.parse(date_str, dayfirst=dayfirst))
         except Exception:
             continue
 
     logger.warning(f"❌ Failed to parse date: {date_str}")
     return None
-        
+
+
+def normalize_date(date_str):
+    """
+    ISO date (YYYY-MM-DD) for a date in almost any format, or None.
+    Results are memoized per raw string, so repeated dates cost one lookup.
+    """
+    if not date_str:
+        return None
+    return _normalize_date_cached(str(date_str).strip())
+
+
+def _compile_date_format(fmt):
+    """Fast parser for one DATE_FORMATS entry: raw string -> ISO date or None."""
+    order = _NUMERIC_FORMATS.get(fmt)
+    if order is None:
+        # Month names: one strptime with the known format instead of trying all
+        def parse(date_str):
+            try:
+                return _to_iso(datetime.strptime(_clean_date_string(date_str), fmt))
+            except ValueError:
+                return None
+        return parse
+
+    pattern = re.compile(r"[/.,\-]".join(_NUMERIC_DATE_RE[part] for part in order))
+    positions = {part: i for i, part in enumerate(order)}
+
+    def parse(date_str):
+        match = pattern.fullmatch(date_str)
+        if not match:
+            return None
+        parts = match.groups()
+        if "Y" in positions:
+            year = int(parts[positions["Y"]])
+            year = year + 2000 if year < 100 else year
+        else:
+            year = int(parts[positions["y"]])
+            year += 2000 if year < 69 else 1900  # same pivot as strptime's %y
+        try:
+            return date(year, int(parts[positions["m"]]), int(parts[positions["d"]])).isoformat()
+        except ValueError:
+            return None
+    return parse
+
+
+class DateColumnParser:
+    """
+    Date parser for one CSV column. The column's format is picked once from
+    sample values (the format that parses most of them, earlier DATE_FORMATS
+    entries winning ties), so every row reads the same way, e.g. 01/05/2024
+    is January 5th in a column that also holds 12/25/2024. Rows the winning
+    format cannot parse fall back to normalize_date().
+    """
+
+    def __init__(self, samples=()):
+        self.format = None
+        self._fast = None
+        samples = [str(v).strip() for v in samples if v]
+        best = 0
+        for fmt in DATE_FORMATS:
+            fast = _compile_date_format(fmt)
+            hits = sum(fast(v) is not None for v in samples)
+            if hits > best:
+                best, self.format, self._fast = hits, fmt, fast
+
+    def __call__(self, date_str):
+        if not date_str:
+            return None
+        date_str = str(date_str).strip()
+        if self._fast is not None:
+            parsed = self._fast(date_str)
+            if parsed is not None:
+                return parsed
+        return normalize_date(date_str)
+
+
+def sniff_date_column(rows, field, sample_size=DATE_SNIFF_ROWS):
+    """
+    Pick the date format of `field` from the first rows of a row iterator
+    (e.g. a streaming csv.DictReader). Returns (rows, parse_date) where rows
+    replays the sampled rows followed by the rest.
+    """
+    rows = iter(rows)
+    sample = list(islice(rows, sample_size))
+    parse_date = DateColumnParser(row.get(field) for row in sample) if field else normalize_date
+    return chain(sample, rows), parse_date
+
 def clean_value(value, default=None, cast_type=str):
 
     if value is None:
@@ -139,12 +312,18 @@ INCOME_CATEGORY_MAPPING = {
         "other income", "miscellaneous", "misc", "unknown", "extra income", "OTHER"
     ]
 }
+def compile_synonyms(mapping):
+    """{synonym (lowercase): category}; a synonym listed twice keeps its first category."""
+    table = {}
+    for standard, synonyms in mapping.items():
+        for synonym in synonyms:
+            table.setdefault(synonym.lower(), standard)
+    return table
+
+INCOME_SYNONYMS = compile_synonyms(INCOME_CATEGORY_MAPPING)
+
 def normalize_income_category(raw_category):
-    raw_category = str(raw_category).strip().lower()
-    for standard, synonyms in INCOME_CATEGORY_MAPPING.items():
-        if raw_category in [s.lower() for s in synonyms]:
-            return standard
-    return "Other Income"  # fallback
+    return INCOME_SYNONYMS.get(str(raw_category).strip().lower(), "Other Income")  # fallback
 
 EXPENSE_CATEGORY_MAPPING = {
     "Housing & Utilities": [
@@ -188,12 +367,10 @@ EXPENSE_CATEGORY_MAPPING = {
     ]
 }
 
+EXPENSE_SYNONYMS = compile_synonyms(EXPENSE_CATEGORY_MAPPING)
+
 def normalize_expense_category(raw_category):
-    raw_category = str(raw_category).strip().lower()
-    for standard, synonyms in EXPENSE_CATEGORY_MAPPING.items():
-        if raw_category in [s.lower() for s in synonyms]:
-            return standard
-    return "Miscellaneous"  # fallback
+    return EXPENSE_SYNONYMS.get(str(raw_category).strip().lower(), "Miscellaneous")  # fallback
 
 
 
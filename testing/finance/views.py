@@ -1,27 +1,44 @@
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime
 from decimal import ROUND_HALF_UP, Decimal
 from urllib import request
 from django.shortcuts import render, redirect
 from dateutil.relativedelta import relativedelta
-from .models import Expense, Income, RecurringIncome, RecurringExpense
+from .models import Expense, ImportJob, Income, RecurringIncome, RecurringExpense
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Sum, F, Q
-from django.core.paginator import Paginator
 from django.contrib import messages
-from django.db.models.functions import TruncMonth, ExtractWeek, ExtractMonth, TruncYear, ExtractYear
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from .utils import (
-get_next_due_date, normalize_headers, normalize_date, clean_value, normalize_expense_category, normalize_income_category, is_bank_statement_csv
+normalize_headers, sniff_date_column, clean_value, normalize_expense_category, normalize_income_category, is_bank_statement_csv
 )
 from .forms import IncomeForm, ExpenseForm, RecurringIncomeForm, RecurringExpenseForm
-import csv,re,logging
+from .bulk import (
+    bulk_create_transactions, bulk_delete_transactions, assign_predicted_categories, after_bulk_write, get_import_batch_size
+)
+from .csv_stream import ImportAborted, batched, get_max_upload_size, size_label, stream_csv, upload_too_large
+from .import_jobs import collect_finished_jobs, enqueue_import
+from .ledger import get_balance, get_totals
+from .pagination import paginate_transactions
+from .recurring import ensure_recurring_processed
+from .dashboard import first_income_date, get_dashboard_data
+from .rollups import monthly_totals, yearly_totals
+import re,logging
 from budget.utils import check_budget_warnings
 from django.http import JsonResponse
-from ml.classifier import predict_category as ml_predict_expense_category
-from ml.income_classifier import predict_category as ml_predict_income_category
-from ml.forecasting import get_user_expense_forecast
+# ML modules are imported on first use, not when this module loads
+from ml.registry import (
+    classify_expense as ml_classify_expense,
+    classify_income as ml_classify_income,
+    predict_expense_category as ml_predict_expense_category,
+    predict_income_category as ml_predict_income_category,
+    get_user_expense_forecast,
+)
+from ml.phrase_index import hit_rate_summary
 
 @login_required
 def predict_income_category(request):
@@ -153,6 +170,17 @@ def delete_expense(request, id):
         messages.success(request, "Expense deleted successfully!")
     return redirect("expense_log")
 
+def parse_amount(amount_raw):
+    """Parse a CSV amount cell (₹, commas, spaces) into a 2dp Decimal, 0 if invalid."""
+    amount = Decimal("0")
+    if amount_raw:
+        amount_clean = re.sub(r"[^\d\.\-]", "", str(amount_raw))
+        try:
+            amount = Decimal(amount_clean).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        except:
+            amount = Decimal("0")
+    return amount
+
 @login_required
 def upload_income_csv(request):
     if request.method != "POST":
@@ -160,9 +188,9 @@ def upload_income_csv(request):
 
     csv_file = request.FILES.get("csv_file")
 
-    # File size limit (1MB)
-    if csv_file.size > 1048576:
-        messages.error(request, "File too large! Please upload a CSV under 1 MB.")
+    # File size limit (rows are streamed, so memory use does not depend on it)
+    if upload_too_large(csv_file):
+        messages.error(request, f"File too large! Please upload a CSV under {size_label(get_max_upload_size())}.")
         return redirect("add_income")
 
     if not csv_file.name.endswith(".csv"):
@@ -170,8 +198,8 @@ def upload_income_csv(request):
         return redirect("add_income")
 
     try:
-        file_data = csv_file.read().decode("utf-8").splitlines()
-        reader = csv.DictReader(file_data)
+        # 🧾 Stream rows from the upload instead of reading the whole file
+        reader = stream_csv(csv_file)
         
         # ===== Dashboard Hint Feature =====
         # 🏦 Detect real bank statement
@@ -189,47 +217,53 @@ def upload_income_csv(request):
             messages.error(request, f"CSV missing required fields: {', '.join(missing_fields)}")
             return redirect("add_income")
 
-        imported_count = 0
         skipped_count = 0
-        affected_categories = set()  # track categories if needed later
+        imported_count = 0
+        affected_categories = set()
+        category_sources = Counter()  # where predicted categories came from
 
-        for row in reader:
-            # 1️⃣ Date
-            date_str = normalize_date(row.get(field_map.get("date")))
+        # 📅 Detect the date column's format once from the first rows
+        rows, parse_date = sniff_date_column(reader, field_map.get("date"))
 
-            # 2️⃣ Source (e.g., Salary, Interest)
-            source = clean_value(row.get(field_map.get("source")), default="Unknown Income")
+        def parsed_incomes():
+            nonlocal skipped_count
+            for row in rows:
+                # 1️⃣ Date
+                date_str = parse_date(row.get(field_map.get("date")))
+
+                # 2️⃣ Source (e.g., Salary, Interest)
+                source = clean_value(row.get(field_map.get("source")), default="Unknown Income")
+
+                # 3️⃣ Amount (clean ₹, commas, spaces)
+                amount = parse_amount(row.get(field_map.get("amount")))
+
+                # Skip invalid rows
+                if not date_str or not source or amount == 0:
+                    skipped_count += 1
+                    continue
+
+                # 4️⃣ Category (optional)
+                raw_category = clean_value(row.get(field_map.get("category")), default="")
+                category = normalize_income_category(raw_category) if raw_category else None
+
+                yield Income(
+                    date=date_str,
+                    source=source,
+                    amount=amount,
+                    category=category,
+                    user=request.user
+                )
+
+        # Parse, categorize and save one bounded batch at a time, in one transaction
+        with transaction.atomic():
+            for batch in batched(parsed_incomes(), get_import_batch_size()):
+                # 🤖 Predict the batch's missing categories in one call
+                assign_predicted_categories(batch, "source", ml_classify_income, category_sources)
+                affected_categories.update(income.category for income in batch)
+                imported_count += bulk_create_transactions(request.user, Income, batch, recalculate=False)
+            if imported_count:
+                after_bulk_write(request.user)  # savings recalculated once
 
-            # 3️⃣ Amount (clean ₹, commas, spaces)
-            amount_raw = row.get(field_map.get("amount"))
-            amount = Decimal("0")
-            if amount_raw:
-                amount_clean = re.sub(r"[^\d\.\-]", "", str(amount_raw))
-                try:
-                    amount = Decimal(amount_clean).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                except:
-                    amount = Decimal("0")
-
-            # 4️⃣ Category (optional)
-            raw_category = clean_value(row.get(field_map.get("category")), default="")
-            category = normalize_income_category(raw_category) if raw_category else ml_predict_income_category([source])[0]
-
-            # Skip invalid rows
-            if not date_str or not source or amount == 0:
-                skipped_count += 1
-                continue
-
-            # Save to DB
-            Income.objects.create(
-                date=date_str,
-                source=source,
-                amount=amount,
-                category=category,
-                user=request.user
-            )
-            imported_count += 1
-            affected_categories.add(category)
-            
         #all rows skipped
         if imported_count == 0:
             # Forcefully clear all queued messages
@@ -244,6 +278,8 @@ def upload_income_csv(request):
             f"Categories: {len(affected_categories)}"
         )
         messages.success(request, summary_msg)
+        if category_sources:
+            messages.info(request, hit_rate_summary(category_sources))
 
     except Exception as e:
         messages.error(request, f"Error processing CSV: {str(e)}")
@@ -258,9 +294,9 @@ def upload_expense_csv(request):
 
     csv_file = request.FILES.get("csv_file")
 
-    # File size limit: 1MB
-    if csv_file.size > 1048576:
-        messages.error(request, "File too large! Please upload a CSV under 1 MB.")
+    # File size limit (rows are streamed, so memory use does not depend on it)
+    if upload_too_large(csv_file):
+        messages.error(request, f"File too large! Please upload a CSV under {size_label(get_max_upload_size())}.")
         return redirect("add_expense")
 
     if not csv_file.name.endswith(".csv"):
@@ -268,8 +304,8 @@ def upload_expense_csv(request):
         return redirect("add_expense")
 
     try:
-        file_data = csv_file.read().decode("utf-8").splitlines()
-        reader = csv.DictReader(file_data)
+        # 🧾 Stream rows from the upload instead of reading the whole file
+        reader = stream_csv(csv_file)
         
         # ===== Dashboard Hint Feature =====
         # 🏦 Detect real bank statement
@@ -287,68 +323,69 @@ def upload_expense_csv(request):
             return redirect("add_expense")
 
         # Track processing summary
-        imported_count = 0
         skipped_count = 0
         warning_count = 0
+        imported_count = 0
         affected_categories = set()
+        category_sources = Counter()  # where predicted categories came from
 
         # Pre-calculate income and expense totals
-        total_income = Income.objects.filter(user=request.user).aggregate(total=Sum("amount"))["total"] or Decimal("0")
-        total_expense = Expense.objects.filter(user=request.user).aggregate(total=Sum("amount"))["total"] or Decimal("0")
+        total_income, total_expense = get_totals(request.user)
 
-        for row in reader:
-            date_str = normalize_date(row.get(field_map.get("date")))
-            name = clean_value(row.get(field_map.get("name")), default="Unknown Expense")
+        # 📅 Detect the date column's format once from the first rows
+        rows, parse_date = sniff_date_column(reader, field_map.get("date"))
 
-            # Parse amount safely
-            amount_raw = row.get(field_map.get("amount"))
-            amount = Decimal("0")
-            if amount_raw:
-                amount_clean = re.sub(r"[^\d\.\-]", "", str(amount_raw))
-                try:
-                    amount = Decimal(amount_clean).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                except:
-                    amount = Decimal("0")
-
-            raw_category = clean_value(row.get(field_map.get("category")), default="")
-            category = normalize_expense_category(raw_category) if raw_category else ml_predict_expense_category([name])[0]
-
-            # Skip invalid rows
-            if not date_str or not name or amount == 0:
-                skipped_count += 1
-                continue
-            
-            # Prevent overspending — reject entire CSV if total expense would exceed income
-            if (total_expense + amount) > total_income:
-                # Clear any previous messages
-                list(messages.get_messages(request))  
-                messages.error(
-                    request,
-                    f"❌ CSV upload rejected. "
-                    f"Importing '{name}' would exceed your total income. "
-                    f"Please review your data or update your income records."
+        def parsed_expenses():
+            nonlocal skipped_count, total_expense
+            for row in rows:
+                date_str = parse_date(row.get(field_map.get("date")))
+                name = clean_value(row.get(field_map.get("name")), default="Unknown Expense")
+
+                # Parse amount safely
+                amount = parse_amount(row.get(field_map.get("amount")))
+
+                # Skip invalid rows
+                if not date_str or not name or amount == 0:
+                    skipped_count += 1
+                    continue
+
+                # Prevent overspending — reject entire CSV if total expense would exceed income
+                if (total_expense + amount) > total_income:
+                    raise ImportAborted(
+                        f"❌ CSV upload rejected. "
+                        f"Importing '{name}' would exceed your total income. "
+                        f"Please review your data or update your income records."
+                    )
+
+                raw_category = clean_value(row.get(field_map.get("category")), default="")
+                category = normalize_expense_category(raw_category) if raw_category else None
+
+                yield Expense(
+                    date=date_str,
+                    name=name,
+                    amount=amount,
+                    category=category,
+                    user=request.user
                 )
-                return redirect("add_expense")
-
-
-            # # Prevent overspending
-            # if (total_expense + amount) > total_income:
-            #     skipped_count += 1
-            #     messages.warning(request, f"Skipping '{name}' - exceeds total income!")
-            #     continue
-
-            # Create Expense
-            Expense.objects.create(
-                date=date_str,
-                name=name,
-                amount=amount,
-                category=category,
-                user=request.user
-            )
-
-            total_expense += amount
-            imported_count += 1
-            affected_categories.add(category)
+
+                total_expense += amount
+
+        # Parse, categorize and save one bounded batch at a time; a rejection
+        # anywhere in the file rolls back the batches already written
+        try:
+            with transaction.atomic():
+                for batch in batched(parsed_expenses(), get_import_batch_size()):
+                    # 🤖 Predict the batch's missing categories in one call
+                    assign_predicted_categories(batch, "name", ml_classify_expense, category_sources)
+                    affected_categories.update(expense.category for expense in batch)
+                    imported_count += bulk_create_transactions(request.user, Expense, batch, recalculate=False)
+                if imported_count:
+                    after_bulk_write(request.user)  # savings recalculated once
+        except ImportAborted as e:
+            # Clear any previous messages
+            list(messages.get_messages(request))
+            messages.error(request, str(e))
+            return redirect("add_expense")
             
         #all rows skipped
         if imported_count == 0:
@@ -374,6 +411,8 @@ def upload_expense_csv(request):
             f"Budget Warnings: {warning_count}"
         )
         messages.success(request, summary_msg)
+        if category_sources:
+            messages.info(request, hit_rate_summary(category_sources))
 
     except Exception as e:
         messages.error(request, f"Error processing CSV: {str(e)}")
@@ -389,12 +428,10 @@ def upload_bank_statement(request):
     """
     🌍 Universal AI-Powered Bank Statement Upload
 
-    ✅ Accepts any bank CSV format (Indian or international)
-    ✅ Detects income vs expense automatically
-    ✅ Normalizes any date format (via normalize_date)
-    ✅ Predicts income & expense categories using AI
-    ✅ Checks if expenses exceed income
-    ✅ Skips malformed rows gracefully
+    The statement is stored and imported by a background ImportJob (see
+    finance/statement_import.py), so large files never hit request timeouts.
+    Returns immediately: JSON with the job id for fetch() callers, otherwise a
+    redirect to the dashboard, which polls import_job_status.
     """
     if request.method != "POST":
         return redirect("dashboard")
@@ -404,226 +441,48 @@ def upload_bank_statement(request):
         messages.error(request, "Please upload a CSV file.")
         return redirect("dashboard")
 
-    if csv_file.size > 1572864:  # 1.5 MB
-        messages.error(request, "CSV file too large (max 1.5 MB).")
+    if upload_too_large(csv_file):
+        messages.error(request, f"CSV file too large (max {size_label(get_max_upload_size())}).")
         return redirect("dashboard")
 
     if not csv_file.name.lower().endswith(".csv"):
         messages.error(request, "Only CSV files are allowed.")
         return redirect("dashboard")
 
-    try:
-        # 🧾 Read CSV
-        file_data = csv_file.read().decode("utf-8", errors="ignore").splitlines()
-        reader = csv.DictReader(file_data)
-
-        if not reader.fieldnames:
-            messages.error(request, "CSV has no headers.")
-            return redirect("dashboard")
+    job = ImportJob.objects.create(user=request.user, file=csv_file, original_name=csv_file.name[:255])
+    enqueue_import(job)
 
-        # 🧠 Normalize headers
-        field_map = normalize_headers(reader.fieldnames)
-        lower_fields = [f.lower() for f in reader.fieldnames]
-
-        # 🔍 Detect columns dynamically
-        date_field = field_map.get("date") or next((f for f in reader.fieldnames if "date" in f.lower()), None)
-        debit_field = next((f for f in reader.fieldnames if "debit" in f.lower() or "(dr" in f.lower()), None)
-        credit_field = next((f for f in reader.fieldnames if "credit" in f.lower() or "(cr" in f.lower()), None)
-        withdrawal_field = next((f for f in reader.fieldnames if "withdrawal" in f.lower()), None)
-        deposit_field = next((f for f in reader.fieldnames if "deposit" in f.lower()), None)
-        amount_field = next((f for f in reader.fieldnames if "amount" in f.lower()), None)
-        type_field = next((f for f in reader.fieldnames if "type" in f.lower()), None)
-        desc_field = next(
-            (f for f in reader.fieldnames if any(k in f.lower() for k in ["description", "details", "narration", "memo", "remarks"])),
-            None
+    if request.accepts("application/json") and not request.accepts("text/html"):
+        return JsonResponse(
+            {"job_id": job.pk, "status_url": reverse("import_job_status", args=[job.pk])},
+            status=202,
         )
+    messages.info(request, f"📥 '{csv_file.name}' is being imported. Progress is shown on your dashboard.")
+    return redirect("dashboard")
 
-        if not date_field:
-            messages.error(request, "Date column not found — invalid bank statement.")
-            return redirect("dashboard")
-
-        if not any([debit_field, credit_field, withdrawal_field, deposit_field, amount_field]):
-            messages.error(request, "No recognizable amount columns found.")
-            return redirect("dashboard")
-
-        # 💰 Fetch current totals
-        total_income = Income.objects.filter(user=request.user).aggregate(total=Sum("amount"))["total"] or Decimal("0")
-        total_expense = Expense.objects.filter(user=request.user).aggregate(total=Sum("amount"))["total"] or Decimal("0")
-
-        imported_income = imported_expense = skipped = 0
-
-        def clean_amt(val):
-            val = re.sub(r"[^\d.\-]", "", str(val))
-            return Decimal(val) if val else Decimal("0")
-
-        # 📝 Buffer rows
-        income_rows = []
-        expense_rows = []
-
-        for row in reader:
-            try:
-                date_str = normalize_date(row.get(date_field))
-                if not date_str:
-                    skipped += 1
-                    continue
-
-                description = str(row.get(desc_field) or "").strip()
-                if not description:
-                    description = next((str(v).strip() for v in row.values() if v), "")
-
-                amount = Decimal("0")
-                txn_type = "unknown"
-
-                # Debit / Credit
-                if debit_field and row.get(debit_field):
-                    amount = clean_amt(row[debit_field])
-                    if amount < 0:
-                        amount = abs(amount)
-                        txn_type = "income"
-                    else:
-                        txn_type = "expense"
-                elif credit_field and row.get(credit_field):
-                    amount = clean_amt(row[credit_field])
-                    if amount < 0:
-                        amount = abs(amount)
-                        txn_type = "expense"
-                    else:
-                        txn_type = "income"
-                elif withdrawal_field and row.get(withdrawal_field):
-                    amount = clean_amt(row[withdrawal_field])
-                    txn_type = "expense"
-                elif deposit_field and row.get(deposit_field):
-                    amount = clean_amt(row[deposit_field])
-                    txn_type = "income"
-                elif type_field and amount_field:
-                    raw_type = str(row.get(type_field, "")).strip().upper()
-                    amount = clean_amt(row.get(amount_field))
-                    if raw_type in ("CREDIT", "CR", "INCOME"):
-                        txn_type = "income"
-                    elif raw_type in ("DEBIT", "DR", "EXPENSE"):
-                        txn_type = "expense"
-
-                # Fallback — detect from description
-                desc_lower = description.lower()
-                if txn_type == "unknown" and amount > 0:
-                    if any(w in desc_lower for w in ["salary", "interest", "refund", "bonus", "deposit", "credit"]):
-                        txn_type = "income"
-                    elif any(w in desc_lower for w in ["upi", "payment", "transfer", "withdrawal", "atm", "rent", "emi", "bill", "debit"]):
-                        txn_type = "expense"
-
-                if amount == 0 or txn_type == "unknown":
-                    skipped += 1
-                    continue
-
-                # Buffer row
-                if txn_type == "income":
-                    income_rows.append((date_str, description, amount))
-                else:
-                    expense_rows.append((date_str, description, amount))
-
-            except Exception as e:
-                logger.warning(f"⚠️ Skipped row: {e}")
-                skipped += 1
-                continue
-            
-        # ======= PRECHECK: Abort entire CSV if expenses exceed income =======
-        total_new_expenses = sum(amt for _, _, amt in expense_rows)
-        if (total_expense + total_new_expenses) > (total_income + sum(amt for _, _, amt in income_rows)):
-            messages.error(
-                request,
-                "❌ Bank statement upload cancelled — total expenses in file exceed total available income. "
-                "Please record sufficient income before uploading this file."
-            )
-            return redirect("dashboard")
-        # ===================================================================
-
-        # 🔄 Import all income first
-        for date_str, description, amount in income_rows:
-            try:
-                category = ml_predict_income_category([description])[0]
-                Income.objects.create(
-                    user=request.user,
-                    date=date_str,
-                    source=description[:100],
-                    amount=amount,
-                    category=category,
-                )
-                total_income += amount
-                imported_income += 1
-            except Exception as e:
-                logger.warning(f"⚠️ Skipped income row: {e}")
-                skipped += 1
-                continue
-            
-        shown_warnings = set()
-
-        # 🔄 Then import expense rows
-        for date_str, description, amount in expense_rows:
-            try:
-                if amount <= 0:
-                    logger.warning(f"⚠️ Skipped non-positive expense: {description} ({amount})")
-                    skipped += 1
-                    continue
-
-                # # Only skip if total still insufficient
-                # if (total_expense + amount) > total_income:
-                #     logger.warning(f"⚠️ Skipped expense that would exceed income: {description} ({amount}) please enter the income first.")
-                #     skipped += 1
-                #     continue
-
-                category = ml_predict_expense_category([description])[0]
-                exp_obj = Expense.objects.create(
-                    user=request.user,
-                    date=date_str,
-                    name=description[:100],
-                    amount=amount,
-                    category=category,
-                )
-                warnings_before = len(messages.get_messages(request))
-                check_budget_warnings(request, exp_obj)
-                warnings_after = list(messages.get_messages(request))
-
-                # Prevent duplicate messages by tracking text
-                for msg in warnings_after:
-                    if msg.message not in shown_warnings:
-                        shown_warnings.add(msg.message)
-                        messages.add_message(request, msg.level, msg.message)
-                total_expense += amount
-                imported_expense += 1
-
-            except Exception as e:
-                logger.warning(f"⚠️ Skipped expense row: {e}")
-                skipped += 1
-                continue
-            
-        # ✅ If everything was skipped
-        if imported_income == 0 and imported_expense == 0:
-            # Forcefully clear all queued messages
-            list(messages.get_messages(request))  # consumes all messages
-            messages.warning(request, "⚠️ No transactions were imported. All rows were skipped due to validation or parsing rules.")
-
-        # ✅ After processing all rows
-        if total_expense > total_income:
-            messages.warning(
-                request,
-                f"⚠️ Warning: Total expenses ({total_expense}) exceed total income ({total_income})."
-            )
 
-        messages.success(
-            request,
-            f"✅ Upload complete! Income: {imported_income}, Expense: {imported_expense}, Skipped: {skipped}"
-        )
-        return redirect("dashboard")
-
-    except Exception as e:
-        logger.error(f"❌ Error processing bank statement: {e}")
-        messages.error(request, f"Error processing statement: {e}")
-        return redirect("dashboard")
+@login_required
+def import_job_status(request, job_id):
+    """📊 JSON progress of one of the user's import jobs, polled by the dashboard."""
+    job = get_object_or_404(ImportJob, pk=job_id, user=request.user)
+    return JsonResponse({
+        "job_id": job.pk,
+        "file": job.original_name,
+        "status": job.status,
+        "finished": job.finished,
+        "rows_parsed": job.rows_parsed,
+        "rows_imported": job.rows_imported,
+        "rows_skipped": job.rows_skipped,
+        "income_imported": job.income_imported,
+        "expense_imported": job.expense_imported,
+        "category_sources": job.category_sources,
+        "messages": job.messages if job.finished else [],
+    })
 
 @login_required
 def expense_log(request):
-    process_recurring_transactions(request.user)
-    expenses = Expense.objects.filter(user=request.user).order_by('-date')
+    ensure_recurring_processed(request.user)
+    expenses = Expense.objects.filter(user=request.user)
     categories = [choice[0] for choice in Expense.CATEGORY_CHOICES]
 
     view_type = request.GET.get('view', 'monthly')
@@ -639,15 +498,9 @@ def expense_log(request):
             start_date = datetime.strptime(custom_start, '%Y-%m-%d').date()
             end_date = datetime.strptime(custom_end, '%Y-%m-%d').date()
 
-            custom_data = (
-                Expense.objects.filter(user=request.user, date__range=(start_date, end_date))
-                .annotate(period=TruncMonth('date'))
-                .values('period')
-                .annotate(total=Sum('amount'))
-                .order_by('period')
-            )
-            labels = [e['period'].strftime('%Y-%m') for e in custom_data]
-            data = [float(e['total']) for e in custom_data]
+            custom_data = monthly_totals(request.user, 'expense', start_date, end_date)
+            labels = [f"{year}-{month:02d}" for year, month, _ in custom_data]
+            data = [float(total) for _, _, total in custom_data]
 
         except ValueError:
             pass
@@ -667,44 +520,24 @@ def expense_log(request):
 
     # --- If any start_date was set above ---
     if start_date and not (custom_start and custom_end):
-        monthly_data = (
-            Expense.objects.filter(user=request.user, date__range=(start_date, end_date))
-            .annotate(period=TruncMonth('date'))
-            .values('period')
-            .annotate(total=Sum('amount'))
-            .order_by('period')
-        )
-        labels = [e['period'].strftime('%Y-%m') for e in monthly_data]
-        data = [float(e['total']) for e in monthly_data]
+        monthly_data = monthly_totals(request.user, 'expense', start_date, end_date)
+        labels = [f"{year}-{month:02d}" for year, month, _ in monthly_data]
+        data = [float(total) for _, _, total in monthly_data]
 
     # --- Yearly ---
     elif view_type == 'yearly':
-        yearly_data = (
-            Expense.objects.filter(user=request.user)
-            .annotate(period=TruncYear('date'))
-            .values('period')
-            .annotate(total=Sum('amount'))
-            .order_by('period')
-        )
-        labels = [e['period'].strftime('%Y') for e in yearly_data]
-        data = [float(e['total']) for e in yearly_data]
+        yearly_data = yearly_totals(request.user, 'expense')
+        labels = [str(year) for year, _ in yearly_data]
+        data = [float(total) for _, total in yearly_data]
 
     # --- All time (monthly) ---
     elif view_type == 'all':
-        all_data = (
-            Expense.objects.filter(user=request.user)
-            .annotate(period=TruncMonth('date'))
-            .values('period')
-            .annotate(total=Sum('amount'))
-            .order_by('period')
-        )
-        labels = [e['period'].strftime('%Y-%m') for e in all_data]
-        data = [float(e['total']) for e in all_data]
+        all_data = monthly_totals(request.user, 'expense')
+        labels = [f"{year}-{month:02d}" for year, month, _ in all_data]
+        data = [float(total) for _, _, total in all_data]
 
-    # --- Pagination (unchanged) ---
-    paginator = Paginator(expenses, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # --- Pagination (keyset cursors, count from the ledger) ---
+    paginator, page_obj = paginate_transactions(expenses, request, get_balance(request.user).expense_count)
 
     total_pages = paginator.num_pages
     current_page = page_obj.number
@@ -745,21 +578,21 @@ def delete_selected_expenses(request):
     ids = request.POST.get("selected_ids", "")
     if ids:
         id_list = [int(i) for i in ids.split(",") if i.isdigit()]
-        Expense.objects.filter(id__in=id_list, user=request.user).delete()
+        bulk_delete_transactions(Expense.objects.filter(id__in=id_list, user=request.user))
     messages.success(request, "Selected expenses deleted successfully!")
     return redirect("expense_log")  # 👈 make sure this is the correct name of your expense list page
 
 @login_required
 def bulk_delete_expense(request):
     if request.method == "POST":
-        Expense.objects.filter(user=request.user).delete()
+        bulk_delete_transactions(Expense.objects.filter(user=request.user))
     messages.success(request, "All expenses deleted successfully!")
     return redirect("expense_log")
 
 @login_required
 def income_history(request):
-    process_recurring_transactions(request.user)
-    incomes = Income.objects.filter(user=request.user).order_by('-date')
+    ensure_recurring_processed(request.user)
+    incomes = Income.objects.filter(user=request.user)
     categories = [choice[0] for choice in Income.CATEGORY_CHOICES]
 
     view_type = request.GET.get('view', 'monthly')
@@ -774,15 +607,9 @@ def income_history(request):
         try:
             start_date = datetime.strptime(custom_start, '%Y-%m-%d').date()
             end_date = datetime.strptime(custom_end, '%Y-%m-%d').date()
-            custom_data = (
-                Income.objects.filter(user=request.user, date__range=(start_date, end_date))
-                .annotate(period=TruncMonth('date'))
-                .values('period')
-                .annotate(total=Sum('amount'))
-                .order_by('period')
-            )
-            labels = [entry['period'].strftime('%Y-%m') for entry in custom_data]
-            data = [float(entry['total']) for entry in custom_data]
+            custom_data = monthly_totals(request.user, 'income', start_date, end_date)
+            labels = [f"{year}-{month:02d}" for year, month, _ in custom_data]
+            data = [float(total) for _, _, total in custom_data]
         except ValueError:
             pass
 
@@ -798,43 +625,23 @@ def income_history(request):
 
     # --- If we have a start_date, compute data ---
     if start_date and not (custom_start and custom_end):
-        monthly_data = (
-            Income.objects.filter(user=request.user, date__range=(start_date, end_date))
-            .annotate(period=TruncMonth('date'))
-            .values('period')
-            .annotate(total=Sum('amount'))
-            .order_by('period')
-        )
-        labels = [entry['period'].strftime('%Y-%m') for entry in monthly_data]
-        data = [float(entry['total']) for entry in monthly_data]
+        monthly_data = monthly_totals(request.user, 'income', start_date, end_date)
+        labels = [f"{year}-{month:02d}" for year, month, _ in monthly_data]
+        data = [float(total) for _, _, total in monthly_data]
 
     # --- yearly and all time remain same ---
     elif view_type == 'yearly':
-        yearly_data = (
-            Income.objects.filter(user=request.user)
-            .annotate(period=TruncYear('date'))
-            .values('period')
-            .annotate(total=Sum('amount'))
-            .order_by('period')
-        )
-        labels = [entry['period'].strftime('%Y') for entry in yearly_data]
-        data = [float(entry['total']) for entry in yearly_data]
+        yearly_data = yearly_totals(request.user, 'income')
+        labels = [str(year) for year, _ in yearly_data]
+        data = [float(total) for _, total in yearly_data]
 
     elif view_type == 'all':
-        all_data = (
-            Income.objects.filter(user=request.user)
-            .annotate(period=TruncMonth('date'))
-            .values('period')
-            .annotate(total=Sum('amount'))
-            .order_by('period')
-        )
-        labels = [entry['period'].strftime('%Y-%m') for entry in all_data]
-        data = [float(entry['total']) for entry in all_data]
+        all_data = monthly_totals(request.user, 'income')
+        labels = [f"{year}-{month:02d}" for year, month, _ in all_data]
+        data = [float(total) for _, _, total in all_data]
 
-    # Pagination logic unchanged
-    paginator = Paginator(incomes, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Pagination (keyset cursors, count from the ledger)
+    paginator, page_obj = paginate_transactions(incomes, request, get_balance(request.user).income_count)
     total_pages = paginator.num_pages
     current_page = page_obj.number
     window_size = 5
@@ -863,160 +670,17 @@ def delete_selected_incomes(request):
     ids = request.POST.get("selected_ids", "")
     if ids:
         id_list = [int(i) for i in ids.split(",") if i.isdigit()]
-        Income.objects.filter(id__in=id_list, user=request.user).delete()
+        bulk_delete_transactions(Income.objects.filter(id__in=id_list, user=request.user))
     messages.success(request, "Selected incomes deleted successfully!")
     return redirect("income_history")
 
 @login_required
 def bulk_delete_income(request):
     if request.method == "POST":
-        Income.objects.filter(user=request.user).delete()
+        bulk_delete_transactions(Income.objects.filter(user=request.user))
     messages.success(request, "All incomes deleted successfully!")
     return redirect("income_history")
 
-def process_recurring_transactions(user):
-    today = timezone.now().date()
-
-    # Current totals
-    total_income = Income.objects.filter(user=user).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    total_expense = Expense.objects.filter(user=user).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    changed = True
-    while changed:
-        changed = False
-
-        # ---- Process Recurring Incomes ----
-        incomes = RecurringIncome.objects.filter(user=user, next_due_date__lte=today, status="active")
-        for rec in incomes:
-            # Stop if beyond end date
-            if rec.end_date and rec.next_due_date > rec.end_date:
-                rec.status = "inactive"
-                rec.save()
-                continue
-
-            # ✅ Prevent duplicates
-            if not Income.objects.filter(
-                user=user,
-                source=rec.source,
-                amount=rec.amount,
-                date=rec.next_due_date,
-                category=rec.category,
-                recurring=rec
-            ).exists():
-                Income.objects.create(
-                    source=rec.source,
-                    amount=rec.amount,
-                    date=rec.next_due_date,
-                    category=rec.category,
-                    user=user,
-                    recurring=rec   # Link transaction to recurring record
-                )
-                total_income += Decimal(rec.amount)
-
-            rec.next_due_date = get_next_due_date(rec.next_due_date, rec.frequency)
-
-            if rec.end_date and rec.next_due_date > rec.end_date:
-                rec.status = "inactive"
-
-            rec.save()
-            changed = True
-
-        # ---- Process Recurring Expenses ----
-        expenses = RecurringExpense.objects.filter(user=user, next_due_date__lte=today).exclude(status="inactive")
-        for rec in expenses:
-            if rec.end_date and rec.next_due_date > rec.end_date:
-                rec.status = "inactive"
-                rec.save()
-                continue
-
-            if (total_expense + Decimal(rec.amount)) <= total_income:
-                # ✅ Prevent duplicates
-                if not Expense.objects.filter(
-                    user=user,
-                    name=rec.name,
-                    amount=rec.amount,
-                    date=rec.next_due_date,
-                    category=rec.category,
-                    recurring=rec
-                ).exists():
-                    Expense.objects.create(
-                        name=rec.name,
-                        amount=rec.amount,
-                        date=rec.next_due_date,
-                        category=rec.category,
-                        user=user,
-                        recurring=rec  # Link transaction to recurring record
-                    )
-                    total_expense += Decimal(rec.amount)
-
-                rec.next_due_date = get_next_due_date(rec.next_due_date, rec.frequency)
-
-                if rec.end_date and rec.next_due_date > rec.end_date:
-                    rec.status = "inactive"
-                else:
-                    rec.status = "active"
-
-                rec.save()
-                changed = True
-            else:
-                rec.status = "pending"
-                rec.save()
-
-        # ---- Retry pending expenses ----
-        pendings = RecurringExpense.objects.filter(user=user, status="pending")
-        for rec in pendings:
-            if rec.end_date and rec.next_due_date > rec.end_date:
-                rec.status = "inactive"
-                rec.save()
-                continue
-
-            if (total_expense + Decimal(rec.amount)) <= total_income:
-                # ✅ Prevent duplicates
-                if not Expense.objects.filter(
-                    user=user,
-                    name=rec.name,
-                    amount=rec.amount,
-                    date=rec.next_due_date,
-                    category=rec.category,
-                    recurring=rec
-                ).exists():
-                    Expense.objects.create(
-                        name=rec.name,
-                        amount=rec.amount,
-                        date=rec.next_due_date,
-                        category=rec.category,
-                        user=user,
-                        recurring=rec
-                    )
-                    total_expense += Decimal(rec.amount)
-
-                rec.next_due_date = get_next_due_date(rec.next_due_date, rec.frequency)
-
-                if rec.end_date and rec.next_due_date > rec.end_date:
-                    rec.status = "inactive"
-                else:
-                    rec.status = "active"
-
-                rec.save()
-                changed = True
-                
-
-def retry_pending_expenses(user, total_income, total_expense):
-    pending = RecurringExpense.objects.filter(user=user, status="pending").order_by("next_due_date")
-    for rec in pending:
-        if (total_expense + Decimal(rec.amount)) <= total_income:
-            Expense.objects.create(
-                name=rec.name,
-                amount=rec.amount,
-                date=rec.next_due_date,
-                category=rec.category,
-                user=user,
-            )
-            total_expense += Decimal(rec.amount)
-            rec.next_due_date = get_next_due_date(rec.next_due_date, rec.frequency)
-            rec.status = "active"
-            rec.save()
-           
 @login_required
 def recurring_expense(request):
     if request.method == 'POST':
@@ -1036,7 +700,7 @@ def recurring_expense(request):
     else:
         form = RecurringExpenseForm()
     
-    process_recurring_transactions(request.user)
+    ensure_recurring_processed(request.user)
     expenses = RecurringExpense.objects.filter(user=request.user)
 
     category_totals = expenses.values('category').annotate(total=Sum('amount'))
@@ -1070,7 +734,7 @@ def recurring_income(request):
     else:
         form = RecurringIncomeForm()
 
-    process_recurring_transactions(request.user)
+    ensure_recurring_processed(request.user)
     incomes = RecurringIncome.objects.filter(user=request.user)
 
     category_totals = incomes.values('category').annotate(total=Sum('amount'))
@@ -1101,7 +765,7 @@ def edit_recurring_expense(request, id):
 
             if reset_fields.intersection(changed_fields):
                 # Delete all previously generated transactions linked to this recurring record
-                Expense.objects.filter(user=request.user, recurring=expense).delete()
+                bulk_delete_transactions(Expense.objects.filter(user=request.user, recurring=expense))
 
                 # Reset next_due_date and reactivate
                 rec.next_due_date = rec.start_date
@@ -1146,7 +810,7 @@ def edit_recurring_income(request, id):
 
     # --- Compute totals excluding this recurring income ---
     total_income_excl = Income.objects.filter(user=request.user).exclude(recurring=income).aggregate(total=Sum("amount"))["total"] or Decimal("0")
-    total_expense = Expense.objects.filter(user=request.user).aggregate(total=Sum("amount"))["total"] or Decimal("0")
+    total_expense = get_totals(request.user)[1]
 
     # --- Get how many incomes were previously generated by this recurring income ---
     generated_qs = Income.objects.filter(user=request.user, recurring=income)
@@ -1170,7 +834,7 @@ def edit_recurring_income(request, id):
     reset_fields = {"start_date", "end_date", "amount", "category", "frequency", "source"}
 
     if reset_fields.intersection(changed_fields):
-        Income.objects.filter(user=request.user, recurring=income).delete()
+        bulk_delete_transactions(Income.objects.filter(user=request.user, recurring=income))
         rec.next_due_date = rec.start_date
         rec.status = "active"
 
@@ -1204,7 +868,7 @@ def delete_recurring_income(request, id):
 @login_required
 def dashboard(request):
 
-    process_recurring_transactions(request.user)
+    ensure_recurring_processed(request.user)
 
     # --- Filters ---
     view_type = request.GET.get("view", "monthly")
@@ -1227,7 +891,7 @@ def dashboard(request):
     elif view_type == "2y":
         start_date = end_date - relativedelta(years=2)
     elif view_type == "all":
-        start_date = Income.objects.filter(user=request.user).order_by("date").first().date if Income.objects.filter(user=request.user).exists() else end_date
+        start_date = first_income_date(request.user) or end_date
     elif custom_start and custom_end:
         try:
             start_date = datetime.strptime(custom_start, "%Y-%m-%d").date()
@@ -1237,28 +901,14 @@ def dashboard(request):
     else:
         start_date = end_date - relativedelta(months=12)
 
-    # --- QS for chart data ---
-    income_qs = Income.objects.filter(user=request.user, date__range=(start_date, end_date))
-    expense_qs = Expense.objects.filter(user=request.user, date__range=(start_date, end_date))
+    # --- Totals, chart series and last transaction (constant number of queries) ---
+    data = get_dashboard_data(request.user, start_date, end_date)
 
-    # --- Dashboard totals ---
-    income_total = Decimal(Income.objects.filter(user=request.user).aggregate(total=Sum('amount'))['total'] or 0)
-    expense_total = Decimal(Expense.objects.filter(user=request.user).aggregate(total=Sum('amount'))['total'] or 0)
-
-    balance = (income_total - expense_total).quantize(Decimal("0.01"))
-    income_total = income_total.quantize(Decimal("0.01"))
-    expense_total = expense_total.quantize(Decimal("0.01"))
-
-    # --- Last transaction ---
-    last_income = Income.objects.filter(user=request.user).order_by('-date').first()
-    last_expense = Expense.objects.filter(user=request.user).order_by('-date').first()
-
-    if last_income and last_expense:
-        last_transaction = last_income if last_income.date > last_expense.date else last_expense
-    elif last_income:
-        last_transaction = last_income
-    else:
-        last_transaction = last_expense
+    # --- Background statement imports: show finished results once, poll the active one ---
+    finished_jobs, import_job = collect_finished_jobs(request.user)
+    for job in finished_jobs:
+        for msg in job.messages:
+            getattr(messages, msg["level"])(request, msg["message"])
 
     # --- Recurring Expenses ---
     today = timezone.now().date()
@@ -1268,138 +918,13 @@ def dashboard(request):
         status__in=["active", "pending"]
     ).order_by("next_due_date")
 
-    # -------------------------------------------------------
-    # 1. MONTHLY TRENDS (Month + Year)
-    # -------------------------------------------------------
-    monthly_income = (
-        income_qs
-        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
-        .values('year', 'month')
-        .annotate(total=Sum('amount'))
-        .order_by('year', 'month')
-    )
-
-    monthly_expense = (
-        expense_qs
-        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
-        .values('year', 'month')
-        .annotate(total=Sum('amount'))
-        .order_by('year', 'month')
-    )
-
-    # Build dict with keys like "2024-01"
-    income_dict = {
-        f"{item['year']}-{item['month']:02d}": float(item['total'])
-        for item in monthly_income
-    }
-    expense_dict = {
-        f"{item['year']}-{item['month']:02d}": float(item['total'])
-        for item in monthly_expense
-    }
-
-    # Full monthly label list across range
-    current = start_date.replace(day=1)
-    monthly_labels = []
-
-    while current <= end_date:
-        monthly_labels.append(current.strftime("%Y-%m"))
-        current += relativedelta(months=1)
-
-    income_data = [income_dict.get(lbl, 0) for lbl in monthly_labels]
-    expense_data = [expense_dict.get(lbl, 0) for lbl in monthly_labels]
-
-    # -------------------------------------------------------
-    # 2. WEEKLY TRENDS (Week + Year)
-    # -------------------------------------------------------
-    weekly_income = (
-        income_qs
-        .annotate(year=ExtractYear('date'), week=ExtractWeek('date'))
-        .values('year', 'week')
-        .annotate(total=Sum('amount'))
-        .order_by('year', 'week')
-    )
-
-    weekly_expense = (
-        expense_qs
-        .annotate(year=ExtractYear('date'), week=ExtractWeek('date'))
-        .values('year', 'week')
-        .annotate(total=Sum('amount'))
-        .order_by('year', 'week')
-    )
-
-    week_income_dict = {
-        f"{item['year']}-W{item['week']}": float(item['total'])
-        for item in weekly_income
-    }
-    week_expense_dict = {
-        f"{item['year']}-W{item['week']}": float(item['total'])
-        for item in weekly_expense
-    }
-
-    # Build weekly ranges
-    def generate_week_labels(start_date, end_date):
-        labels = []
-        weeks = []
-
-        current = start_date
-        while current <= end_date:
-            w_year, w_week = current.isocalendar()[0], current.isocalendar()[1]
-
-            week_start = current
-            week_end = current + timedelta(days=6)
-            if week_end > end_date:
-                week_end = end_date
-
-            label = f"{week_start.strftime('%d')}–{week_end.strftime('%d %b %Y')}"
-            key = f"{w_year}-W{w_week}"
-
-            labels.append(label)
-            weeks.append(key)
-
-            current = week_end + timedelta(days=1)
-
-        return labels, weeks
-
-    weekly_labels, week_keys = generate_week_labels(start_date, end_date)
-
-    weekly_income_data = [week_income_dict.get(k, 0) for k in week_keys]
-    weekly_expense_data = [week_expense_dict.get(k, 0) for k in week_keys]
-
-    # -------------------------------------------------------
-    # 3. CATEGORY-WISE TOTALS
-    # -------------------------------------------------------
-    category_expenses = (
-        expense_qs.values('category')
-        .annotate(total=Sum('amount'))
-        .order_by('-total')
-    )
-
-    category_labels = [c['category'] for c in category_expenses]
-    category_values = [float(c['total']) for c in category_expenses]
-
     # -------------------------------------------------------
     # CONTEXT
     # -------------------------------------------------------
     context = {
-        "total_income": income_total,
-        "total_expense": expense_total,
-        "balance": balance,
-
-        "months": monthly_labels,
-        "income_data": income_data,
-        "expense_data": expense_data,
-
-        "weeks": weekly_labels,
-        "weekly_income_data": weekly_income_data,
-        "weekly_expense_data": weekly_expense_data,
-
-        "category_labels": category_labels,
-        "category_values": category_values,
-
-        "last_transaction": last_transaction,
-        "last_income": last_income,
-        "last_expense": last_expense,
+        **data,
         "due_expenses": due_expenses,
+        "import_job": import_job,
         
         "view_type": view_type,
         "custom_start": custom_start,
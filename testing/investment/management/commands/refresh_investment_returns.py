@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from investment.utils_refresh import DEFAULT_REFRESH_WORKERS, refresh_stale_investments
+
+
+class Command(BaseCommand):
+    help = "Refresh expected returns of stale investments from market data, one fetch per symbol."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running, refreshing every --interval seconds.")
+        parser.add_argument("--interval", type=int, default=3600, help="Seconds between runs with --loop (default 3600).")
+        parser.add_argument("--workers", type=int, default=DEFAULT_REFRESH_WORKERS, help="Symbols fetched in parallel.")
+
+    def run_once(self, workers):
+        updated = refresh_stale_investments(max_workers=workers)
+        self.stdout.write(f"Refreshed {updated} investment(s).")
+
+    def handle(self, *args, **options):
+        self.run_once(options["workers"])
+        while options["loop"]:
+            time.sleep(options["interval"])
+            self.run_once(options["workers"])
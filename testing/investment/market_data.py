@@ -0,0 +1,194 @@
+# investment/market_data.py
+import csv
+import datetime as dt
+import logging
+import os
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Benchmark symbol used to estimate the return of each investment type
+MARKET_SYMBOLS = {
+    "stock": "^NSEI",  # Nifty 50 index in India
+    "etf": "NIFTYBEES.NS",  # Nifty ETF in India
+    "crypto": "BTC-INR",
+    "gold": "GOLDBEES.NS",  # Gold ETF in India
+    "mutual fund": "^NSMIDCP",  # or USA’s ^GSPC
+    "bond": "ICICIB22.NS",  # 10-year ICICI bond yield
+    "real estate": "EMBASSY.NS",  # US REIT ETF
+}
+
+# 🔧 Override with MARKET_DATA_TTL / MARKET_DATA_FAILURE_TTL in settings
+DEFAULT_TTL = 6 * 3600  # annualized 5-year returns barely move within a day
+DEFAULT_FAILURE_TTL = 300  # don't hammer the provider while it is unreachable
+DEFAULT_YEARS = 5
+
+_MISSING = object()
+
+
+def annualized_return(start_price, end_price, years):
+    if start_price <= 0:
+        return None
+    return round(((end_price / start_price) ** (1 / years) - 1) * 100, 2)
+
+
+# -------------------------
+# Price providers
+# -------------------------
+class PriceProvider:
+    """
+    Source of historical closing prices. Subclasses implement get_closes() and
+    return (first_close, last_close) inside [start, end], or None if unavailable.
+    """
+    name = "base"
+
+    def get_closes(self, symbol, start, end):
+        raise NotImplementedError
+
+
+class YahooProvider(PriceProvider):
+    """Live prices from Yahoo Finance (requires the yfinance package)."""
+    name = "yahoo"
+
+    def get_closes(self, symbol, start, end):
+        import yfinance as yf  # imported lazily: slow to import and optional offline
+
+        data = yf.download(symbol, start=start, end=end, progress=False)
+        if data.empty:
+            return None
+        return float(data["Close"].iloc[0]), float(data["Close"].iloc[-1])
+
+
+class CSVProvider(PriceProvider):
+    """
+    Offline prices from <directory>/<symbol>.csv files with Date and Close
+    columns (dates as YYYY-MM-DD), e.g. for tests or air-gapped deployments.
+    """
+    name = "csv"
+
+    def __init__(self, directory=None):
+        self.directory = directory or getattr(settings, "MARKET_DATA_CSV_DIR", "")
+
+    def path_for(self, symbol):
+        safe = "".join(c if c.isalnum() or c in "-._" else "_" for c in symbol)
+        return os.path.join(self.directory, f"{safe}.csv")
+
+    def get_closes(self, symbol, start, end):
+        path = self.path_for(symbol)
+        if not os.path.exists(path):
+            return None
+        closes = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    day = dt.date.fromisoformat(row["Date"][:10])
+                    close = float(row["Close"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if start <= day <= end:
+                    closes.append((day, close))
+        if not closes:
+            return None
+        closes.sort()
+        return closes[0][1], closes[-1][1]
+
+
+PROVIDERS = {
+    "yahoo": YahooProvider,
+    "csv": CSVProvider,
+}
+
+
+def load_provider(name=None):
+    """Provider from MARKET_DATA_PROVIDER: "yahoo" (default), "csv" or a dotted class path."""
+    name = name or getattr(settings, "MARKET_DATA_PROVIDER", "yahoo")
+    provider_class = PROVIDERS.get(name) or import_string(name)
+    return provider_class()
+
+
+# -------------------------
+# Service
+# -------------------------
+class MarketDataService:
+    """
+    Annualized returns per symbol, cached in Django's cache with a TTL.
+    Concurrent requests for the same uncached symbol wait on one fetch
+    instead of each downloading the same price history.
+    """
+
+    def __init__(self, provider=None, ttl=None, failure_ttl=None):
+        self.provider = provider or load_provider()
+        self.ttl = ttl if ttl is not None else getattr(settings, "MARKET_DATA_TTL", DEFAULT_TTL)
+        self.failure_ttl = (
+            failure_ttl if failure_ttl is not None
+            else getattr(settings, "MARKET_DATA_FAILURE_TTL", DEFAULT_FAILURE_TTL)
+        )
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def cache_key(self, symbol, years):
+        return f"market_return:{self.provider.name}:{symbol}:{years}"
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _fetch(self, symbol, years):
+        end = dt.date.today()
+        start = end - dt.timedelta(days=365 * years)
+        try:
+            closes = self.provider.get_closes(symbol, start, end)
+        except Exception as e:
+            logger.warning(f"Market data fetch failed for {symbol}: {e}")
+            return None
+        if not closes:
+            return None
+        return annualized_return(closes[0], closes[1], years)
+
+    def get_return(self, symbol, years=DEFAULT_YEARS):
+        key = self.cache_key(symbol, years)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock_for(key):
+            # Another thread may have filled it while we waited
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            value = self._fetch(symbol, years)
+            cache.set(key, value, self.ttl if value is not None else self.failure_ttl)
+            return value
+
+    def get_returns(self, symbols, years=DEFAULT_YEARS):
+        """{symbol: return} for several symbols, each fetched at most once."""
+        return {symbol: self.get_return(symbol, years) for symbol in dict.fromkeys(symbols)}
+
+    def return_for_type(self, inv_type, years=DEFAULT_YEARS):
+        symbol = MARKET_SYMBOLS.get((inv_type or "").lower())
+        if not symbol:
+            return None  # ❌ skip unknown types
+        return self.get_return(symbol, years)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_market_data():
+    """Process-wide service, so the per-symbol locks are shared between requests."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = MarketDataService()
+    return _service
+
+
+def set_market_data(service):
+    """Swap the shared service (e.g. a CSVProvider in tests); None resets to settings."""
+    global _service
+    _service = service
@@ -2,7 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from datetime import date
 from django.utils import timezone
-from decimal import Decimal
+from .valuation import estimate_value
 
 class Investment(models.Model):
     INVESTMENT_TYPES = [
@@ -43,14 +43,11 @@ class Investment(models.Model):
 
     @property
     def estimated_value(self):
-        """Calculate projected maturity value based on expected return and duration."""
-        if self.expected_return:
-            years = Decimal('1')
-            if self.end_date:
-                days = (self.end_date - self.start_date).days
-                years = Decimal(max(1, days / 365))
-            return round(self.amount + (self.amount * (self.expected_return / Decimal('100')) * years), 2)
-        return self.amount
+        """Projected value (at maturity, or today if open-ended), same formula as the portfolio."""
+        return estimate_value(
+            self.amount, self.expected_return, self.start_date, self.end_date or date.today(),
+            self.investment_type, self.frequency,
+        )
 
     @property
     def profit_estimate(self):
@@ -3,7 +3,8 @@ from django.dispatch import receiver
 from django.utils import timezone
 from .models import Investment
 from finance.models import Expense, Income
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
+from .valuation import estimate_value
 
 # -------------------------------------------------
 # Helper: Choose income category based on investment type
@@ -22,17 +23,10 @@ def choose_income_category(inv_type):
 
 
 # -------------------------------------------------
-# Helper: Compact compound value calculator (same as portfolio logic)
+# Helper: Estimated value (shared valuation engine, same as portfolio logic)
 # -------------------------------------------------
-def _calculate_estimated_value(amount, expected_return, start_date, end_date):
-    if not start_date or not end_date or expected_return is None:
-        return amount
-    days = (end_date - start_date).days
-    if days <= 0:
-        return amount
-    years = Decimal(days) / Decimal("365")
-    value = amount * ((Decimal("1") + (expected_return / Decimal("100"))) ** years)
-    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+def _calculate_estimated_value(amount, expected_return, start_date, end_date, investment_type="", frequency=None):
+    return estimate_value(amount, expected_return, start_date, end_date, investment_type, frequency)
 
 
 # -------------------------------------------------
@@ -92,7 +86,10 @@ def sync_investment_records(sender, instance, created, **kwargs):
     if instance.status == "Completed" and instance.end_date:
         amount = Decimal(instance.amount)
         expected_return = Decimal(instance.expected_return or 0)
-        est_value = _calculate_estimated_value(amount, expected_return, instance.start_date, instance.end_date)
+        est_value = _calculate_estimated_value(
+            amount, expected_return, instance.start_date, instance.end_date,
+            instance.investment_type, instance.frequency,
+        )
         category = choose_income_category(getattr(instance, "investment_type", ""))
 
         if income:
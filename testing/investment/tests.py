@@ -1,3 +1,152 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from investment.market_data import CSVProvider, MarketDataService, set_market_data
+from investment.models import Investment
+from investment.utils_refresh import refresh_stale_investments
+from investment.valuation import estimate_value, estimate_values
 
 # Create your tests here.
+
+
+class CountingCSVProvider(CSVProvider):
+    """CSV provider that counts fetches and is slow enough to overlap threads."""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.calls = 0
+
+    def get_closes(self, symbol, start, end):
+        self.calls += 1
+        time.sleep(0.05)
+        return super().get_closes(symbol, start, end)
+
+
+class MarketDataServiceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.provider = CountingCSVProvider(self.directory)
+        today = date.today()
+        with open(self.provider.path_for("^NSEI"), "w") as f:
+            f.write("Date,Close\n")
+            f.write(f"{today - timedelta(days=365 * 5 - 10)},100\n")
+            f.write(f"{today - timedelta(days=365)},150\n")
+            f.write(f"{today - timedelta(days=1)},161.05\n")
+        self.service = MarketDataService(provider=self.provider, ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        cache.clear()
+
+    def test_returns_are_cached_and_fetches_deduplicated(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.service.return_for_type("Stock")))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # ✅ (161.05 / 100) ** (1/5) - 1 = 10%
+        self.assertEqual(results, [10.0] * 8)
+        self.assertEqual(self.service.get_return("^NSEI"), 10.0)
+        self.assertEqual(self.provider.calls, 1)
+
+    def test_missing_symbol_is_cached_as_unavailable(self):
+        self.assertIsNone(self.service.return_for_type("crypto"))
+        self.assertIsNone(self.service.return_for_type("crypto"))
+        self.assertIsNone(self.service.return_for_type("unknown"))
+        self.assertEqual(self.provider.calls, 1)
+
+    def test_background_refresh_fetches_each_symbol_once(self):
+        user = get_user_model().objects.create_user(username="investor", password="password123")
+        for i, inv_type in enumerate(["Stock", "Stock", "Stock", "FD"]):
+            Investment.objects.create(
+                user=user, name=f"Holding {i}", investment_type=inv_type, amount=Decimal("1000"),
+                start_date=date.today() - timedelta(days=30),
+            )
+        Investment.objects.update(last_updated=timezone.now() - timedelta(days=2))
+
+        set_market_data(self.service)
+        try:
+            updated = refresh_stale_investments()
+        finally:
+            set_market_data(None)
+
+        # ✅ Three stocks share one ^NSEI fetch; the FD has no market symbol
+        self.assertEqual(updated, 3)
+        self.assertEqual(self.provider.calls, 1)
+        returns = set(Investment.objects.filter(investment_type="Stock").values_list("expected_return", flat=True))
+        self.assertEqual(returns, {Decimal("10.00")})
+        self.assertIsNone(Investment.objects.get(investment_type="FD").expected_return)
+
+
+class ValuationEngineTests(TestCase):
+    def test_per_type_formulas(self):
+        start, end = date(2020, 1, 1), date(2021, 1, 1)  # 366 days
+        values = estimate_values(
+            [Decimal("1000")] * 5,
+            [Decimal("10")] * 5,
+            [start] * 5,
+            [end] * 5,
+            ["FD", "Stock", "Gold", "Other", "Other"],
+            [None, "Yearly", "Yearly", "Yearly", "Monthly"],
+        )
+        years = Decimal(366) / Decimal(365)
+        expected = [
+            Decimal("1000") * (Decimal("1.025") ** (4 * years)),
+            Decimal("1000") * (Decimal("1.1") ** years),
+            Decimal("1000") * (1 + Decimal("0.1") * years),
+            Decimal("1000") * (1 + Decimal("0.1") * years),
+            Decimal("1000") * ((1 + Decimal("0.1") / 12) ** (12 * years)),
+        ]
+        self.assertEqual(values, [v.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) for v in expected])
+
+    def test_missing_rate_or_dates_keep_principal(self):
+        self.assertEqual(estimate_value(Decimal("500"), None, date(2020, 1, 1), date(2021, 1, 1), "FD"), Decimal("500"))
+        self.assertEqual(estimate_value(Decimal("500"), Decimal("8"), None, date(2021, 1, 1), "FD"), Decimal("500"))
+        self.assertEqual(estimate_value(Decimal("500"), Decimal("8"), date(2021, 1, 1), date(2020, 1, 1), "FD"), Decimal("500"))
+
+    def test_model_property_uses_engine(self):
+        user = get_user_model().objects.create_user(username="val", password="pw")
+        inv = Investment(
+            user=user, name="Deposit", investment_type="FD", amount=Decimal("1000"),
+            expected_return=Decimal("10"), start_date=date(2020, 1, 1), end_date=date(2021, 1, 1),
+        )
+        self.assertEqual(
+            inv.estimated_value,
+            estimate_value(inv.amount, inv.expected_return, inv.start_date, inv.end_date, "FD", inv.frequency),
+        )
+
+
+class PortfolioViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="portfolio", password="pw")
+        self.client.force_login(self.user)
+
+    def test_portfolio_renders_per_type_totals(self):
+        for name, inv_type, amount in [("FD A", "FD", "1000"), ("FD B", "FD", "500"), ("Gold", "Gold", "2000")]:
+            Investment.objects.create(
+                user=self.user, name=name, investment_type=inv_type, amount=Decimal(amount),
+                expected_return=Decimal("7"), start_date=date(2024, 1, 1),
+            )
+
+        response = self.client.get(reverse("investment_portfolio"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.context["category_labels"]), ["Gold", "FD"])
+        self.assertEqual(json.loads(response.context["category_values"]), [2000.0, 1500.0])
+        self.assertEqual(response.context["total_invested"], Decimal("3500.00"))
@@ -1,6 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
-from .utils import get_expected_return_by_type
+from .market_data import MARKET_SYMBOLS, get_market_data
+from .models import Investment
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,40 +12,56 @@ logger = logging.getLogger(__name__)
 # 🔧 Change this single variable anytime (3600 = 1 hour, 10 = 10s, 86400 = 1 day)
 REFRESH_INTERVAL_SECONDS = 3600  # 1 hour or 10s for testing
 
-def refresh_if_stale(investment, save=True):
+# Symbols fetched in parallel by refresh_stale_investments()
+DEFAULT_REFRESH_WORKERS = 4
+
+# expected_return is DecimalField(max_digits=5, decimal_places=2)
+MAX_STORABLE_RETURN = Decimal("999.99")
+
+
+def refresh_stale_investments(now=None, max_workers=DEFAULT_REFRESH_WORKERS):
     """
-    Update expected_return if the last update is older than REFRESH_INTERVAL_SECONDS.
-    Returns True if updated, False otherwise.
+    Refresh expected_return of every stale, active investment of every user.
+
+    Stale rows are grouped by investment type, each distinct market symbol is
+    fetched once (in a thread pool, through the cached market data service),
+    and the results are written back with one bulk_update. Meant for the
+    refresh_investment_returns command, never for a request.
+    Returns the number of investments updated.
     """
-    try:
-        # Skip completed ones entirely
-        if getattr(investment, "status", "") == "Completed":
-            return False
-
-        now = timezone.now()
-
-        # Prevent naive/aware datetime issues
-        last_updated = investment.last_updated or (now - timedelta(seconds=REFRESH_INTERVAL_SECONDS + 1))
-        if timezone.is_naive(last_updated):
-            last_updated = timezone.make_aware(last_updated, timezone.get_current_timezone())
-
-        # Only refresh if older than threshold
-        if last_updated < now - timedelta(seconds=REFRESH_INTERVAL_SECONDS):
-            new_return = get_expected_return_by_type(investment.investment_type)
-            if new_return is not None:
-                investment.expected_return = new_return
-                investment.last_updated = now
-                if save:
-                    investment.save(update_fields=["expected_return", "last_updated"])
-                logger.info(
-                    f"Refreshed expected return for {investment.name} ({investment.investment_type}) → {new_return}%"
-                )
-                return True
-            else:
-                logger.warning(f"Could not fetch new return for {investment.name} ({investment.investment_type})")
-        return False
-
-    except Exception as e:
-        logger.error(f"refresh_if_stale() failed for {investment.name}: {e}")
-        return False
+    now = now or timezone.now()
+    stale = Investment.objects.exclude(status="Completed").filter(
+        Q(last_updated__isnull=True) | Q(last_updated__lt=now - timedelta(seconds=REFRESH_INTERVAL_SECONDS))
+    )
+
+    by_symbol = {}
+    for inv in stale:
+        symbol = MARKET_SYMBOLS.get((inv.investment_type or "").lower())
+        if symbol:
+            by_symbol.setdefault(symbol, []).append(inv)
+    if not by_symbol:
+        return 0
+
+    service = get_market_data()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(by_symbol)))) as pool:
+        rates = dict(zip(by_symbol, pool.map(service.get_return, by_symbol)))
+
+    updated = []
+    for symbol, investments in by_symbol.items():
+        rate = rates.get(symbol)
+        if rate is None:
+            logger.warning(f"Could not fetch new return for {symbol} ({len(investments)} investment(s))")
+            continue
+        rate = Decimal(str(rate))
+        if abs(rate) > MAX_STORABLE_RETURN:
+            logger.warning(f"Skipping out-of-range return {rate}% for {symbol}")
+            continue
+        for inv in investments:
+            inv.expected_return = rate
+            inv.last_updated = now
+            updated.append(inv)
 
+    if updated:
+        Investment.objects.bulk_update(updated, ["expected_return", "last_updated"], batch_size=500)
+    logger.info(f"Refreshed expected return for {len(updated)} investment(s) from {len(by_symbol)} symbol(s)")
+    return len(updated)
@@ -0,0 +1,119 @@
+# investment/valuation.py
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+
+# --- Default compounding frequency by type ---
+TYPE_BASED_FREQ = {
+    'fd': 'Quarterly',
+    'bond': 'Biannual',
+    'rd': 'Monthly',
+    'stock': 'Yearly',
+    'mutual fund': 'Yearly',
+    'etf': 'Yearly',
+    'crypto': 'Yearly',
+    'pension': 'Yearly',
+    'real estate': 'Yearly',
+    'gold': 'Yearly',
+    'other': 'Yearly',
+}
+
+# --- Compounding periods per year ---
+FREQ_MAP = {
+    'Monthly': 12,
+    'Quarterly': 4,
+    'Biannual': 2,
+    'Yearly': 1,
+}
+
+MARKET_LINKED_TYPES = ('stock', 'mutual fund', 'etf', 'crypto')
+
+CENT = Decimal('0.01')
+
+
+def _to_decimal(value):
+    if value is None:
+        return Decimal('0')
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def estimate_values(principals, rates, starts, ends, types, frequencies=None):
+    """
+    Estimated value of many investments in one vectorized pass.
+
+    Takes parallel sequences of principal, annual rate (%), start date, end date,
+    investment type and compounding frequency (None = default for the type).
+    The math runs in float64 with NumPy and each result is re-quantized to
+    cents as a Decimal. Rows without a rate, without dates, with a zero rate
+    or with end <= start keep their principal.
+    """
+    n = len(principals)
+    if n == 0:
+        return []
+    frequencies = frequencies if frequencies is not None else [None] * n
+
+    types = [(t or '').lower() for t in types]
+    final_freq = [f or TYPE_BASED_FREQ.get(t, 'Yearly') for t, f in zip(types, frequencies)]
+
+    principal = np.array([float(_to_decimal(p)) for p in principals])
+    rate = np.array([float(r) if r is not None else 0.0 for r in rates]) / 100
+    days = np.array([
+        (e - s).days if (s and e) else 0 for s, e in zip(starts, ends)
+    ], dtype=float)
+    unchanged = np.array([
+        r is None or not s or not e for r, s, e in zip(rates, starts, ends)
+    ]) | (days <= 0) | (rate == 0)
+
+    years = days / 365
+    comp = np.array([FREQ_MAP.get(f, 1) for f in final_freq], dtype=float)
+    coupon = np.array([FREQ_MAP.get(f, 2) for f in final_freq], dtype=float)
+    yearly = np.array([f.lower() == 'yearly' for f in final_freq])
+
+    is_fd = np.array(['fd' in t for t in types])
+    is_rd = np.array(['rd' in t for t in types]) & ~is_fd
+    is_market = np.array([t in MARKET_LINKED_TYPES for t in types]) & ~is_fd & ~is_rd
+    is_bond = np.array(['bond' in t for t in types]) & ~is_fd & ~is_rd & ~is_market
+    is_pension = np.array(['pension' in t or 'other' in t for t in types]) & ~is_fd & ~is_rd & ~is_market & ~is_bond
+    is_linear = np.array(['real estate' in t or 'gold' in t for t in types]) & ~is_fd & ~is_rd & ~is_market & ~is_bond & ~is_pension
+
+    with np.errstate(all='ignore'):
+        # Fallback / FD / non-yearly pension: compound at the chosen frequency
+        value = principal * (1 + rate / comp) ** (comp * years)
+        # Recurring Deposit: monthly contributions compounded monthly
+        months = np.floor(years * 12)
+        monthly_rate = rate / 12
+        value = np.where(is_rd, principal * (((1 + monthly_rate) ** months - 1) / monthly_rate), value)
+        # Market-linked: annual compounding approximation
+        value = np.where(is_market, principal * (1 + rate) ** years, value)
+        # Bond: coupon compounding
+        value = np.where(is_bond, principal * (1 + rate / coupon) ** (years * coupon), value)
+        # Pension/Other: simple interest if yearly; Real estate & gold: linear appreciation
+        simple = principal * (1 + rate * years)
+        value = np.where((is_pension & yearly) | is_linear, simple, value)
+
+    results = []
+    for i, p in enumerate(principals):
+        if unchanged[i] or not np.isfinite(value[i]):
+            results.append(_to_decimal(p))
+        else:
+            results.append(Decimal(repr(float(value[i]))).quantize(CENT, rounding=ROUND_HALF_UP))
+    return results
+
+
+def estimate_value(principal, rate, start, end, inv_type, frequency=None):
+    """Estimated value of a single investment (same engine as the portfolio)."""
+    return estimate_values([principal], [rate], [start], [end], [inv_type], [frequency])[0]
+
+
+def portfolio_values(investments, today=None):
+    """Estimated values for Investment rows, valuing open-ended ones up to today."""
+    today = today or date.today()
+    investments = list(investments)
+    return estimate_values(
+        [inv.amount for inv in investments],
+        [inv.expected_return for inv in investments],
+        [inv.start_date for inv in investments],
+        [inv.end_date or today for inv in investments],
+        [inv.investment_type for inv in investments],
+        [inv.frequency for inv in investments],
+    )
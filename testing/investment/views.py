@@ -1,4 +1,5 @@
 # investment/views.py
+from collections import defaultdict
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP, getcontext
 import json
@@ -6,14 +7,13 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.utils import timezone
-from django.db.models import Sum
 from django.contrib import messages
 from django.core.paginator import Paginator
 from .models import Investment
 from .forms import InvestmentForm
 from finance.models import Income  # make sure finance app is in INSTALLED_APPS
 from .utils import get_expected_return_by_type
-from .utils_refresh import refresh_if_stale
+from .valuation import portfolio_values
 from django.http import JsonResponse
 from django.core.cache import cache
 from django.utils import timezone
@@ -159,7 +159,7 @@ def delete_all_investments(request):
 @login_required
 @transaction.atomic
 def investment_portfolio(request):
-    investments = Investment.objects.filter(user=request.user)
+    investments = list(Investment.objects.filter(user=request.user))
     today = date.today()
 
     total_invested = Decimal('0')
@@ -170,115 +170,16 @@ def investment_portfolio(request):
     total_overall_estimated = Decimal('0')
     total_overall_profit = Decimal('0')
 
-    # -------------------------------
-    # Compound Interest Calculation
-    # -------------------------------
-    def calculate_compound_value(principal, annual_rate, start, end, investment_type, frequency=None):
-        if not start or not end or annual_rate is None:
-            return principal
-
-        # 🔧 Normalize rate to Decimal
-        if not isinstance(annual_rate, Decimal):
-            annual_rate = Decimal(str(annual_rate))
-
-        days = (end - start).days
-        if days <= 0 or annual_rate == 0:
-            return principal
-
-        years = Decimal(days) / Decimal('365')
-
-        # --- Default frequency by type ---
-        type_based_freq = {
-            'fd': 'Quarterly',
-            'bond': 'Biannual',
-            'rd': 'Monthly',
-            'stock': 'Yearly',
-            'mutual fund': 'Yearly',
-            'etf': 'Yearly',
-            'crypto': 'Yearly',
-            'pension': 'Yearly',
-            'real estate': 'Yearly',
-            'gold': 'Yearly',
-            'other': 'Yearly',
-        }
-
-        # --- Frequency mapping ---
-        freq_map = {
-            # 'Daily': Decimal('365'),
-            # 'Weekly': Decimal('52'),
-            'Monthly': Decimal('12'),
-            'Quarterly': Decimal('4'),
-            'Biannual': Decimal('2'),
-            'Yearly': Decimal('1'),
-            #'Once': Decimal('1'),
-        }
-
-        # --- Determine frequency ---
-        investment_type_lower = investment_type.lower()
-        auto_freq = type_based_freq.get(investment_type_lower, 'Yearly')
-        final_frequency = frequency or auto_freq
-        comp_per_year = freq_map.get(final_frequency, Decimal('1'))
-
-        rate_per_period = (annual_rate / Decimal('100')) / comp_per_year
-        periods = comp_per_year * years
-
-        # --- Calculation by type ---
-        if 'fd' in investment_type_lower:
-            # Fixed Deposit: compound, but allow flexible frequency
-            value = principal * ((Decimal('1') + rate_per_period) ** periods)
-
-        elif 'rd' in investment_type_lower:
-            # Recurring Deposit: monthly contributions compounded monthly
-            months = int(years * 12)
-            monthly_rate = (annual_rate / Decimal('100')) / Decimal('12')
-            value = principal * (((Decimal('1') + monthly_rate) ** months - Decimal('1')) / monthly_rate)
-
-        elif investment_type_lower in ['stock', 'mutual fund', 'etf', 'crypto']:
-            # Market-linked: annual compounding approximation
-            value = principal * ((Decimal('1') + (annual_rate / Decimal('100'))) ** years)
-
-        elif 'bond' in investment_type_lower:
-            # Bond: flexible coupon compounding
-            coupon_freq = freq_map.get(final_frequency, Decimal('2'))
-            coupon_rate = (annual_rate / Decimal('100')) / coupon_freq
-            value = principal * ((Decimal('1') + coupon_rate) ** (years * coupon_freq))
-
-        elif 'pension' in investment_type_lower or 'other' in investment_type_lower:
-            # Pension/Other: simple if yearly, compound otherwise
-            if final_frequency.lower() == 'yearly':
-                value = principal * (Decimal('1') + (annual_rate / Decimal('100')) * years)
-            else:
-                value = principal * ((Decimal('1') + rate_per_period) ** periods)
-
-        elif 'real estate' in investment_type_lower or 'gold' in investment_type_lower:
-            # Real estate & gold usually appreciate linearly
-            value = principal * (Decimal('1') + (annual_rate / Decimal('100')) * years)
-
-        else:
-            # Fallback: general compounding
-            value = principal * ((Decimal('1') + rate_per_period) ** periods)
-
-        return value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
     # -------------------------------
     # Main portfolio loop
     # -------------------------------
-    REFRESH_INTERVAL_SECONDS = 3600  # 1 hour or 10s for testing
-    updated_any = False  # track if any investment was refreshed
-    for inv in investments:
-        # 🔄 Auto-refresh if stale (10s for testing)
-        if not inv.last_updated or (timezone.now() - inv.last_updated).total_seconds() >= REFRESH_INTERVAL_SECONDS:  
-            if refresh_if_stale(inv):  
-                updated_any = True
-
-        
+    # 🔄 Expected returns are refreshed in the background by
+    # `manage.py refresh_investment_returns`; rendering never waits on the network.
+    # 📈 The whole portfolio is valued in one vectorized pass (investment/valuation.py)
+    estimated_values = portfolio_values(investments, today)
+    for inv, estimated_value in zip(investments, estimated_values):
         amount = _to_decimal(inv.amount)
         expected_return = _to_decimal(inv.expected_return or Decimal('0'))
-        
-        end_date = inv.end_date or today
-        estimated_value = calculate_compound_value(
-            amount, expected_return, inv.start_date, end_date, inv.investment_type, inv.frequency
-        )
 
         estimated_value_rounded = estimated_value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
         profit_estimate = (estimated_value_rounded - amount).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -303,9 +204,6 @@ def investment_portfolio(request):
             inv.status = "Completed"
             inv.save(update_fields=["status"])
             
-    # ✅ Single message after all refreshes
-    if updated_any:
-        messages.info(request, "📊 Live market values have been refreshed for your investments.")
     # -------------------------------
     # Averages and chart data
     # -------------------------------
@@ -323,13 +221,13 @@ def investment_portfolio(request):
     invested_amounts = list(monthly_data_invested.values())
     estimated_amounts = [monthly_data_estimated.get(m, 0) for m in months]
 
-    category_investments = (
-        investments.values('investment_type')
-        .annotate(total=Sum('amount'))
-        .order_by('-total')
-    )
-    category_labels = [c['investment_type'] for c in category_investments]
-    category_values = [float(c['total']) for c in category_investments]
+    # Per-type totals from the rows already loaded above
+    category_totals = defaultdict(Decimal)
+    for inv in investments:
+        category_totals[inv.investment_type] += _to_decimal(inv.amount)
+    category_investments = sorted(category_totals.items(), key=lambda item: item[1], reverse=True)
+    category_labels = [inv_type for inv_type, _ in category_investments]
+    category_values = [float(total) for _, total in category_investments]
 
     context = {
         "investments": investments,
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class MlConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'ml'
+
+    def ready(self):
+        import ml.checks  # noqa
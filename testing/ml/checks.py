@@ -0,0 +1,21 @@
+# ml/checks.py
+import os
+from importlib import import_module
+from django.core.checks import Warning, register
+from ml.registry import CLASSIFIER_MODULES
+
+
+@register()
+def trained_models_check(app_configs, **kwargs):
+    """Warn at deploy time (migrate, runserver, check) when a classifier was never trained."""
+    warnings = []
+    for name in CLASSIFIER_MODULES:
+        module = import_module(name)
+        if not os.path.exists(module.MODEL_PATH):
+            warnings.append(Warning(
+                f"No trained model at {module.MODEL_PATH}.",
+                hint=f"Run `python manage.py train_classifiers`. Until then, texts that no keyword or "
+                     f"training phrase matches are categorized as {module.MISC_CATEGORY!r}.",
+                id="ml.W001",
+            ))
+    return warnings
@@ -1,17 +1,22 @@
+import logging
 import os
-import joblib
-import pandas as pd
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import classification_report, accuracy_score, f1_score
-from sentence_transformers import SentenceTransformer
+from ml.embedding_cache import get_embedding_cache
+from ml.keywords import KeywordMatcher
+from ml.phrase_index import load_phrase_index, phrase_index_enabled
+from ml.quantized import embedding_version, export_quantized, get_backend, load_quantized
+from ml.training import ModelNotTrained, training_embeddings
+
+logger = logging.getLogger(__name__)
 
 # ------------------ Paths ------------------ #
 BASE_DIR = os.path.dirname(__file__)
 CSV_PATH = os.path.join(BASE_DIR, "synthetic_expense_dataset_v2.csv")
 MODEL_PATH = os.path.join(BASE_DIR, "expense_classifier_model.pkl")
 
+# Embedding model; also the version key of the embedding cache
+EMBEDDER_NAME = "all-MiniLM-L6-v2"
+
 # ------------------ Main Categories ------------------ #
 MAIN_CATEGORIES = [
     "Food & Dining", "Transportation", "Housing & Utilities", "Personal & Shopping",
@@ -91,36 +96,56 @@ KEYWORD_CATEGORY_MAP = {
     "trip": "Travel & Vacation",
 }
 
+# Compiled once: one regex pass per text, first keyword in the map wins
+_KEYWORD_MATCHER = KeywordMatcher(KEYWORD_CATEGORY_MAP)
+
 def keyword_category_mapping(text: str):
-    text = text.lower()
-    for keyword, category in KEYWORD_CATEGORY_MAP.items():
-        if keyword in text:
-            return category
-    return None
+    return _KEYWORD_MATCHER.match(text.lower())
 
 # ------------------ Embedding ------------------ #
 def encode_texts(embedder, texts, batch_size=64):
-    embeddings = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        batch_emb = embedder.encode(batch, show_progress_bar=False)
-        embeddings.append(batch_emb)
-    return np.concatenate(embeddings, axis=0)
+    # Single encode call; SentenceTransformer splits it into batch_size forward passes
+    return np.asarray(embedder.encode(list(texts), batch_size=batch_size, show_progress_bar=False))
 
 # ------------------ Model caching ------------------ #
-_model_bundle = None
-
-def load_classifier():
-    global _model_bundle
-    if _model_bundle is None:
-        if os.path.exists(MODEL_PATH):
-            _model_bundle = joblib.load(MODEL_PATH)
+_model_bundles = {}  # backend -> {"embedder", "classifier"}
+
+def load_classifier(backend=None):
+    # backend: "float" or "int8" (see ml/quantized.py); defaults to ML_EMBEDDER_BACKEND
+    backend = backend or get_backend()
+    if backend not in _model_bundles:
+        if backend == "int8":
+            _model_bundles[backend] = load_quantized(MODEL_PATH, lambda: load_classifier("float"))
+        elif os.path.exists(MODEL_PATH):
+            import joblib  # unpickling pulls in sentence_transformers/torch
+            _model_bundles[backend] = joblib.load(MODEL_PATH)
         else:
-            _model_bundle = train_classifier(CSV_PATH)
-    return _model_bundle
+            # Never train on a request; see manage.py train_classifiers
+            raise ModelNotTrained(MODEL_PATH)
+    return _model_bundles[backend]
+
+# ------------------ Training phrase index ------------------ #
+_phrase_index = None
+
+def get_phrase_index():
+    # Exact / near-duplicate lookup over the training CSV (ml/phrase_index.py); None if disabled
+    global _phrase_index
+    if _phrase_index is None and phrase_index_enabled() and os.path.exists(CSV_PATH):
+        _phrase_index = load_phrase_index(CSV_PATH, "Merchant_Text", MAIN_CATEGORIES)
+    return _phrase_index
 
 # ------------------ Training ------------------ #
-def train_classifier(csv_path=CSV_PATH, save_model=True):
+def train_classifier(csv_path=CSV_PATH, save_model=True, quantize=True, cv_folds=0, cache_embeddings=True):
+    # cv_folds: k-fold cross-validation report (0 skips it)
+    # cache_embeddings: reuse the memory-mapped embeddings of an unchanged dataset (ml/training.py)
+    # Heavy training dependencies load only when training (see ml/registry.py)
+    import joblib
+    import pandas as pd
+    from sentence_transformers import SentenceTransformer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import classification_report, accuracy_score, f1_score
+    from sklearn.model_selection import train_test_split, cross_val_score
+
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV not found: {csv_path}")
 
@@ -130,13 +155,20 @@ def train_classifier(csv_path=CSV_PATH, save_model=True):
 
     df["Merchant_Text"] = preprocess_texts(df["Merchant_Text"])
 
-    X_train_text, X_test_text, y_train, y_test = train_test_split(
-        df["Merchant_Text"], df["Category"], test_size=0.2, stratify=df["Category"], random_state=42
+    texts = df["Merchant_Text"].tolist()
+    y = df["Category"].to_numpy()
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=0.2, stratify=y, random_state=42
     )
 
-    embedder = SentenceTransformer('all-MiniLM-L6-v2')
-    X_train_emb = encode_texts(embedder, X_train_text.tolist())
-    X_test_emb = encode_texts(embedder, X_test_text.tolist())
+    embedder = SentenceTransformer(EMBEDDER_NAME)
+    # Every text encoded once; the split only indexes into the embeddings
+    if cache_embeddings:
+        X_emb = training_embeddings(embedder, texts, EMBEDDER_NAME, encode_texts)
+    else:
+        X_emb = encode_texts(embedder, texts)
+    X_train_emb, X_test_emb = X_emb[train_idx], X_emb[test_idx]
+    y_train, y_test = y[train_idx], y[test_idx]
 
     clf = LogisticRegression(max_iter=2000, class_weight="balanced", n_jobs=-1)
     clf.fit(X_train_emb, y_train)
@@ -146,43 +178,66 @@ def train_classifier(csv_path=CSV_PATH, save_model=True):
     print("Macro F1-score:", f1_score(y_test, y_pred, average="macro"))
     print(classification_report(y_test, y_pred, zero_division=0))
 
-    X_emb_all = np.concatenate([X_train_emb, X_test_emb], axis=0)
-    y_all = np.concatenate([y_train.values, y_test.values], axis=0)
-    cv_scores = cross_val_score(clf, X_emb_all, y_all, cv=5, scoring="f1_macro", n_jobs=-1)
-    print("Average CV Macro F1-score:", cv_scores.mean())
+    if cv_folds:
+        cv_scores = cross_val_score(clf, X_emb, y, cv=cv_folds, scoring="f1_macro", n_jobs=-1)
+        print("Average CV Macro F1-score:", cv_scores.mean())
 
     if save_model:
         joblib.dump({"embedder": embedder, "classifier": clf}, MODEL_PATH)
         print(f"Model saved at {MODEL_PATH}")
 
-    global _model_bundle
-    _model_bundle = {"embedder": embedder, "classifier": clf}
-    return _model_bundle
-
-def predict_category(texts, confidence_threshold=0.4):
-    model_bundle = load_classifier()
-    embedder = model_bundle["embedder"]
-    clf = model_bundle["classifier"]
-
+    bundle = {"embedder": embedder, "classifier": clf}
+    _model_bundles.clear()
+    _model_bundles["float"] = bundle
+    if quantize:
+        # int8 embedder + the same head, for ML_EMBEDDER_BACKEND = "int8"
+        _model_bundles["int8"] = export_quantized(bundle, MODEL_PATH, save=save_model)
+    return bundle
+
+def classify(texts, confidence_threshold=0.4, batch_size=64):
+    """
+    (category, source) for each text, source being where the category came
+    from: "keyword", "exact" / "near" (training phrase index) or "model".
+    """
     clean_texts_list = preprocess_texts(texts)
-    preds = []
-
-    for t in clean_texts_list:
-        # 1️⃣ Keyword mapping first
-        mapped = keyword_category_mapping(t)
-        if mapped:
-            preds.append(mapped)
-            continue
-
-        # 2️⃣ Model prediction with confidence threshold
-        emb = encode_texts(embedder, [t])
-        probs = clf.predict_proba(emb)[0]
-        max_prob = np.max(probs)
-        pred = clf.classes_[np.argmax(probs)]
-
-        if max_prob < confidence_threshold:
-            preds.append(MISC_CATEGORY)
-        else:
-            preds.append(pred if pred in MAIN_CATEGORIES else MISC_CATEGORY)
 
-    return preds
\ No newline at end of file
+    # 1️⃣ Keyword mapping first
+    results = [(keyword_category_mapping(t), "keyword") for t in clean_texts_list]
+    unmapped = list(dict.fromkeys(t for t, (p, _) in zip(clean_texts_list, results) if p is None))
+
+    # 2️⃣ Known training phrases (exact, then near-duplicate) skip the embedder
+    found = {}
+    index = get_phrase_index() if unmapped else None
+    if index is not None:
+        found = {t: hit for t, hit in zip(unmapped, index.lookup(unmapped)) if hit}
+        unmapped = [t for t in unmapped if t not in found]
+
+    # 3️⃣ Model prediction for all remaining texts at once
+    if unmapped:
+        try:
+            model_bundle = load_classifier()
+        except ModelNotTrained as e:
+            # Imports keep working before the first training run; the category can be edited later
+            logger.warning(f"⚠️ {e} Categorizing {len(unmapped)} text(s) as {MISC_CATEGORY}.")
+            found.update((t, (MISC_CATEGORY, "model")) for t in unmapped)
+            unmapped = []
+    if unmapped:
+        embedder = model_bundle["embedder"]
+        clf = model_bundle["classifier"]
+
+        version = embedding_version(EMBEDDER_NAME, model_bundle)
+        emb = get_embedding_cache().encode(embedder, unmapped, version, batch_size=batch_size)
+        probs = clf.predict_proba(emb)
+        max_probs = probs.max(axis=1)
+        labels = clf.classes_[probs.argmax(axis=1)]
+
+        for t, max_prob, pred in zip(unmapped, max_probs, labels):
+            if max_prob < confidence_threshold or pred not in MAIN_CATEGORIES:
+                found[t] = (MISC_CATEGORY, "model")
+            else:
+                found[t] = (str(pred), "model")
+
+    return [r if r[0] is not None else found[t] for t, r in zip(clean_texts_list, results)]
+
+def predict_category(texts, confidence_threshold=0.4, batch_size=64):
+    return [category for category, _ in classify(texts, confidence_threshold, batch_size)]
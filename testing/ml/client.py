@@ -0,0 +1,123 @@
+# ml/client.py
+import logging
+import os
+import socket
+import threading
+import time
+from django.conf import settings
+from ml.server import DEFAULT_REQUEST_TIMEOUT, MODELS, recv_message, send_message
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a reply. Longer than the server's own request timeout,
+# so a slow batch comes back as a RemoteError instead of a client timeout.
+DEFAULT_TIMEOUT = DEFAULT_REQUEST_TIMEOUT + 15
+FAILURE_COOLDOWN = 30  # seconds to predict in-process after the sidecar failed
+
+_local = threading.local()
+_down_until = 0.0
+
+
+class RemoteError(Exception):
+    """The sidecar answered, but the prediction itself failed."""
+
+
+def get_socket_path():
+    """ML_SERVER_SOCKET (setting or environment); None disables the sidecar."""
+    return getattr(settings, "ML_SERVER_SOCKET", None) or os.environ.get("ML_SERVER_SOCKET")
+
+
+def _connection(path):
+    """(connection, reused): one persistent connection per thread (and per socket path)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == path:
+        return conn, True
+    _drop_connection()
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(getattr(settings, "ML_SERVER_TIMEOUT", DEFAULT_TIMEOUT))
+    try:
+        conn.connect(path)
+    except OSError:
+        conn.close()
+        raise
+    _local.conn, _local.path = conn, path
+    return conn, False
+
+
+def _drop_connection():
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
+        conn.close()
+
+
+def call(path, message):
+    """
+    Send one message to the sidecar and return its reply. Only a reused
+    connection that fails while sending is retried (once, on a fresh
+    connection): the server cannot have started on that request. Anything
+    after the request went out, timeouts included, is raised as is so the
+    same texts are never queued twice.
+    """
+    while True:
+        conn, reused = _connection(path)
+        try:
+            send_message(conn, message)
+        except ConnectionError:
+            _drop_connection()
+            if reused:
+                continue  # stale pooled connection, e.g. the server restarted
+            raise
+        except OSError:
+            _drop_connection()
+            raise
+        try:
+            reply = recv_message(conn)
+        except (OSError, ValueError):
+            _drop_connection()
+            raise
+        if reply is None:
+            _drop_connection()
+            raise ConnectionError("ML server closed the connection")
+        return reply
+
+
+def remote_predict(path, model, texts, kwargs):
+    reply = call(path, {"op": "predict", "model": model, "texts": list(texts), "kwargs": kwargs})
+    if not reply.get("ok"):
+        raise RemoteError(reply.get("error"))
+    return reply["categories"]
+
+
+def classify(model, texts, **kwargs):
+    """
+    (category, source) pairs from the "expense" or "income" classifier. Uses the
+    run_ml_server sidecar when ML_SERVER_SOCKET is set, so web workers do not
+    each load the models.
+
+    Only an unreachable sidecar (no socket, refused or dropped connection)
+    falls back to in-process inference, which then sticks for
+    FAILURE_COOLDOWN seconds. A timeout (the sidecar is up but busy) and a
+    RemoteError (the prediction itself failed there) are raised: predicting
+    in-process would load the whole model into this worker under exactly the
+    load the sidecar exists for, and would most likely fail the same way.
+    """
+    global _down_until
+    path = get_socket_path()
+    if path and time.monotonic() >= _down_until:
+        try:
+            return remote_predict(path, model, texts, kwargs)
+        except TimeoutError:
+            logger.warning(f"⚠️ ML server at {path} did not answer in time")
+            raise
+        except (OSError, ValueError) as e:
+            _down_until = time.monotonic() + FAILURE_COOLDOWN
+            logger.warning(f"⚠️ ML server at {path} unavailable ({e}); predicting in-process")
+
+    from ml.registry import resolve
+    return resolve(MODELS[model])(texts, **kwargs)
+
+
+def predict(model, texts, **kwargs):
+    """Categories only, like predict_category."""
+    return [category for category, _ in classify(model, texts, **kwargs)]
@@ -0,0 +1,199 @@
+# ml/embedding_cache.py
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# ------------------ Paths ------------------ #
+BASE_DIR = os.path.dirname(__file__)
+CACHE_DB_PATH = os.path.join(BASE_DIR, "embedding_cache.sqlite3")
+
+# Number of embeddings kept in the in-process LRU tier
+DEFAULT_MAX_ITEMS = 20000
+# Rows kept in the SQLite tier (about 1.5 KB each for a 384-dim embedder); the
+# oldest written are pruned past it. Override with ML_EMBEDDING_CACHE_MAX_ROWS
+# (None keeps every row).
+DEFAULT_MAX_DISK_ITEMS = 200000
+
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace so trivially different narrations share a key."""
+    return " ".join(str(text).lower().split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier, content-addressed cache of sentence embeddings.
+
+    Keys are sha256(model_version + normalized text), so a different embedder
+    never reuses another model's vectors. Lookups go LRU -> SQLite -> encoder,
+    and vectors are stored as float32 blobs. The SQLite tier keeps the
+    max_disk_items most recently written rows.
+    """
+
+    def __init__(self, db_path=CACHE_DB_PATH, max_items=DEFAULT_MAX_ITEMS, max_disk_items=DEFAULT_MAX_DISK_ITEMS):
+        self.db_path = db_path
+        self.max_items = max_items
+        self.max_disk_items = max_disk_items
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_enabled = db_path is not None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ------------------ Keys ------------------ #
+    @staticmethod
+    def make_key(text, model_version):
+        raw = f"{model_version}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    # ------------------ Disk tier ------------------ #
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _disk_get(self, keys):
+        if not self._disk_enabled or not keys:
+            return {}
+        found = {}
+        try:
+            db = self._db()
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache disk tier disabled: {e}")
+            self._disk_enabled = False
+        return found
+
+    def _disk_put(self, items):
+        if not self._disk_enabled or not items:
+            return
+        try:
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vec.astype(np.float32).tobytes()) for key, vec in items],
+            )
+            if self.max_disk_items is not None:
+                # Rows are written with increasing rowids (a replaced key gets a new one)
+                db.execute(
+                    "DELETE FROM embeddings WHERE rowid <= (SELECT MAX(rowid) FROM embeddings) - ?",
+                    (self.max_disk_items,),
+                )
+            db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache disk tier disabled: {e}")
+            self._disk_enabled = False
+
+    # ------------------ Memory tier ------------------ #
+    def _remember(self, key, vec):
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    # ------------------ Public API ------------------ #
+    def encode(self, embedder, texts, model_version, batch_size=64):
+        """
+        Return an (n, dim) float32 matrix of embeddings for texts, in order.
+        Only texts missing from both tiers are sent to the embedder, in one batch.
+        """
+        texts = list(texts)
+        keys = [self.make_key(t, model_version) for t in texts]
+        vectors = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._lru and key not in vectors:
+                    self._lru.move_to_end(key)
+                    vectors[key] = self._lru[key]
+                    self.memory_hits += 1
+
+            pending = list(dict.fromkeys(k for k in keys if k not in vectors))
+            from_disk = self._disk_get(pending)
+            for key, vec in from_disk.items():
+                vectors[key] = vec
+                self._remember(key, vec)
+            self.disk_hits += len(from_disk)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            encoded = np.asarray(
+                embedder.encode(list(missing.values()), batch_size=batch_size, show_progress_bar=False),
+                dtype=np.float32,
+            )
+            new_items = list(zip(missing.keys(), encoded))
+            with self._lock:
+                self.misses += len(new_items)
+                for key, vec in new_items:
+                    vectors[key] = vec
+                    self._remember(key, vec)
+                self._disk_put(new_items)
+
+        return np.vstack([vectors[key] for key in keys])
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self._lru),
+        }
+
+    def clear(self):
+        """Drop both tiers and reset counters."""
+        with self._lock:
+            self._lru.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+            if self._disk_enabled:
+                try:
+                    self._db().execute("DELETE FROM embeddings")
+                    self._db().commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not clear embedding cache: {e}")
+
+
+# ------------------ Shared instance ------------------ #
+_cache = None
+
+
+def get_embedding_cache():
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(
+            max_disk_items=getattr(settings, "ML_EMBEDDING_CACHE_MAX_ROWS", DEFAULT_MAX_DISK_ITEMS)
+        )
+    return _cache
+
+
+def embedding_cache_stats():
+    """Hit/miss counters of the shared cache, for logging and monitoring."""
+    return get_embedding_cache().stats()
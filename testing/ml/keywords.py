@@ -0,0 +1,62 @@
+# ml/keywords.py
+import re
+
+
+def trie_pattern(words):
+    """
+    Regex alternation of `words` arranged as a trie, e.g. ["game", "games",
+    "gas"] -> "ga(?:me(?:s)?|s)". Matching at one position walks a single path,
+    so its cost depends on word length, not on how many words there are.
+    Optional suffixes are greedy: the longest word at a position is matched.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end of a word
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Substring keyword lookup compiled once into a single regex.
+
+    match(text) returns the value of the highest-priority keyword (earliest in
+    the mapping) occurring anywhere in the text, exactly like scanning the
+    mapping in order with `keyword in text`, but in one regex pass whose cost
+    does not grow with the number of keywords. Keywords are matched
+    case-sensitively, so pass lowercase keywords and text.
+    """
+
+    def __init__(self, mapping):
+        self.priority = {}
+        self.values = []
+        for keyword, value in mapping.items():
+            if keyword and keyword not in self.priority:
+                self.priority[keyword] = len(self.values)
+                self.values.append(value)
+        pattern = trie_pattern(self.priority) if self.priority else "(?!)"
+        # Lookahead: report a match at every position, including overlapping ones
+        self.regex = re.compile(f"(?=({pattern}))")
+
+    def match(self, text):
+        best = None
+        for found in self.regex.finditer(text):
+            longest = found.group(1)
+            # Shorter keywords starting here are prefixes of the longest one
+            for end in range(1, len(longest) + 1):
+                rank = self.priority.get(longest[:end])
+                if rank is not None and (best is None or rank < best):
+                    best = rank
+            if best == 0:
+                break
+        return None if best is None else self.values[best]
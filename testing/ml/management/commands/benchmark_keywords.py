@@ -0,0 +1,75 @@
+import random
+import string
+import time
+from django.core.management.base import BaseCommand
+from finance.utils import EXPENSE_CATEGORY_MAPPING, compile_synonyms
+from ml.classifier import KEYWORD_CATEGORY_MAP
+from ml.keywords import KeywordMatcher
+
+SAMPLE_TEXTS = [
+    "upi payment to swiggy", "uber trip to airport", "monthly rent transfer", "netflix subscription",
+    "pharmacy purchase", "atm withdrawal", "salary credit", "electricity bill", "amazon order 1234",
+    "coffee with friends", "flight booking indigo", "college fees", "neft to ramesh kumar",
+]
+
+
+def _scan(mapping, text):
+    """The previous linear substring scan, kept as the baseline."""
+    for keyword, category in mapping.items():
+        if keyword in text:
+            return category
+    return None
+
+
+def _scan_synonyms(mapping, raw):
+    """The previous per-call synonym list rebuild, kept as the baseline."""
+    for standard, synonyms in mapping.items():
+        if raw in [s.lower() for s in synonyms]:
+            return standard
+    return None
+
+
+def _filler(rng, count):
+    return ["zq" + "".join(rng.choices(string.ascii_lowercase, k=8)) for _ in range(count)]
+
+
+def _per_row_us(fn, rows, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in rows:
+            fn(row)
+    return (time.perf_counter() - start) / (repeat * len(rows)) * 1e6
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark keyword and synonym lookups as the tables grow (linear scan vs compiled)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                            help="Table size multipliers, filled with non-matching entries.")
+        parser.add_argument("--repeat", type=int, default=200, help="Passes over the sample rows.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        categories = [raw.lower() for raw in ("Food", "Taxi", "EMI", "unknown thing", "Gym", "fees")]
+        self.stdout.write(f"{'scale':>6} {'keywords':>9} {'scan us/row':>12} {'regex us/row':>13} "
+                          f"{'synonyms':>9} {'list us/row':>12} {'dict us/row':>12}")
+
+        for scale in options["scales"]:
+            keywords = dict(KEYWORD_CATEGORY_MAP)
+            keywords.update({kw: "Miscellaneous" for kw in _filler(rng, len(KEYWORD_CATEGORY_MAP) * (scale - 1))})
+            matcher = KeywordMatcher(keywords)
+
+            synonyms = {cat: list(words) for cat, words in EXPENSE_CATEGORY_MAPPING.items()}
+            for words in synonyms.values():
+                words.extend(_filler(rng, len(words) * (scale - 1)))
+            table = compile_synonyms(synonyms)
+
+            assert all(_scan(keywords, t) == matcher.match(t) for t in SAMPLE_TEXTS)
+            scan = _per_row_us(lambda t: _scan(keywords, t), SAMPLE_TEXTS, options["repeat"])
+            regex = _per_row_us(matcher.match, SAMPLE_TEXTS, options["repeat"])
+            listed = _per_row_us(lambda c: _scan_synonyms(synonyms, c), categories, options["repeat"])
+            hashed = _per_row_us(table.get, categories, options["repeat"])
+            total_synonyms = sum(len(words) for words in synonyms.values())
+            self.stdout.write(f"{scale:>6} {len(keywords):>9} {scan:>12.2f} {regex:>13.2f} "
+                              f"{total_synonyms:>9} {listed:>12.2f} {hashed:>12.2f}")
@@ -0,0 +1,74 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+HEAVY_MODULES = ("torch", "sentence_transformers", "sklearn", "pandas")
+
+# Runs in a fresh interpreter: time django.setup() + URLconf/view imports,
+# then optionally the first expense prediction.
+PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready = time.perf_counter() - start
+result = {"startup": ready, "heavy": [m for m in %(heavy)r if m in sys.modules]}
+if %(predict)r:
+    from ml.registry import predict_expense_category
+    start = time.perf_counter()
+    try:
+        predict_expense_category(["startup probe zq 7781"])
+        result["first_prediction"] = time.perf_counter() - start
+    except Exception as e:
+        result["error"] = repr(e)
+print(json.dumps(result))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure process startup and first-prediction latency with lazy ML vs ML_WARMUP_ON_STARTUP."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Fresh processes per scenario (median is reported).")
+        parser.add_argument("--skip-model", action="store_true", help="Only measure startup, never load the classifiers.")
+
+    def probe(self, warmup, predict):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "testing.settings"))
+        env["ML_WARMUP_ON_STARTUP"] = "1" if warmup else "0"
+        code = PROBE % {"heavy": HEAVY_MODULES, "predict": predict}
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True,
+        )
+        lines = out.stdout.strip().splitlines()
+        if out.returncode or not lines:
+            return {"error": (out.stderr.strip().splitlines() or ["no output"])[-1]}
+        return json.loads(lines[-1])
+
+    def scenario(self, label, runs, warmup, predict):
+        results = [self.probe(warmup, predict) for _ in range(runs)]
+        errors = [r["error"] for r in results if "error" in r]
+        if errors:
+            self.stdout.write(f"{label:<28} unavailable: {errors[0]}")
+            return
+        startup = statistics.median(r["startup"] for r in results)
+        line = f"{label:<28} startup {startup * 1000:8.0f} ms"
+        if predict:
+            first = statistics.median(r["first_prediction"] for r in results)
+            line += f"   first prediction {first * 1000:8.0f} ms"
+        heavy = ", ".join(results[0]["heavy"]) or "none"
+        self.stdout.write(f"{line}   heavy modules loaded: {heavy}")
+
+    def handle(self, *args, **options):
+        runs = options["runs"]
+        self.scenario("lazy (migrate, shell, ...)", runs, warmup=False, predict=False)
+        if options["skip_model"]:
+            return
+        self.scenario("lazy + first request", runs, warmup=False, predict=True)
+        self.scenario("ML_WARMUP_ON_STARTUP=1", runs, warmup=True, predict=True)
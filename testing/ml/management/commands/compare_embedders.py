@@ -0,0 +1,98 @@
+import os
+import time
+from importlib import import_module
+from django.core.management.base import BaseCommand, CommandError
+from ml.quantized import BACKENDS, quantized_path
+
+# Classifier module and its text column in the bundled synthetic_*_dataset_v2.csv
+CLASSIFIERS = {
+    "expense": ("ml.classifier", "Merchant_Text"),
+    "income": ("ml.income_classifier", "Source_Text"),
+}
+
+
+def holdout_split(module, text_column):
+    """The 20% hold-out set train_classifier reports its accuracy on (same split and seed)."""
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    df = pd.read_csv(module.CSV_PATH)
+    df[text_column] = module.preprocess_texts(df[text_column])
+    _, X_test_text, _, y_test = train_test_split(
+        df[text_column], df["Category"], test_size=0.2, stratify=df["Category"], random_state=42
+    )
+    return X_test_text.tolist(), y_test.to_numpy()
+
+
+def _file_mb(path):
+    return f"{os.path.getsize(path) / 1e6:.1f}" if os.path.exists(path) else "-"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the float and int8 embedders (ML_EMBEDDER_BACKEND) on the hold-out split of the "
+        "bundled synthetic datasets: accuracy, macro F1, agreement and latency per text."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", choices=[*CLASSIFIERS, "both"], default="both")
+        parser.add_argument("--batch-size", type=int, default=64, help="Texts per encode call (default 64).")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed passes per backend; the best is reported.")
+        parser.add_argument(
+            "--max-accuracy-drop", type=float,
+            help="Fail if int8 accuracy is more than this many points (0-1) below float, e.g. 0.01.",
+        )
+
+    def measure(self, module, backend, texts, y_true, batch_size, repeat):
+        from sklearn.metrics import accuracy_score, f1_score
+
+        bundle = module.load_classifier(backend)
+        embedder, clf = bundle["embedder"], bundle["classifier"]
+        module.encode_texts(embedder, texts[:batch_size], batch_size)  # first pass allocates; not timed
+
+        best = float("inf")
+        for _ in range(repeat):
+            # Straight to the model, bypassing the embedding cache
+            start = time.perf_counter()
+            probs = clf.predict_proba(module.encode_texts(embedder, texts, batch_size))
+            best = min(best, time.perf_counter() - start)
+
+        y_pred = clf.classes_[probs.argmax(axis=1)]
+        return {
+            "accuracy": accuracy_score(y_true, y_pred),
+            "f1": f1_score(y_true, y_pred, average="macro"),
+            "ms": best * 1000 / len(texts),
+            "pred": y_pred,
+        }
+
+    def handle(self, *args, **options):
+        names = list(CLASSIFIERS) if options["model"] == "both" else [options["model"]]
+        failures = []
+        for name in names:
+            module_name, text_column = CLASSIFIERS[name]
+            module = import_module(module_name)
+            texts, y_true = holdout_split(module, text_column)
+            results = {
+                backend: self.measure(module, backend, texts, y_true, options["batch_size"], options["repeat"])
+                for backend in BACKENDS
+            }
+            float_, int8 = results["float"], results["int8"]
+            sizes = {"float": _file_mb(module.MODEL_PATH), "int8": _file_mb(quantized_path(module.MODEL_PATH))}
+
+            self.stdout.write(f"\n{name} classifier — {len(texts)} hold-out texts")
+            self.stdout.write(f"{'backend':<8} {'accuracy':>9} {'macro F1':>9} {'ms/text':>8} {'file MB':>8}")
+            for backend, r in results.items():
+                self.stdout.write(
+                    f"{backend:<8} {r['accuracy']:>9.4f} {r['f1']:>9.4f} {r['ms']:>8.3f} {sizes[backend]:>8}"
+                )
+            drop = float_["accuracy"] - int8["accuracy"]
+            agreement = (float_["pred"] == int8["pred"]).mean()
+            self.stdout.write(
+                f"int8 vs float: accuracy {-drop:+.4f}, agreement {agreement:.2%}, "
+                f"{float_['ms'] / int8['ms']:.2f}x speed"
+            )
+            if options["max_accuracy_drop"] is not None and drop > options["max_accuracy_drop"]:
+                failures.append(f"{name}: int8 accuracy is {drop:.4f} below float")
+
+        if failures:
+            raise CommandError("; ".join(failures))
@@ -0,0 +1,39 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ml.registry import warm_up
+from ml.server import DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT, DEFAULT_SOCKET_PATH, InferenceServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the expense and income classifiers over a Unix socket. Point web workers at it "
+        "with ML_SERVER_SOCKET so only this process loads the models."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", help=f"Socket path (default ML_SERVER_SOCKET or {DEFAULT_SOCKET_PATH}).")
+        parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                            help=f"Most texts per model call (default {DEFAULT_MAX_BATCH}).")
+        parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000,
+                            help=f"How long a batch waits for more requests (default {DEFAULT_MAX_WAIT * 1000:g}ms).")
+        parser.add_argument("--no-warmup", action="store_true", help="Load the models on the first request instead.")
+
+    def handle(self, *args, **options):
+        path = (
+            options["socket"]
+            or getattr(settings, "ML_SERVER_SOCKET", None)
+            or os.environ.get("ML_SERVER_SOCKET")
+            or DEFAULT_SOCKET_PATH
+        )
+        if not options["no_warmup"]:
+            warm_up()
+
+        server = InferenceServer(path, max_batch=options["max_batch"], max_wait=options["max_wait_ms"] / 1000)
+        self.stdout.write(f"🧠 ML server listening on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,43 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.core.management.base import BaseCommand
+from ml.training import CLASSIFIERS, DEFAULT_CV_FOLDS, train
+
+
+class Command(BaseCommand):
+    help = (
+        "Train the expense and income classifiers and save their models. The web app only loads "
+        "saved models; it never trains on a request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", choices=[*CLASSIFIERS, "both"], default="both")
+        parser.add_argument(
+            "--cv", type=int, nargs="?", const=DEFAULT_CV_FOLDS, default=0, metavar="FOLDS",
+            help=f"Also report k-fold cross-validation (--cv alone: {DEFAULT_CV_FOLDS} folds).",
+        )
+        parser.add_argument("--workers", type=int, default=2, help="Models trained in parallel processes (1 = in this process).")
+        parser.add_argument("--no-cache", action="store_true", help="Re-encode the training texts instead of reusing cached embeddings.")
+        parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 export used by ML_EMBEDDER_BACKEND.")
+
+    def handle(self, *args, **options):
+        names = list(CLASSIFIERS) if options["model"] == "both" else [options["model"]]
+        kwargs = {
+            "cv_folds": options["cv"],
+            "cache_embeddings": not options["no_cache"],
+            "quantize": not options["no_quantize"],
+        }
+        workers = max(1, min(options["workers"], len(names)))
+
+        if workers == 1:
+            results = [train(name, **kwargs) for name in names]
+        else:
+            # spawn, not fork: torch's thread pools are not fork-safe
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=django.setup) as pool:
+                futures = [pool.submit(train, name, **kwargs) for name in names]
+                results = [future.result() for future in futures]
+
+        for name, path, seconds in results:
+            self.stdout.write(self.style.SUCCESS(f"✅ Trained the {name} classifier in {seconds:.1f}s → {path}"))
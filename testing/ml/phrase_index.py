@@ -0,0 +1,169 @@
+# ml/phrase_index.py
+import csv
+import logging
+import zlib
+from collections import Counter
+import numpy as np
+from django.conf import settings
+from ml.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# 🔧 Override with ML_PHRASE_INDEX (False disables) / ML_PHRASE_THRESHOLD in settings
+DEFAULT_THRESHOLD = 0.75  # Jaccard similarity of character trigram sets
+NGRAM = 3
+NUM_PERM = 32  # MinHash signature length
+BANDS = 8  # LSH bands of NUM_PERM // BANDS rows each
+MAX_CANDIDATES = 64  # verified per band and query, bounds the cost of very common buckets
+
+# Where a category came from, in the order predict_category tries them
+SOURCES = ("keyword", "exact", "near", "model")
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 1 << 63, NUM_PERM // BANDS, dtype=np.uint64) | np.uint64(1)
+
+
+def phrase_index_enabled():
+    return getattr(settings, "ML_PHRASE_INDEX", True)
+
+
+def get_threshold():
+    return getattr(settings, "ML_PHRASE_THRESHOLD", DEFAULT_THRESHOLD)
+
+
+def shingles(text, n=NGRAM):
+    """Character n-grams of an already normalized text, padded so word edges count."""
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def _hashes(grams):
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) & _PRIME for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def signatures(shingle_sets, chunk=200_000):
+    """(len(shingle_sets), NUM_PERM) MinHash signatures, computed a chunk of shingles at a time."""
+    out = np.empty((len(shingle_sets), NUM_PERM), dtype=np.uint64)
+    start = 0
+    while start < len(shingle_sets):
+        stop, size = start, 0
+        while stop < len(shingle_sets) and (size < chunk or stop == start):
+            size += len(shingle_sets[stop])
+            stop += 1
+        hashes = [_hashes(s) for s in shingle_sets[start:stop]]
+        offsets = np.cumsum([0] + [len(h) for h in hashes[:-1]])
+        permuted = (_A[:, None] * np.concatenate(hashes)[None, :] + _B[:, None]) % _PRIME
+        out[start:stop] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = stop
+    return out
+
+
+def band_keys(sigs):
+    """(len(sigs), BANDS) bucket keys; rows sharing a key in any band are candidates."""
+    rows = NUM_PERM // BANDS
+    bands = sigs.reshape(len(sigs), BANDS, rows)
+    return (bands * _BAND_MIX).sum(axis=2)  # wraps mod 2**64, collisions are verified later
+
+
+class PhraseIndex:
+    """
+    Category lookup over labeled training phrases, tried before the embedder.
+
+    Exact tier: a dict from normalized phrase to its label. Near-duplicate
+    tier: MinHash signatures of character trigram sets, bucketed with LSH
+    (one sorted key array per band, searched with np.searchsorted). Candidates
+    are verified with the true Jaccard similarity and the best one is used if
+    it reaches the threshold. Phrases labeled inconsistently in the data
+    without a clear majority are left to the model.
+    """
+
+    def __init__(self, phrases, labels, threshold=DEFAULT_THRESHOLD):
+        votes = {}
+        for phrase, label in zip(phrases, labels):
+            votes.setdefault(normalize_text(phrase), Counter())[label] += 1
+
+        self.exact = {}
+        for phrase, counts in votes.items():
+            (label, top), = counts.most_common(1)
+            if top * 2 > sum(counts.values()):
+                self.exact[phrase] = label
+
+        self.threshold = threshold
+        self.phrases = list(self.exact)
+        self.labels = [self.exact[p] for p in self.phrases]
+        self.shingles = [shingles(p) for p in self.phrases]
+        keys = band_keys(signatures(self.shingles)) if self.phrases else np.empty((0, BANDS), dtype=np.uint64)
+        self.order = np.argsort(keys, axis=0, kind="stable")
+        self.sorted_keys = np.take_along_axis(keys, self.order, axis=0)
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def _nearest(self, grams, keys):
+        candidates = set()
+        for band in range(BANDS):
+            column = self.sorted_keys[:, band]
+            lo = np.searchsorted(column, keys[band], side="left")
+            hi = min(np.searchsorted(column, keys[band], side="right"), lo + MAX_CANDIDATES)
+            candidates.update(self.order[lo:hi, band].tolist())
+        best, best_score = None, 0.0
+        for i in candidates:
+            other = self.shingles[i]
+            score = len(grams & other) / len(grams | other)
+            if score > best_score:
+                best, best_score = i, score
+        return best if best_score >= self.threshold else None
+
+    def lookup(self, texts):
+        """
+        For each text, (category, "exact" | "near") from the training phrases,
+        or None when nothing is similar enough.
+        """
+        results = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            normalized = normalize_text(text)
+            label = self.exact.get(normalized)
+            if label is not None:
+                results[i] = (label, "exact")
+            else:
+                pending.append((i, shingles(normalized)))
+
+        if pending and self.phrases:
+            keys = band_keys(signatures([grams for _, grams in pending]))
+            for (i, grams), row in zip(pending, keys):
+                match = self._nearest(grams, row)
+                if match is not None:
+                    results[i] = (self.labels[match], "near")
+        return results
+
+
+def load_phrase_index(csv_path, text_column, categories):
+    """PhraseIndex over a training CSV, keeping only rows labeled with one of `categories`."""
+    allowed = set(categories)
+    phrases, labels = [], []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("Category") in allowed and row.get(text_column):
+                phrases.append(row[text_column])
+                labels.append(row["Category"])
+    index = PhraseIndex(phrases, labels, threshold=get_threshold())
+    logger.info(f"🔎 Phrase index: {len(index)} phrases from {csv_path}")
+    return index
+
+
+def hit_rate_summary(sources):
+    """One-line report of where an import's categories came from (counts keyed by SOURCES)."""
+    total = sum(sources.get(s, 0) for s in SOURCES)
+    if not total:
+        return ""
+    exact, near = sources.get("exact", 0), sources.get("near", 0)
+    return (
+        f"🔎 Categories: {exact + near} of {total} ({(exact + near) / total:.0%}) matched known phrases "
+        f"({exact} exact, {near} near), {sources.get('keyword', 0)} by keyword, {sources.get('model', 0)} by the model."
+    )
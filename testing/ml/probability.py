@@ -2,9 +2,8 @@
 
 from datetime import date
 from dateutil.relativedelta import relativedelta
-import math
+from bisect import bisect_left
 import numpy as np
-from sklearn.linear_model import LinearRegression
 from django.db.models import F
 from savings.models import SavingsGoal
 
@@ -20,25 +19,27 @@ def _get_last_n_months_surplus(user, n=DEFAULT_LOOKBACK_MONTHS):
     """
     Get the last n months of surplus for the user.
     """
-    from savings.utils import calculate_monthly_surplus
+    from finance.rollups import income_expense_by_month
 
     today = date.today()
-    surpluses = []
+    months = [today - relativedelta(months=i) for i in range(n, 0, -1)]
+    if not months:
+        return []
+    totals = income_expense_by_month(user, months[0], months[-1])
 
-    for i in range(n, 0, -1):
-        month_date = today - relativedelta(months=i)
-        surplus = calculate_monthly_surplus(user, month_date.year, month_date.month)
-        surpluses.append(float(surplus))
+    surpluses = []
+    for month_date in months:
+        income, expense = totals.get((month_date.year, month_date.month), (0, 0))
+        surpluses.append(float(max(income - expense, 0)))
 
     return surpluses
 
 
-def _estimate_monthly_slope(user):
+def _slope_from_surpluses(last):
     """
-    Estimate the monthly savings slope based on past surplus.
+    Monthly savings slope from a surplus history (oldest first).
     """
-    last = _get_last_n_months_surplus(user)
-    if not last:
+    if len(last) == 0:
         return 0.0
 
     n = len(last)
@@ -47,6 +48,7 @@ def _estimate_monthly_slope(user):
     if n >= MIN_REGRESSION_MONTHS:
         X = np.arange(n).reshape(-1, 1)
         y = np.cumsum(last)
+        from sklearn.linear_model import LinearRegression  # deferred: sklearn is slow to import
         try:
             model = LinearRegression().fit(X, y)
             slope = float(model.coef_[0])
@@ -57,92 +59,125 @@ def _estimate_monthly_slope(user):
     return max(0.0, avg)
 
 
-def _months_between(a: date, b: date):
+def _estimate_monthly_slope(user):
     """
-    Calculate the number of months between two dates.
+    Estimate the monthly savings slope based on past surplus.
     """
-    return max((b.year - a.year) * 12 + (b.month - a.month), 0)
+    return _slope_from_surpluses(_get_last_n_months_surplus(user))
 
 
-def predict_goal_probability(user, goal: SavingsGoal):
+def _months_between(a: date, b: date):
     """
-    Predict the probability of achieving a savings goal.
+    Calculate the number of months between two dates.
     """
-    today = date.today()
-
-    # Remaining amount check
-    remaining = float(goal.remaining_amount())
-    if remaining <= 0:
-        return {"probability": 100.0, "suggested_deadline": "--"}
-
-    slope = _estimate_monthly_slope(user)
-    if slope <= 0:
-        return {"probability": 0.0, "suggested_deadline": "--"}
-
-    # Get all other active goals of the user
-    higher_goals = SavingsGoal.objects.filter(
-        user=user,
-        current_amount__lt=F("target_amount")
-    ).exclude(id=goal.id)
+    return max((b.year - a.year) * 12 + (b.month - a.month), 0)
 
-    far_future = date(9999, 12, 31)
 
-    def _effective_deadline(g):
-        return g.deadline if g.deadline else far_future
+FAR_FUTURE = date(9999, 12, 31)
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
 
-    priority_rank = {"High": 0, "Medium": 1, "Low": 2}
 
-    # Sort goals by deadline, priority, creation date, and ID
-    goals_list = sorted(
-        higher_goals,
-        key=lambda g: (
-            _effective_deadline(g),
-            priority_rank.get(getattr(g, "priority", "Low"), 3),
-            getattr(g, "created_at", date.min),
-            g.id
-        )
+def _goal_order(g):
+    """Sort key by deadline, priority, creation date, and ID."""
+    return (
+        g.deadline if g.deadline else FAR_FUTURE,
+        PRIORITY_RANK.get(getattr(g, "priority", "Low"), 3),
+        getattr(g, "created_at", date.min),
+        g.id,
     )
 
-    # Filter only goals ahead of the current goal
-    priors = [
-        h for h in goals_list
-        if (_effective_deadline(h),
-            priority_rank.get(h.priority, 3),
-            getattr(h, "created_at", date.min),
-            h.id) < (_effective_deadline(goal),
-                     priority_rank.get(goal.priority, 3),
-                     getattr(goal, "created_at", date.min),
-                     goal.id)
-    ]
-
-    # Calculate months until the goal's deadline
-    months_to_deadline = _months_between(today, date(goal.deadline.year, goal.deadline.month, 1)) \
-        if goal.deadline else 999
-
-    # Account for prior goals
-    months_consumed = 0
-    for prior in priors:
-        prior_remaining = float(prior.target_amount - prior.current_amount)
-        if prior_remaining <= 0:
-            continue
-        months_needed = math.ceil((prior_remaining / slope) * LEEWAY_FACTOR)
-        months_consumed += months_needed
-        if months_consumed >= months_to_deadline:
-            return {"probability": 0.0, "suggested_deadline": "--"}
-
-    # Calculate probability for the current goal
-    months_available = max(months_to_deadline - months_consumed, 0)
-    projected_total = float(goal.current_amount) + slope * months_available
-    prob = round(min(projected_total / float(goal.target_amount), 1.0) * 100, 2)
-
-    # Suggested deadline calculation
-    sd = "--"
-    if prob < 100:
-        months_to_finish = math.ceil((remaining / slope) * LEEWAY_FACTOR) + months_consumed
-        try:
-            sd = today + relativedelta(months=months_to_finish)
-        except Exception:
-            sd = "--"
 
-    return {"probability": prob, "suggested_deadline": sd}
+class SavingsProfile:
+    """
+    Everything goal predictions need about one user, computed once per request:
+    the monthly surplus vector (one grouped query), the fitted monthly slope,
+    and the user's open goals in allocation order with the months each one
+    needs. Probabilities for any number of goals are then evaluated together
+    with NumPy.
+    """
+
+    def __init__(self, user, lookback=DEFAULT_LOOKBACK_MONTHS, today=None):
+        self.user = user
+        self.today = today or date.today()
+        self.surpluses = np.asarray(_get_last_n_months_surplus(user, lookback), dtype=float)
+        self.slope = _slope_from_surpluses(self.surpluses)
 
+        # All active goals of the user, in priority order
+        self.goals = sorted(
+            SavingsGoal.objects.filter(user=user, current_amount__lt=F("target_amount")),
+            key=_goal_order,
+        )
+        self._keys = [_goal_order(g) for g in self.goals]
+        remaining = np.array([float(g.target_amount - g.current_amount) for g in self.goals], dtype=float)
+        if self.slope > 0:
+            months_needed = np.ceil((remaining / self.slope) * LEEWAY_FACTOR)
+        else:
+            months_needed = np.zeros_like(remaining)
+        # consumed_before[i] = months taken by the goals ahead of position i
+        self._consumed_before = np.concatenate(([0.0], np.cumsum(months_needed)))
+        self._results = {}
+
+    def _months_consumed(self, goal):
+        """Months used by the active goals that come before this goal."""
+        position = bisect_left(self._keys, _goal_order(goal))
+        return self._consumed_before[position]
+
+    def predict_many(self, goals):
+        """Probability and suggested deadline for each goal, keyed by goal id."""
+        goals = [g for g in goals if g.id not in self._results]
+        open_goals = []
+        for goal in goals:
+            if float(goal.remaining_amount()) <= 0:
+                self._results[goal.id] = {"probability": 100.0, "suggested_deadline": "--"}
+            elif self.slope <= 0:
+                self._results[goal.id] = {"probability": 0.0, "suggested_deadline": "--"}
+            else:
+                open_goals.append(goal)
+
+        if open_goals:
+            slope = self.slope
+            consumed = np.array([self._months_consumed(g) for g in open_goals], dtype=float)
+            months_to_deadline = np.array([
+                _months_between(self.today, date(g.deadline.year, g.deadline.month, 1)) if g.deadline else 999
+                for g in open_goals
+            ], dtype=float)
+            current = np.array([float(g.current_amount) for g in open_goals], dtype=float)
+            target = np.array([float(g.target_amount) for g in open_goals], dtype=float)
+            remaining = np.array([float(g.remaining_amount()) for g in open_goals], dtype=float)
+
+            # Earlier goals use up all months before the deadline
+            blocked = (consumed > 0) & (consumed >= months_to_deadline)
+            months_available = np.maximum(months_to_deadline - consumed, 0)
+            projected = current + slope * months_available
+            ratio = np.minimum(projected / target, 1.0) * 100
+            months_to_finish = np.ceil((remaining / slope) * LEEWAY_FACTOR) + consumed
+
+            for i, goal in enumerate(open_goals):
+                if blocked[i]:
+                    self._results[goal.id] = {"probability": 0.0, "suggested_deadline": "--"}
+                    continue
+                prob = round(float(ratio[i]), 2)
+                sd = "--"
+                if prob < 100:
+                    try:
+                        sd = self.today + relativedelta(months=int(months_to_finish[i]))
+                    except Exception:
+                        sd = "--"
+                self._results[goal.id] = {"probability": prob, "suggested_deadline": sd}
+
+        return self._results
+
+    def predict(self, goal):
+        if goal.id not in self._results:
+            self.predict_many([goal])
+        return self._results[goal.id]
+
+
+def predict_goal_probability(user, goal: SavingsGoal, profile=None):
+    """
+    Predict the probability of achieving a savings goal.
+    Pass a SavingsProfile to reuse one user's history across many goals.
+    """
+    if profile is None:
+        profile = SavingsProfile(user)
+    return profile.predict(goal)
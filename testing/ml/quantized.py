@@ -0,0 +1,80 @@
+# ml/quantized.py
+import logging
+import os
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+# "float": the full-precision SentenceTransformer (default)
+# "int8":  the same model with its Linear layers dynamically quantized to int8
+BACKENDS = ("float", "int8")
+DEFAULT_BACKEND = "float"
+
+
+def get_backend():
+    """Embedder backend from ML_EMBEDDER_BACKEND (setting or environment)."""
+    backend = (
+        getattr(settings, "ML_EMBEDDER_BACKEND", None)
+        or os.environ.get("ML_EMBEDDER_BACKEND")
+        or DEFAULT_BACKEND
+    )
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"ML_EMBEDDER_BACKEND must be one of {', '.join(BACKENDS)}, not {backend!r}")
+    return backend
+
+
+def quantized_path(model_path):
+    """expense_classifier_model.pkl -> expense_classifier_model.int8.pkl"""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.int8{ext}"
+
+
+def embedding_version(embedder_name, bundle):
+    """Embedding cache version key: int8 vectors differ slightly, so they are cached apart."""
+    backend = bundle.get("backend", "float")
+    return embedder_name if backend == "float" else f"{embedder_name}:{backend}"
+
+
+def quantize_embedder(embedder):
+    """
+    Copy of a SentenceTransformer with every torch.nn.Linear replaced by a
+    dynamically quantized int8 one: weights are stored as int8 and activations
+    are quantized on the fly, which roughly quarters the transformer's size
+    and speeds up CPU inference. Tokenizer and pooling are unchanged.
+    """
+    import copy
+    import torch
+
+    return torch.quantization.quantize_dynamic(copy.deepcopy(embedder).cpu(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_quantized(bundle, model_path, save=True):
+    """
+    Quantized bundle (int8 embedder + the same logistic-regression head) for a
+    trained float bundle, saved next to model_path when save is True.
+    """
+    quantized = {
+        "embedder": quantize_embedder(bundle["embedder"]),
+        "classifier": bundle["classifier"],
+        "backend": "int8",
+    }
+    if save:
+        import joblib
+        path = quantized_path(model_path)
+        joblib.dump(quantized, path)
+        print(f"Quantized model saved at {path}")
+    return quantized
+
+
+def load_quantized(model_path, load_float):
+    """
+    The saved int8 bundle for model_path; if it was never exported, export it
+    now from the float bundle returned by load_float().
+    """
+    path = quantized_path(model_path)
+    if os.path.exists(path):
+        import joblib
+        return joblib.load(path)
+    logger.info(f"🔧 No quantized model at {path}; exporting it from the float model")
+    return export_quantized(load_float(), model_path)
@@ -0,0 +1,80 @@
+# ml/registry.py
+import logging
+import time
+from importlib import import_module
+
+logger = logging.getLogger(__name__)
+
+# Public name -> (module, attribute). Modules are imported on first use, so
+# importing views or running manage.py migrate never loads sentence_transformers,
+# torch, sklearn or pandas.
+REGISTRY = {
+    "predict_expense_category": ("ml.classifier", "predict_category"),
+    "predict_income_category": ("ml.income_classifier", "predict_category"),
+    "classify_expense": ("ml.classifier", "classify"),
+    "classify_income": ("ml.income_classifier", "classify"),
+    "get_user_expense_forecast": ("ml.forecasting", "get_user_expense_forecast"),
+}
+
+CLASSIFIER_MODULES = ("ml.classifier", "ml.income_classifier")
+
+# Narrations no keyword rule matches, so warm-up runs the embedder and classifier
+WARMUP_TEXTS = ["warm up ref 0001 qzx", "startup check transfer 42"]
+
+
+def resolve(name):
+    """The real function behind a registry name, importing its module if needed."""
+    module, attr = REGISTRY[name]
+    return getattr(import_module(module), attr)
+
+
+def _deferred(name):
+    def call(*args, **kwargs):
+        return resolve(name)(*args, **kwargs)
+    call.__name__ = name
+    call.__doc__ = f"Deferred {'.'.join(REGISTRY[name])}; the module is imported on first call."
+    return call
+
+
+def _served(model, name, with_sources=False):
+    def call(texts, **kwargs):
+        from ml import client  # the sidecar client, with in-process fallback
+        return (client.classify if with_sources else client.predict)(model, texts, **kwargs)
+    call.__name__ = name
+    call.__doc__ = (
+        f"{'.'.join(REGISTRY[name])} via the ML_SERVER_SOCKET sidecar when configured, "
+        "otherwise in-process (imported on first call)."
+    )
+    return call
+
+
+predict_expense_category = _served("expense", "predict_expense_category")
+predict_income_category = _served("income", "predict_income_category")
+# (category, source) pairs, for reporting how many came from the phrase index
+classify_expense = _served("expense", "classify_expense", with_sources=True)
+classify_income = _served("income", "classify_income", with_sources=True)
+get_user_expense_forecast = _deferred("get_user_expense_forecast")
+
+
+def warm_up():
+    """
+    Load both classifiers and push a small batch through each, so the first
+    request does not pay for imports, the phrase index, unpickling and the
+    first forward pass.
+    Called from FinanceConfig.ready() when ML_WARMUP_ON_STARTUP is enabled.
+    """
+    from ml.training import ModelNotTrained
+
+    for name in CLASSIFIER_MODULES:
+        start = time.perf_counter()
+        module = import_module(name)
+        module.get_phrase_index()
+        try:
+            bundle = module.load_classifier()
+        except ModelNotTrained as e:
+            logger.warning(f"⚠️ Skipped warming up {name}: {e}")
+            continue
+        # Straight to the model, bypassing the embedding cache, so every start exercises it
+        embeddings = module.encode_texts(bundle["embedder"], WARMUP_TEXTS)
+        bundle["classifier"].predict_proba(embeddings)
+        logger.info(f"🔥 Warmed up {name} in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,206 @@
+# ml/server.py
+import json
+import logging
+import os
+import queue
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Used by run_ml_server when neither --socket nor ML_SERVER_SOCKET is given
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "pfm-ml.sock")
+DEFAULT_MAX_BATCH = 256  # texts per model call
+DEFAULT_MAX_WAIT = 0.005  # seconds a batch waits for more requests
+DEFAULT_REQUEST_TIMEOUT = 60  # seconds a request waits for its batch before the server gives up
+
+# Model name on the wire -> ml.registry name of the in-process function
+MODELS = {
+    "expense": "classify_expense",
+    "income": "classify_income",
+}
+
+_HEADER = struct.Struct("!I")
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+# ------------------ Wire protocol: 4-byte length + JSON ------------------ #
+def send_message(sock, obj):
+    body = json.dumps(obj).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock):
+    """Next message, or None if the peer closed the connection between messages."""
+    header = sock.recv(_HEADER.size)
+    if not header:
+        return None
+    header += _recv_exactly(sock, _HEADER.size - len(header))
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"message of {size} bytes exceeds the {MAX_MESSAGE_BYTES} byte limit")
+    return json.loads(_recv_exactly(sock, size))
+
+
+# ------------------ Request batching ------------------ #
+class _Pending:
+    __slots__ = ("texts", "kwargs", "future")
+
+    def __init__(self, texts, kwargs):
+        self.texts = texts
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+class Batcher:
+    """
+    Funnels concurrent predict requests for one model through a single thread.
+    Requests arriving within max_wait of each other (up to max_batch texts)
+    are concatenated into one predict call, then the results are split back.
+    """
+
+    def __init__(self, predict, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT, name="batcher"):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.calls = 0  # model calls made, for tests and stats
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, texts, kwargs=None):
+        pending = _Pending(list(texts), kwargs or {})
+        self._queue.put(pending)
+        return pending.future
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, size = [first], len(first.texts)
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item.texts)
+            self._run(batch)
+            if stopping:
+                return
+
+    def _run(self, batch):
+        # Requests with different options (e.g. confidence_threshold) need separate calls
+        groups = defaultdict(list)
+        for pending in batch:
+            groups[tuple(sorted(pending.kwargs.items()))].append(pending)
+        for key, items in groups.items():
+            texts = [t for pending in items for t in pending.texts]
+            try:
+                self.calls += 1
+                results = list(self.predict(texts, **dict(key))) if texts else []
+            except Exception as e:
+                for pending in items:
+                    pending.future.set_exception(e)
+                continue
+            start = 0
+            for pending in items:
+                end = start + len(pending.texts)
+                pending.future.set_result(results[start:end])
+                start = end
+
+
+# ------------------ Server ------------------ #
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # One connection may carry many requests
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, ValueError) as e:
+                logger.warning(f"⚠️ Dropped ML client connection: {e}")
+                return
+            if message is None:
+                return
+            reply = self.server.dispatch(message)
+            try:
+                send_message(self.request, reply)
+            except OSError as e:  # e.g. the client timed out and hung up
+                logger.warning(f"⚠️ Could not reply to ML client: {e}")
+                return
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serves classify() for both classifiers over a Unix socket, so one
+    process holds the models for every web worker. Each model has its own
+    Batcher; `predictors` maps model name -> classify function (defaults to the
+    in-process functions from ml.registry).
+    """
+    daemon_threads = True
+
+    def __init__(self, path, predictors=None, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT):
+        if predictors is None:
+            from ml.registry import resolve
+            predictors = {model: resolve(name) for model, name in MODELS.items()}
+        self.batchers = {
+            model: Batcher(fn, max_batch, max_wait, name=f"ml-batcher-{model}")
+            for model, fn in predictors.items()
+        }
+        self.request_timeout = request_timeout
+        if os.path.exists(path):
+            os.unlink(path)  # stale socket from a previous run
+        super().__init__(path, _Handler)
+
+    def dispatch(self, message):
+        op = message.get("op")
+        if op == "ping":
+            return {"ok": True, "models": sorted(self.batchers)}
+        if op != "predict":
+            return {"ok": False, "error": f"unknown op {op!r}"}
+        batcher = self.batchers.get(message.get("model"))
+        if batcher is None:
+            return {"ok": False, "error": f"unknown model {message.get('model')!r}"}
+        try:
+            future = batcher.submit(message.get("texts") or [], message.get("kwargs"))
+            return {"ok": True, "categories": future.result(timeout=self.request_timeout)}
+        except Exception as e:
+            logger.exception("❌ ML server prediction failed")
+            return {"ok": False, "error": repr(e)}
+
+    def server_close(self):
+        super().server_close()
+        for batcher in self.batchers.values():
+            batcher.stop()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
@@ -0,0 +1,272 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+import joblib
+import numpy as np
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from ml import classifier, client
+from ml.checks import trained_models_check
+from ml.embedding_cache import EmbeddingCache
+from ml.phrase_index import PhraseIndex, hit_rate_summary
+from ml.quantized import embedding_version, get_backend, quantized_path
+from ml.registry import predict_expense_category
+from ml.server import InferenceServer
+from ml.training import ModelNotTrained, training_embeddings
+
+# Create your tests here.
+
+
+class SlowUpper:
+    """Fake predict_category: upper-cases texts and counts its calls."""
+
+    def __init__(self):
+        self.calls = []
+        self.delay = 0.02
+
+    def __call__(self, texts, confidence_threshold=0.4):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        return [f"{t.upper()}@{confidence_threshold}" for t in texts]
+
+
+class InferenceServerTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "ml.sock")
+        self.predict = SlowUpper()
+        self.server = InferenceServer(self.path, {"expense": self.predict}, max_wait=0.05)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        client._down_until = 0.0
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        client._drop_connection()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_round_trip_and_errors(self):
+        self.assertEqual(client.call(self.path, {"op": "ping"}), {"ok": True, "models": ["expense"]})
+        self.assertEqual(client.remote_predict(self.path, "expense", ["a", "b"], {}), ["A@0.4", "B@0.4"])
+        self.assertEqual(
+            client.remote_predict(self.path, "expense", ["c"], {"confidence_threshold": 0.9}), ["C@0.9"]
+        )
+        with self.assertRaises(client.RemoteError):
+            client.remote_predict(self.path, "income", ["d"], {})
+
+    def test_timeouts_and_remote_errors_raise_without_retry_or_fallback(self):
+        self.predict.delay = 0.5
+        # Longer than the batcher's max_wait, so the request reaches the model before timing out
+        with override_settings(ML_SERVER_SOCKET=self.path, ML_SERVER_TIMEOUT=0.2):
+            with self.assertLogs("ml.client", "WARNING"), self.assertRaises(TimeoutError):
+                client.classify("expense", ["slow"])
+            self.assertEqual(self.predict.calls, [["slow"]])  # sent once, not resent
+            with self.assertRaises(client.RemoteError):
+                client.classify("income", ["salary credit"])  # this server has no income model
+        self.assertEqual(client._down_until, 0.0)  # the sidecar is not treated as down
+
+    def test_concurrent_requests_are_batched(self):
+        results = {}
+
+        def request(i):
+            results[i] = client.remote_predict(self.path, "expense", [f"t{i}a", f"t{i}b"], {})
+            client._drop_connection()
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Every client gets its own rows back, from fewer model calls than requests
+        self.assertEqual(results, {i: [f"T{i}A@0.4", f"T{i}B@0.4"] for i in range(8)})
+        self.assertLess(len(self.predict.calls), 8)
+        self.assertEqual(sum(len(c) for c in self.predict.calls), 16)
+
+
+class ClientFallbackTests(SimpleTestCase):
+    def setUp(self):
+        client._down_until = 0.0
+        client._drop_connection()
+
+    def tearDown(self):
+        client._down_until = 0.0
+
+    def test_unreachable_server_falls_back_in_process(self):
+        missing = os.path.join(tempfile.gettempdir(), "pfm-ml-missing.sock")
+        with override_settings(ML_SERVER_SOCKET=missing):
+            with self.assertLogs("ml.client", "WARNING"):
+                # Keyword hits only, so the in-process path needs no model
+                categories = predict_expense_category(["Uber ride", "Monthly rent"])
+        self.assertEqual(categories, ["Transportation", "Housing & Utilities"])
+        self.assertGreater(client._down_until, time.monotonic())
+
+
+class FakeEmbedder:
+    """Two-dimensional "embeddings" (length, call number) that record every encode call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=64, show_progress_bar=False):
+        self.calls.append(list(texts))
+        return np.array([[len(t), len(self.calls)] for t in texts], dtype=np.float32)
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.db_path = os.path.join(self.tmp, "cache.sqlite3")
+        self.embedder = FakeEmbedder()
+
+    def cache(self, **kwargs):
+        cache = EmbeddingCache(db_path=self.db_path, **kwargs)
+        self.addCleanup(lambda: cache._conn and cache._conn.close())
+        return cache
+
+    def test_lookups_go_memory_then_disk_then_encoder(self):
+        first = self.cache()
+        vectors = first.encode(self.embedder, ["Uber ride", "rent", "uber  RIDE"], "v1")
+        self.assertEqual(self.embedder.calls, [["Uber ride", "rent"]])  # normalized duplicates encoded once
+        np.testing.assert_array_equal(vectors[0], vectors[2])
+
+        first.encode(self.embedder, ["rent"], "v1")
+        self.assertEqual((first.memory_hits, first.disk_hits, first.misses), (1, 0, 2))
+
+        # A new process finds the vectors on disk and only encodes what is new
+        second = self.cache()
+        vectors = second.encode(self.embedder, ["rent", "gym"], "v1")
+        self.assertEqual(self.embedder.calls[-1], ["gym"])
+        np.testing.assert_array_equal(vectors[0], [4, 1])
+        self.assertEqual((second.memory_hits, second.disk_hits, second.misses), (0, 1, 1))
+        self.assertEqual(second.stats()["hit_rate"], 0.5)
+
+        # Another model version never reuses these vectors
+        second.encode(self.embedder, ["rent"], "v2")
+        self.assertEqual(self.embedder.calls[-1], ["rent"])
+
+    def test_both_tiers_are_bounded(self):
+        cache = self.cache(max_items=2, max_disk_items=3)
+        for text in ["a", "bb", "ccc", "dddd"]:
+            cache.encode(self.embedder, [text], "v1")
+        self.assertEqual(cache.stats()["memory_items"], 2)
+        keys = {key for key, in cache._db().execute("SELECT key FROM embeddings")}
+        self.assertEqual(keys, {cache.make_key(t, "v1") for t in ["bb", "ccc", "dddd"]})
+
+
+class QuantizedBackendTests(SimpleTestCase):
+    def test_backend_setting(self):
+        with override_settings(ML_EMBEDDER_BACKEND="int8"):
+            self.assertEqual(get_backend(), "int8")
+        with override_settings(ML_EMBEDDER_BACKEND="fp4"):
+            with self.assertRaises(ImproperlyConfigured):
+                get_backend()
+
+    def test_int8_embeddings_are_cached_apart(self):
+        self.assertEqual(quantized_path("/m/expense_classifier_model.pkl"), "/m/expense_classifier_model.int8.pkl")
+        self.assertEqual(embedding_version("all-MiniLM-L6-v2", {}), "all-MiniLM-L6-v2")
+        self.assertEqual(embedding_version("all-MiniLM-L6-v2", {"backend": "int8"}), "all-MiniLM-L6-v2:int8")
+
+    def test_load_classifier_picks_the_backend(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        model_path = os.path.join(tmp, "expense_classifier_model.pkl")
+        joblib.dump({"embedder": "int8 embedder", "classifier": "head", "backend": "int8"}, quantized_path(model_path))
+
+        saved = dict(classifier._model_bundles)
+        self.addCleanup(lambda: (classifier._model_bundles.clear(), classifier._model_bundles.update(saved)))
+        classifier._model_bundles.clear()
+        classifier._model_bundles["float"] = {"embedder": "float embedder", "classifier": "head"}
+
+        with patch.object(classifier, "MODEL_PATH", model_path):
+            with override_settings(ML_EMBEDDER_BACKEND="int8"):
+                self.assertEqual(classifier.load_classifier()["embedder"], "int8 embedder")
+            self.assertEqual(classifier.load_classifier("float")["embedder"], "float embedder")
+
+
+class PhraseIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = PhraseIndex(
+            ["Swiggy Instamart order", "swiggy  instamart order", "Metro card recharge", "gift card", "gift card"],
+            ["Food & Dining", "Food & Dining", "Transportation", "Personal & Shopping", "Financial"],
+        )
+
+    def test_exact_then_near_duplicates(self):
+        self.assertEqual(
+            self.index.lookup(["SWIGGY INSTAMART ORDER", "metro card recharges", "electricity board"]),
+            [("Food & Dining", "exact"), ("Transportation", "near"), None],
+        )
+
+    def test_phrases_without_a_majority_label_are_left_to_the_model(self):
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.lookup(["gift card"]), [None])
+
+    def test_hit_rate_summary(self):
+        summary = hit_rate_summary({"exact": 6, "near": 2, "keyword": 1, "model": 1})
+        self.assertIn("8 of 10 (80%) matched known phrases (6 exact, 2 near)", summary)
+        self.assertEqual(hit_rate_summary({}), "")
+
+    def test_classify_uses_the_training_phrases_before_the_model(self):
+        # A bundled training phrase with no keyword rule: no embedder needed
+        self.assertEqual(
+            classifier.classify(["Startup bootcamp", "pharmacy run"]),
+            [("Education", "exact"), ("Health & Fitness", "keyword")],
+        )
+
+
+class TrainingCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.encoded = []
+
+    def encode(self, embedder, texts):
+        self.encoded.append(list(texts))
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float64)
+
+    def test_embeddings_are_encoded_once_per_dataset_and_model(self):
+        texts = ["uber ride", "rent"]
+        first = training_embeddings(None, texts, "all-MiniLM-L6-v2", self.encode, cache_dir=self.tmp)
+        again = training_embeddings(None, texts, "all-MiniLM-L6-v2", self.encode, cache_dir=self.tmp)
+
+        self.assertEqual(len(self.encoded), 1)
+        self.assertIsInstance(again, np.memmap)
+        self.assertEqual(again.dtype, np.float32)
+        np.testing.assert_array_equal(first, [[9, 0], [4, 1]])
+        np.testing.assert_array_equal(again, first)
+
+        # A changed dataset or another embedder gets its own file
+        training_embeddings(None, texts + ["gym"], "all-MiniLM-L6-v2", self.encode, cache_dir=self.tmp)
+        training_embeddings(None, texts, "other/model", self.encode, cache_dir=self.tmp)
+        self.assertEqual(len(self.encoded), 3)
+        self.assertEqual(len(os.listdir(self.tmp)), 3)
+
+    def test_missing_model_is_never_trained_on_demand(self):
+        saved = dict(classifier._model_bundles)
+        self.addCleanup(lambda: (classifier._model_bundles.clear(), classifier._model_bundles.update(saved)))
+        classifier._model_bundles.clear()
+
+        with patch.object(classifier, "MODEL_PATH", os.path.join(self.tmp, "missing.pkl")), \
+                patch.object(classifier, "train_classifier") as train_classifier:
+            with self.assertRaisesMessage(ModelNotTrained, "manage.py train_classifiers"):
+                classifier.load_classifier("float")
+        train_classifier.assert_not_called()
+
+    def test_missing_model_falls_back_and_is_reported_by_check(self):
+        saved = dict(classifier._model_bundles)
+        self.addCleanup(lambda: (classifier._model_bundles.clear(), classifier._model_bundles.update(saved)))
+        classifier._model_bundles.clear()
+
+        with patch.object(classifier, "MODEL_PATH", os.path.join(self.tmp, "missing.pkl")), \
+                override_settings(ML_EMBEDDER_BACKEND="float"):
+            with self.assertLogs("ml.classifier", "WARNING"):
+                results = classifier.classify(["pharmacy run", "zq unmatched ref 77"])
+            warnings = trained_models_check(None)
+        self.assertEqual(results, [("Health & Fitness", "keyword"), (classifier.MISC_CATEGORY, "model")])
+        self.assertIn("ml.W001", [w.id for w in warnings])
@@ -0,0 +1,77 @@
+# ml/training.py
+import hashlib
+import os
+import re
+import time
+from importlib import import_module
+import numpy as np
+from django.conf import settings
+
+# Classifier name -> module with train_classifier(), for manage.py train_classifiers
+CLASSIFIERS = {
+    "expense": "ml.classifier",
+    "income": "ml.income_classifier",
+}
+
+DEFAULT_CV_FOLDS = 5
+
+
+class ModelNotTrained(RuntimeError):
+    """No saved model; models are only trained by manage.py train_classifiers."""
+
+    def __init__(self, model_path):
+        super().__init__(f"No trained model at {model_path}. Run `python manage.py train_classifiers` first.")
+        self.model_path = model_path
+
+
+# ------------------ Training embedding cache ------------------ #
+def get_cache_dir():
+    """ML_TRAINING_CACHE_DIR, default ml/training_cache."""
+    return getattr(settings, "ML_TRAINING_CACHE_DIR", None) or os.path.join(os.path.dirname(__file__), "training_cache")
+
+
+def dataset_hash(texts):
+    """Hash of the preprocessed training texts, so edits to the CSV or to preprocessing miss the cache."""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def embeddings_path(texts, model_name, cache_dir=None):
+    safe_model = re.sub(r"[^A-Za-z0-9._-]", "_", model_name)
+    return os.path.join(cache_dir or get_cache_dir(), f"{safe_model}-{dataset_hash(texts)}.npy")
+
+
+def training_embeddings(embedder, texts, model_name, encode, cache_dir=None):
+    """
+    Embeddings of every training text, as a read-only memory-mapped .npy keyed
+    by dataset hash and model name. Only the first run for a dataset encodes
+    anything; later runs (and parallel trainers) map the same file.
+    """
+    path = embeddings_path(texts, model_name, cache_dir)
+    if os.path.exists(path):
+        cached = np.load(path, mmap_mode="r")
+        if len(cached) == len(texts):
+            return cached
+
+    vectors = np.asarray(encode(embedder, texts), dtype=np.float32)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, vectors)
+    os.replace(tmp_path, path)  # readers never see a partial file
+    return np.load(path, mmap_mode="r")
+
+
+# ------------------ Training entry point ------------------ #
+def train(name, cv_folds=0, cache_embeddings=True, quantize=True):
+    """
+    Train and save one classifier; runs in a worker process of train_classifiers.
+    Returns (name, model path, seconds) so no model crosses the process boundary.
+    """
+    module = import_module(CLASSIFIERS[name])
+    start = time.perf_counter()
+    module.train_classifier(cv_folds=cv_folds, cache_embeddings=cache_embeddings, quantize=quantize)
+    return name, module.MODEL_PATH, time.perf_counter() - start
@@ -0,0 +1,58 @@
+# savings/reallocation.py
+import threading
+from contextlib import contextmanager
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+_state = threading.local()
+
+
+def _dirty():
+    if not hasattr(_state, "dirty"):
+        _state.dirty = set()
+    return _state.dirty
+
+
+def _batch_depth():
+    return getattr(_state, "depth", 0)
+
+
+def _flush(user_id):
+    """on_commit callback: run one reallocation if the user is still marked dirty."""
+    dirty = _dirty()
+    if user_id not in dirty:
+        return  # an earlier callback in this commit already handled it
+    dirty.discard(user_id)
+    from .utils import surplus_rollover
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is not None:
+        surplus_rollover(user)
+
+
+def schedule_reallocation(user):
+    """
+    Mark a user's savings allocation as stale. The reallocation runs once, after
+    the surrounding transaction commits (immediately in autocommit mode), no
+    matter how many Income/Expense rows changed. Inside batched_reallocation()
+    it is deferred until the outermost batch exits.
+    """
+    user_id = getattr(user, "pk", user)
+    _dirty().add(user_id)
+    if not _batch_depth():
+        transaction.on_commit(lambda: _flush(user_id))
+
+
+@contextmanager
+def batched_reallocation():
+    """
+    Suppress per-row reallocations in bulk code paths (imports, bulk deletes,
+    recurring catch-up) and run one per affected user when the block exits.
+    """
+    _state.depth = _batch_depth() + 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+        if not _state.depth:
+            for user_id in list(_dirty()):
+                transaction.on_commit(lambda user_id=user_id: _flush(user_id))
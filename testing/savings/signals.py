@@ -4,23 +4,24 @@ from django.dispatch import receiver
 
 from finance.models import Income, Expense
 
-from .utils import surplus_rollover
+from .reallocation import schedule_reallocation
 
 
 def recalc_goal_allocations(user):
-    surplus_rollover(user)
+    # Coalesced: one surplus_rollover per user after the transaction commits
+    schedule_reallocation(user)
 
 # -------------------------
 # Income Signals
 # -------------------------
 @receiver(post_save, sender=Income)
 def income_saved(sender, instance, created, **kwargs):
-    recalc_goal_allocations(instance.user)
+    recalc_goal_allocations(instance.user_id)
 
 
 @receiver(post_delete, sender=Income)
 def income_deleted(sender, instance, **kwargs):
-    recalc_goal_allocations(instance.user)
+    recalc_goal_allocations(instance.user_id)
 
 
 # -------------------------
@@ -28,12 +29,12 @@ def income_deleted(sender, instance, **kwargs):
 # -------------------------
 @receiver(post_save, sender=Expense)
 def expense_saved(sender, instance, created, **kwargs):
-    recalc_goal_allocations(instance.user)
+    recalc_goal_allocations(instance.user_id)
 
 
 @receiver(post_delete, sender=Expense)
 def expense_deleted(sender, instance, **kwargs):
-    recalc_goal_allocations(instance.user)
+    recalc_goal_allocations(instance.user_id)
 
 
 
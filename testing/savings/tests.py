@@ -4,6 +4,10 @@ from datetime import date, timedelta
 from decimal import Decimal
 from savings.models import SavingsGoal, SurplusTracker
 from savings.utils import surplus_rollover
+from savings.reallocation import batched_reallocation
+from finance.models import Income
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 User = get_user_model()
 
@@ -60,4 +64,62 @@ class SurplusRolloverTests(TestCase):
         # ✅ Current month resets to 0
         self.assertEqual(balances["current_balance"], Decimal("0"))
 
-        print("Test Passed: Surplus rollover correctly allocated across multiple goals.")
\ No newline at end of file
+        print("Test Passed: Surplus rollover correctly allocated across multiple goals.")
+
+
+class BatchedReallocationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="batchuser", password="password123")
+        self.goal = SavingsGoal.objects.create(
+            user=self.user, name="Trip", target_amount=Decimal("1000"), current_amount=Decimal("0"),
+            deadline=date.today() + timedelta(days=90)
+        )
+
+    def test_many_writes_trigger_one_reallocation(self):
+        last_month = date.today().replace(day=1) - timedelta(days=1)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with batched_reallocation():
+                for i in range(5):
+                    Income.objects.create(
+                        user=self.user, source=f"Job {i}", amount=Decimal("100"), date=last_month, category="Salary"
+                    )
+
+        # ✅ One reallocation for five saves
+        self.assertEqual(len(callbacks), 1)
+
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal("500"))
+
+
+class AllocationEngineTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="manygoals", password="password123")
+        today = date.today()
+        SavingsGoal.objects.bulk_create([
+            SavingsGoal(
+                user=self.user, name=f"Goal {i}", target_amount=Decimal("100.10"),
+                deadline=today + timedelta(days=30 + i), priority="Low",
+            )
+            for i in range(300)
+        ])
+        SurplusTracker.objects.create(user=self.user, last_surplus=Decimal("0"))
+
+    def test_hundreds_of_goals_use_constant_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            surplus_rollover(self.user, excess_amount=Decimal("15015.05"))
+        first_run = len(ctx.captured_queries)
+
+        goals = list(SavingsGoal.objects.filter(user=self.user).order_by("deadline"))
+        # ✅ Exact Decimal waterfall: 150 full goals, then the 0.05 remainder
+        self.assertTrue(all(g.current_amount == Decimal("100.10") for g in goals[:150]))
+        self.assertEqual(goals[150].current_amount, Decimal("0.05"))
+        self.assertTrue(all(g.current_amount == Decimal("0") for g in goals[151:]))
+
+        # ✅ Unchanged allocation writes nothing
+        with CaptureQueriesContext(connection) as ctx:
+            surplus_rollover(self.user, excess_amount=Decimal("15015.05"))
+        self.assertLess(len(ctx.captured_queries), first_run)
+        self.assertLessEqual(first_run, 10)
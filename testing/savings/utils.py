@@ -1,9 +1,9 @@
   
 from datetime import date
 from decimal import Decimal
-from django.db.models import Sum, F, Case, When,IntegerField
+from django.db.models import Sum
 from dateutil.relativedelta import relativedelta
-from finance.models import Income, Expense
+from finance.rollups import income_expense_by_month, totals_before_month
 from .models import SavingsGoal, SurplusTracker
 from ml.probability import predict_goal_probability
 # -------------------------
@@ -20,7 +20,7 @@ MESSAGES = {
 MAX_DISPLAY_YEARS = 30
 
 
-def get_goal_probability(user, goal):
+def get_goal_probability(user, goal, profile=None):
     today = date.today()
 
     # ✅ 1. Goal completed
@@ -39,14 +39,14 @@ def get_goal_probability(user, goal):
 
     # ✅ 3. Deadline in current month → show ML predicted deadline
     if goal.deadline and goal.deadline.year == today.year and goal.deadline.month == today.month:
-        ml_result = predict_goal_probability(user, goal)
+        ml_result = predict_goal_probability(user, goal, profile)
         return {
             "probability": MESSAGES["deadline_this_month_prob"],
             "suggested_deadline": _format_suggested_deadline(ml_result.get("suggested_deadline"), today),
         }
 
     # ✅ 4. Incomplete goal → get raw ML output
-    ml_result = predict_goal_probability(user, goal)
+    ml_result = predict_goal_probability(user, goal, profile)
     raw_prob = ml_result.get("probability", 0)
     raw_deadline = ml_result.get("suggested_deadline", None)
 
@@ -77,12 +77,9 @@ def _format_suggested_deadline(sd, today):
 # Monthly Surplus
 # -------------------------
 def calculate_monthly_surplus(user, year, month):
-    total_income = Income.objects.filter(
-        user=user, date__year=year, date__month=month
-    ).aggregate(Sum("amount"))["amount__sum"] or 0
-    total_expense = Expense.objects.filter(
-        user=user, date__year=year, date__month=month
-    ).aggregate(Sum("amount"))["amount__sum"] or 0
+    month_start = date(year, month, 1)
+    totals = income_expense_by_month(user, month_start, month_start)
+    total_income, total_expense = totals.get((year, month), (0, 0))
     return max(Decimal(total_income) - Decimal(total_expense), Decimal(0))
 
 
@@ -97,55 +94,76 @@ def delete_goals_with_refund(user, goals_queryset):
     count = goals_queryset.count()
     goals_queryset.delete()
     return count, refund
+# -------------------------
+# Allocation Engine
+# -------------------------
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+FAR_FUTURE = date(9999, 12, 31)
+
+
+def allocation_order(goal):
+    """Waterfall order: earliest deadline, then priority, then oldest goal."""
+    return (goal.deadline or FAR_FUTURE, PRIORITY_RANK.get(goal.priority, 3), goal.created_at, goal.id)
+
+
+def waterfall(goals, available):
+    """
+    Fill goals in order, each up to its target, from `available`.
+    Pure Decimal arithmetic; returns ({goal.id: amount}, leftover).
+    A non-positive `available` allocates nothing and is returned unchanged.
+    """
+    remaining = Decimal(available)
+    amounts = {}
+    for goal in goals:
+        allocation = max(min(Decimal(goal.target_amount), remaining), Decimal("0"))
+        amounts[goal.id] = allocation
+        remaining -= allocation
+    return amounts, remaining
+
+
+def apply_allocations(goals, amounts):
+    """
+    Persist new current_amount values with one bulk_update, skipping goals whose
+    amount did not change. Goals missing from `amounts` are reset to 0.
+    Returns the number of goals written.
+    """
+    changed = []
+    for goal in goals:
+        new_amount = amounts.get(goal.id, Decimal("0"))
+        if goal.current_amount != new_amount:
+            goal.current_amount = new_amount
+            changed.append(goal)
+    if changed:
+        SavingsGoal.objects.bulk_update(changed, ["current_amount"], batch_size=500)
+    return len(changed)
+
+
 def surplus_rollover(user, excess_amount=0):
     tracker, _ = SurplusTracker.objects.get_or_create(user=user)
     today = date.today()
-    first_day_current_month = date(today.year, today.month, 1)
-
     # 1️⃣ Previous months' surplus
-    total_income_prev = Income.objects.filter(user=user, date__lt=first_day_current_month).aggregate(Sum("amount"))["amount__sum"] or 0
-    total_expense_prev = Expense.objects.filter(user=user, date__lt=first_day_current_month).aggregate(Sum("amount"))["amount__sum"] or 0
+    total_income_prev, total_expense_prev = totals_before_month(user, today.year, today.month)
     previous_surplus = Decimal(total_income_prev) - Decimal(total_expense_prev)
 
     # 2️⃣ Total available surplus including leftover
     total_available = previous_surplus + Decimal(excess_amount)
 
-    # 3️⃣ Reset all active goals
-    goals = SavingsGoal.objects.filter(user=user)
-    for goal in goals:
-        goal.current_amount = 0
-        goal.save()
-
-    # 4️⃣ Allocate surplus to goals sequentially
-    goals = goals.filter(current_amount__lt=F("target_amount"), deadline__gte=today).order_by(
-    "deadline",
-    Case(
-        When(priority="High", then=0),
-        When(priority="Medium", then=1),
-        When(priority="Low", then=2),
-        default=3,
-        output_field=IntegerField(),
-    ),
-    "created_at",
-    "id"
-)
-    for goal in goals:
-        if total_available <= 0:
-            break
-        needed = goal.target_amount
-        allocation = min(total_available, needed)
-        goal.current_amount += allocation
-        goal.save()
-        total_available -= allocation
-
-    # 5️⃣ Update tracker
-    tracker.last_surplus = total_available
-    tracker.save()
+    # 3️⃣ Allocate surplus to open goals sequentially; every other goal is reset to 0
+    goals = list(SavingsGoal.objects.filter(user=user))
+    eligible = sorted(
+        (g for g in goals if g.target_amount > 0 and g.deadline and g.deadline >= today),
+        key=allocation_order,
+    )
+    amounts, total_available = waterfall(eligible, total_available)
+    apply_allocations(goals, amounts)
+
+    # 4️⃣ Update tracker
+    if tracker.last_surplus != total_available:
+        tracker.last_surplus = total_available
+        tracker.save(update_fields=["last_surplus"])
 
-    # 6️⃣ Compute current month balance for display
-    current_income = Income.objects.filter(user=user, date__year=today.year, date__month=today.month).aggregate(Sum("amount"))["amount__sum"] or 0
-    current_expense = Expense.objects.filter(user=user, date__year=today.year, date__month=today.month).aggregate(Sum("amount"))["amount__sum"] or 0
-    current_balance = max(Decimal(current_income) - Decimal(current_expense), Decimal(0))
+    # 5️⃣ Compute current month balance for display
+    current_balance = calculate_monthly_surplus(user, today.year, today.month)
 
     return {
         "accumulated_balance": tracker.last_surplus,
@@ -158,53 +176,21 @@ def reallocate_on_new_goal(user):
     Uses current surplus + all already allocated amounts, reorders goals by priority,
     and distributes money from scratch.
     """
-
-
-    today = date.today()
     tracker, _ = SurplusTracker.objects.get_or_create(user=user)
 
     # 1️⃣ Calculate total surplus including already allocated
-    total_allocated = SavingsGoal.objects.filter(user=user).aggregate(
-        total=Sum("current_amount")
-    )["total"] or 0
-    total_surplus = tracker.last_surplus + Decimal(total_allocated)
+    goals = list(SavingsGoal.objects.filter(user=user))
+    total_allocated = sum((g.current_amount for g in goals), Decimal("0"))
+    total_surplus = tracker.last_surplus + total_allocated
 
-    # 2️⃣ Reset all active goals' current_amount to 0
-    goals = SavingsGoal.objects.filter(user=user)
-    for goal in goals:
-        goal.current_amount = 0
-        goal.save()
-
-    # 3️⃣ Order goals by priority rules
-    far_future = date(9999, 12, 31)
-    priority_rank = {"High": 0, "Medium": 1, "Low": 2}
-    def _effective_deadline(g):
-        return g.deadline if g.deadline else far_future
-
-    goal_list = list(goals)
-    goal_list.sort(key=lambda g: (
-        _effective_deadline(g),
-        priority_rank.get(getattr(g, "priority", "Low"), 3),
-        getattr(g, "created_at", date.min),
-        g.id
-    ))
-
-    # 4️⃣ Allocate total_surplus sequentially
-    remaining = float(total_surplus)
-    for goal in goal_list:
-        needed = float(goal.target_amount)
-        allocation = min(needed, remaining)
-        goal.current_amount += Decimal(allocation)
-        goal.save()
-        remaining -= allocation
-        if remaining <= 0:
-            break
+    # 2️⃣ Allocate total_surplus sequentially in priority order
+    amounts, remaining = waterfall(sorted(goals, key=allocation_order), total_surplus)
+    apply_allocations(goals, amounts)
 
-    # 5️⃣ Update tracker with leftover
-    tracker.last_surplus = Decimal(max(0, remaining))
-    tracker.save()
+    # 3️⃣ Update tracker with leftover
+    tracker.last_surplus = max(Decimal("0"), remaining)
+    tracker.save(update_fields=["last_surplus"])
     return {
         "accumulated_balance": tracker.last_surplus,
-        "current_balance": total_surplus - Decimal(tracker.last_surplus)  # optional
+        "current_balance": total_surplus - tracker.last_surplus  # optional
     }
-
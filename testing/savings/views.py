@@ -9,10 +9,10 @@ from .utils import delete_goals_with_refund,get_goal_probability,SurplusTracker,
 from django.db.models import F
 from .models import SavingsGoal
 from django.db import transaction
+from ml.probability import SavingsProfile
 
 @login_required
 def savings_dashboard(request):
-    surplus_rollover(request.user)
     # 1️⃣ Auto-update accumulated balance and allocate to goals
     balances = surplus_rollover(request.user)
 
@@ -46,8 +46,10 @@ def savings_dashboard(request):
 
     # 8️⃣ Attach probability & conditional suggested deadline
     today = date.today()
+    profile = SavingsProfile(request.user)  # one surplus history for every goal on the page
+    profile.predict_many(page_obj)
     for goal in page_obj:
-        result = get_goal_probability(request.user, goal)
+        result = get_goal_probability(request.user, goal, profile)
         goal.probability = result["probability"]
         goal.is_numeric_prob = isinstance(goal.probability, (int, float))
         goal.suggested_deadline = result["suggested_deadline"]